@@ -18,31 +18,139 @@ real-world interfacing.
 Modules:
 --------
 - fsk            : FSK modulation/demodulation logic
+- mfsk           : M-ary FSK, several bits per symbol
+- multicarrier   : Parallel FSK subchannels in one symbol
+- goertzel       : Goertzel tone-bank detection (alternative to a full FFT)
+- receiver       : Streaming start/stop receiver fed from an audio callback
+- timing         : Symbol timing recovery (early-late gate, clock offset in ppm)
+- squelch        : Low-CPU idle detector that wakes the receiver on preamble band energy
+- baseband       : Complex baseband front end (NCO mixing, polyphase decimation)
+- soft           : Soft-decision bit LLRs and per-frame quality from tone energies
+- correlation    : Streaming matched-filter preamble detection
+- modem          : Precomputed, validated FSK modem plan (modulate, filter, sync, demodulate)
 - protocol       : Bit framing, preamble detection, CRC
-- physical       : Audio interface for playback/recording
+- fec            : Forward error correction (Hamming, convolutional/Viterbi, interleaving)
+- link           : Link adaptation (rate profiles, SNR estimate, rate header)
+- channel        : Underwater channel model for emulation
+- physical       : Audio interface for playback/recording (sound card, WAV file, loopback backends)
+- transmit       : Prioritised transmit scheduler on one output stream
 - codec          : Bit-packing, serialization/deserialization
 - signal_filters : Signal filtering functions
 """
 
-from .fsk import modulate_fsk, demodulate_fsk
-from .protocol import encode_packet, decode_packet, detect_preamble
-from .physical import record_audio, play_audio, generate_tone
-from .codec import pack_bits, unpack_bits
-from .signal_filters import butter_bandpass, bandpass_filter
+from .fsk import modulate_fsk, modulate_fsk_batch, demodulate_fsk, frame_signal, fft_tone_energies
+from .mfsk import modulate_mfsk, demodulate_mfsk, mfsk_tones, gray_encode, gray_decode
+from .multicarrier import modulate_multicarrier_fsk, demodulate_multicarrier_fsk, carrier_pairs
+from .goertzel import goertzel, goertzel_energies, tone_bank
+from .receiver import StreamingReceiver
+from .timing import SymbolTimingRecovery, track_symbols
+from .squelch import Squelch
+from .baseband import BasebandConverter, downconvert, decimation_taps
+from .soft import bit_llrs, SoftQuality
+from .correlation import PreambleCorrelator, preamble_template
+from .modem import FSKModem
+from .protocol import (encode_packet, encode_packet_bits, decode_packet, packet_length, PacketParser, PacketError,
+                       detect_preamble, find_sync_word, find_sync_word_soft, SyncSearcher, crc16, crc32)
+from .fec import (hamming74_encode, hamming74_decode, conv_encode, viterbi_decode, interleave,
+                  deinterleave, fec_encode, fec_decode, coded_length)
+from .link import (LinkProfile, LinkQuality, LinkAdapter, PROFILES, modulate_adaptive, demodulate_adaptive,
+                   adaptive_correlator, estimate_snr_db, net_bit_rate, profile_tones)
+from .channel import UnderwaterChannel, ChannelStream, thorp_absorption, freshwater_absorption, SPEED_OF_SOUND
+from .physical import (record_audio, play_audio, generate_tone, assemble_symbols, get_backend, AudioBackend,
+                       SoundDeviceBackend, WavBackend, LoopbackBackend, read_wav, to_float)
+from .transmit import TransmitScheduler, PRIORITY_CONTROL, PRIORITY_DATA
+from .codec import pack_bits, unpack_bits, bytes_to_bits, bits_to_bytes, text_to_bits, bits_to_text
+from .signal_filters import butter_bandpass, butter_bandpass_sos, BandpassFilter, bandpass_filter
 from .constants import *
 
 __all__ = [
     "modulate_fsk",
+    "modulate_fsk_batch",
     "demodulate_fsk",
+    "frame_signal",
+    "fft_tone_energies",
+    "modulate_mfsk",
+    "demodulate_mfsk",
+    "mfsk_tones",
+    "gray_encode",
+    "gray_decode",
+    "modulate_multicarrier_fsk",
+    "demodulate_multicarrier_fsk",
+    "carrier_pairs",
+    "goertzel",
+    "goertzel_energies",
+    "tone_bank",
+    "StreamingReceiver",
+    "SymbolTimingRecovery",
+    "track_symbols",
+    "Squelch",
+    "BasebandConverter",
+    "downconvert",
+    "decimation_taps",
+    "PreambleCorrelator",
+    "preamble_template",
+    "bit_llrs",
+    "SoftQuality",
+    "FSKModem",
     "encode_packet",
+    "encode_packet_bits",
     "decode_packet",
+    "packet_length",
+    "PacketParser",
+    "PacketError",
+    "crc16",
+    "crc32",
     "detect_preamble",
+    "find_sync_word",
+    "find_sync_word_soft",
+    "SyncSearcher",
+    "hamming74_encode",
+    "hamming74_decode",
+    "conv_encode",
+    "viterbi_decode",
+    "interleave",
+    "deinterleave",
+    "fec_encode",
+    "fec_decode",
+    "coded_length",
+    "LinkProfile",
+    "LinkQuality",
+    "LinkAdapter",
+    "PROFILES",
+    "modulate_adaptive",
+    "demodulate_adaptive",
+    "adaptive_correlator",
+    "estimate_snr_db",
+    "net_bit_rate",
+    "profile_tones",
+    "UnderwaterChannel",
+    "ChannelStream",
+    "thorp_absorption",
+    "freshwater_absorption",
+    "SPEED_OF_SOUND",
     "record_audio",
     "play_audio",
     "generate_tone",
+    "assemble_symbols",
+    "get_backend",
+    "AudioBackend",
+    "SoundDeviceBackend",
+    "WavBackend",
+    "LoopbackBackend",
+    "read_wav",
+    "to_float",
+    "TransmitScheduler",
+    "PRIORITY_CONTROL",
+    "PRIORITY_DATA",
     "pack_bits",
     "unpack_bits",
+    "bytes_to_bits",
+    "bits_to_bytes",
+    "text_to_bits",
+    "bits_to_text",
     "butter_bandpass",
+    "butter_bandpass_sos",
+    "BandpassFilter",
     "bandpass_filter",
     "SAMPLE_RATE",
     "DURATION",
@@ -52,4 +160,4 @@ __all__ = [
     "FREQ_STOP",
     "PREAMBLE", 
     "THRESHOLD"
-]
\ No newline at end of file
+]
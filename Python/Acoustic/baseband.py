@@ -0,0 +1,206 @@
+# python/acoustic/baseband.py
+"""
+Complex baseband front end: mix the band of interest down to 0 Hz and decimate.
+
+An ultrasonic link samples at 88.2 kHz to carry tones that occupy a few kHz
+around 40 kHz. Mixing that band down with a numerically controlled oscillator
+and low-pass decimating it hands the demodulator and the preamble correlator a
+complex stream 10-20x smaller, so everything after the front end costs about
+what the audible configuration does. Tones come out at (freq - center_freq), so
+they can be negative: the stream is complex and both sides of 0 Hz count.
+"""
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import firwin
+
+from .constants import *
+
+# longest oscillator table kept in the cache: streaming blocks reuse theirs, a whole recording
+# through convert() gets one computed for the call instead of pinning a table its own size
+NCO_CACHE_OUTPUTS = 4096
+
+
+@lru_cache(maxsize=16)
+def _nco(freq, n, sample_rate):
+    # n samples of the mixing oscillator, rotated per block rather than rebuilt
+    table = np.exp(-2j * np.pi * freq * np.arange(n) / sample_rate)
+    table.flags.writeable = False
+    return table
+
+
+@lru_cache(maxsize=16)
+def decimation_taps(decimation, sample_rate, bandwidth, taps_per_phase=9):
+    """
+    Low-pass FIR for a decimating front end, designed once per configuration
+
+    Args:
+        decimation (int): input samples per output sample
+        sample_rate (int): input sampling rate in Hz
+        bandwidth (float): width of the passband in Hz, centred on 0 Hz
+        taps_per_phase (int): taps in each polyphase branch, odd so the filter is centred
+            on a whole output sample
+
+    Returns:
+        np.array: read-only taps, decimation * taps_per_phase of them
+    """
+    if taps_per_phase < 1 or taps_per_phase % 2 == 0:
+        raise ValueError(f"taps_per_phase must be odd, got {taps_per_phase}")
+    if not 0 < bandwidth < sample_rate / decimation:
+        raise ValueError(f"bandwidth {bandwidth} Hz doesn't fit the {sample_rate / decimation} Hz output rate")
+    taps = firwin(decimation * taps_per_phase, bandwidth / 2, fs=sample_rate)
+    taps.flags.writeable = False
+    return taps
+
+
+@lru_cache(maxsize=16)
+def _polyphase_bank(center_freq, decimation, sample_rate, bandwidth, taps_per_phase):
+    # low-pass taps shifted up to center_freq, split into one column per branch:
+    # column p holds the taps applied to the block p blocks before the newest, in sample order,
+    # cos and sin parts side by side so real input stays real in the matrix multiply
+    taps = decimation_taps(decimation, sample_rate, bandwidth, taps_per_phase)
+    shifted = taps * np.exp(2j * np.pi * center_freq * np.arange(len(taps)) / sample_rate)
+    branches = shifted.reshape(taps_per_phase, decimation)[:, ::-1].T
+    bank = np.ascontiguousarray(np.concatenate([branches.real, branches.imag], axis=1))
+    bank.flags.writeable = False
+    return bank
+
+
+class BasebandConverter:
+    """
+    Streaming NCO mixer + polyphase decimator
+
+    The low-pass filter is shifted up to center_freq and split into
+    taps_per_phase branches, one per block of `decimation` input samples. Every
+    complete block goes through all branches in one matrix multiply, each output
+    sums one branch result from each of the last taps_per_phase blocks, and the
+    oscillator is then applied at the output rate. Only the kept outputs are
+    computed, and nothing runs per input sample beyond the multiply itself.
+
+    Output k describes input block k (samples k * decimation onwards) once `delay`
+    outputs of filter latency are dropped, which convert() / downconvert() do for
+    offline signals.
+
+    Usage:
+        front_end = BasebandConverter(40000, 88200, decimation=15)
+        for block in blocks:
+            iq = front_end.process(block)
+        bits = demodulate_fsk(iq, front_end.output_rate, 41000 - front_end.center_freq, ...)
+    """
+
+    def __init__(self, center_freq, sample_rate=SAMPLE_RATE, decimation=15, bandwidth=None, taps_per_phase=9):
+        """
+        Args:
+            center_freq (float): frequency moved to 0 Hz, e.g. halfway between the tones
+            sample_rate (int): input sampling rate in Hz
+            decimation (int): input samples per output sample; pick one that divides the
+                samples per bit, so symbols stay a whole number of output samples
+            bandwidth (float): passband width in Hz, defaults to 80% of the output rate
+            taps_per_phase (int): filter length per polyphase branch (odd), longer is sharper
+        """
+        if decimation < 1 or int(decimation) != decimation:
+            raise ValueError(f"decimation must be a positive integer, got {decimation}")
+        self.center_freq = float(center_freq)
+        self.sample_rate = sample_rate
+        self.decimation = int(decimation)
+        self.output_rate = sample_rate / self.decimation
+        self.bandwidth = float(bandwidth or 0.8 * self.output_rate)
+        self.taps_per_phase = taps_per_phase
+        self._bank = _polyphase_bank(self.center_freq, self.decimation, sample_rate, self.bandwidth, taps_per_phase)
+        self.delay = (taps_per_phase - 1) // 2
+        self.reset()
+
+    def reset(self):
+        """Clears the oscillator phase and filter history, e.g. between unrelated recordings"""
+        self._partial = np.zeros(0)  # input samples short of a whole block
+        self._history = np.zeros((self.taps_per_phase - 1, self.taps_per_phase), dtype=np.complex128)
+        self._outputs = 0
+
+    def process(self, block):
+        """
+        Converts the next block of the stream
+
+        Args:
+            block (np.array): real input samples
+
+        Returns:
+            np.array: complex baseband samples at output_rate, one per complete block of decimation samples
+        """
+        block = np.asarray(block, dtype=np.float64).ravel()
+        samples = np.concatenate((self._partial, block)) if len(self._partial) else block
+        n_blocks = len(samples) // self.decimation
+        self._partial = samples[n_blocks * self.decimation:].copy()
+        if n_blocks == 0:
+            return np.zeros(0, dtype=np.complex128)
+
+        branches = self._branches(samples[:n_blocks * self.decimation].reshape(n_blocks, self.decimation))
+        branches = np.concatenate((self._history, branches))
+        self._history = branches[len(branches) - len(self._history):]
+        out = self._combine(branches)
+        out *= self._oscillator(self._outputs, n_blocks)
+        self._outputs += n_blocks
+        return out
+
+    def convert(self, signal):
+        """
+        Offline conversion of a whole signal with this configuration, delay compensated
+
+        Args:
+            signal (np.array): real samples, shape (n,) or (n_signals, n)
+
+        Returns:
+            np.array: complex samples, output k describes input samples k * decimation onwards;
+                ceil(n / decimation) per signal
+        """
+        signal = np.asarray(signal, dtype=np.float64)
+        n = signal.shape[-1]
+        n_blocks = -(-n // self.decimation) + self.delay
+        padded = np.zeros(signal.shape[:-1] + (n_blocks * self.decimation,))
+        padded[..., :n] = signal
+        branches = self._branches(padded.reshape(signal.shape[:-1] + (n_blocks, self.decimation)))
+        lead = np.zeros(branches.shape[:-2] + (self.taps_per_phase - 1, self.taps_per_phase), dtype=np.complex128)
+        out = self._combine(np.concatenate((lead, branches), axis=-2))
+        out *= self._oscillator(0, n_blocks)
+        return out[..., self.delay:]
+
+    def _branches(self, blocks):
+        # every branch applied to every block, (..., n_blocks, taps_per_phase)
+        parts = blocks @ self._bank
+        return parts[..., :self.taps_per_phase] + 1j * parts[..., self.taps_per_phase:]
+
+    def _combine(self, branches):
+        # output k = sum over p of branch p applied to block k - p; the first taps_per_phase - 1
+        # rows are history and produce no output of their own
+        taps_per_phase = self.taps_per_phase
+        n_out = branches.shape[-2] - (taps_per_phase - 1)
+        out = np.zeros(branches.shape[:-2] + (n_out,), dtype=np.complex128)
+        for p in range(taps_per_phase):
+            out += branches[..., taps_per_phase - 1 - p:taps_per_phase - 1 - p + n_out, p]
+        return out
+
+    def _oscillator(self, first, n):
+        # the mixing oscillator at the newest sample of outputs first .. first + n - 1
+        start = (first + 1) * self.decimation - 1
+        phase = np.exp(-2j * np.pi * np.mod(self.center_freq * start / self.sample_rate, 1.0))
+        if n <= NCO_CACHE_OUTPUTS:
+            return phase * _nco(self.center_freq, n, self.output_rate)
+        cycles = np.mod(self.center_freq * np.arange(n) / self.output_rate, 1.0)
+        return phase * np.exp(-2j * np.pi * cycles)
+
+
+def downconvert(signal, center_freq, sample_rate=SAMPLE_RATE, decimation=15, bandwidth=None, taps_per_phase=9):
+    """
+    Baseband conversion of a whole offline signal, delay compensated
+
+    Args:
+        signal (np.array): real samples, shape (n,) or (n_signals, n)
+        center_freq (float): frequency moved to 0 Hz
+        sample_rate (int): input sampling rate in Hz
+        decimation (int): input samples per output sample
+        bandwidth (float): passband width in Hz, defaults to 80% of the output rate
+        taps_per_phase (int): filter length per polyphase branch (odd)
+
+    Returns:
+        np.array: complex samples at sample_rate / decimation, see BasebandConverter.convert
+    """
+    return BasebandConverter(center_freq, sample_rate, decimation, bandwidth, taps_per_phase).convert(signal)
@@ -0,0 +1,202 @@
+# python/acoustic/channel.py
+"""
+Underwater acoustic channel model
+===============================
+Spreading + absorption loss, a single multipath echo and ambient noise, all
+precomputed once per configuration and applied to whole batches of signals
+(trials x samples) for Monte Carlo runs.
+
+example values for different environments: for best accuracy, the user should
+fill in stats measured where they are deploying.
+"""
+import numpy as np
+
+SPEED_OF_SOUND = 1447
+# speed of sound in water 10 degrees celsius. source: https://www.omnicalculator.com/physics/speed-of-sound
+
+MEDIUMS = ('none', 'saltwater', 'freshwater', 'coastal', 'arctic')
+
+
+def thorp_absorption(freq):
+    """
+    Thorp's equation for sea water absorption (frequencies > 400 Hz)
+    source: https://gorbatschow.github.io/SonarDocs/sound_absorption_sea_thorp.en/#octavematlab-implementation
+
+    Args:
+        freq (float): frequency in Hz
+
+    Returns:
+        float: absorption in dB/km
+    """
+    f_kHz = freq / 1000
+    return 1.0936 * (
+        0.1 * (f_kHz**2) / (1 + f_kHz**2) +
+        40 * (f_kHz**2) / (4100 + f_kHz**2)
+    )
+
+
+def freshwater_absorption(freq, temp_c=10, depth_m=100):
+    """
+    Pure water (viscous) absorption, the Francois-Garrison term that remains
+    without the boric acid and magnesium sulphate relaxations of sea water
+
+    Args:
+        freq (float): frequency in Hz
+        temp_c (float): water temperature in °C (fit valid up to 20 °C)
+        depth_m (float): depth in meters
+
+    Returns:
+        float: absorption in dB/km
+    """
+    f_kHz = freq / 1000
+    a3 = 4.937e-4 - 2.59e-5 * temp_c + 9.11e-7 * temp_c**2 - 1.50e-8 * temp_c**3
+    p3 = 1 - 3.83e-5 * depth_m + 4.9e-10 * depth_m**2
+    return a3 * p3 * f_kHz**2
+
+
+def _peak(x):
+    # per-row peak for normalising, 1 for silent rows so they don't divide by zero
+    peak = np.max(np.abs(x), axis=1, keepdims=True)
+    return np.where(peak > 0, peak, 1.0)
+
+
+class UnderwaterChannel:
+    """
+    Simulates underwater acoustic channel effects
+
+    Loss, the multipath tap and the noise level only depend on the configuration,
+    so they are worked out once here; apply() is then a couple of array operations
+    over a whole batch.
+    """
+
+    def __init__(self, distance_m, medium='saltwater', sample_rate=88200, center_freq=40000, temp_c=10,
+                 salinity_ppt=35, depth_m=100, speed_of_sound=SPEED_OF_SOUND, multipath_gain=0.4):
+        """
+        Args:
+            distance_m (float): Distance from source in meters
+            medium (str): Water type ('none', 'saltwater', 'freshwater', 'coastal', 'arctic'),
+                'none' turns off the loss for testing
+            sample_rate (int): Sampling rate in Hz
+            center_freq (float): frequency the loss and noise are evaluated at, e.g. (f0 + f1) / 2
+            temp_c (float): Water temperature in °C
+            salinity_ppt (float): Salinity in parts per thousand (scales the sea water absorption for 'coastal')
+            depth_m (float): Depth in meters
+            speed_of_sound (float): m/s
+            multipath_gain (float): echo amplitude relative to the direct path
+        """
+        if medium not in MEDIUMS:
+            raise ValueError(f"Unknown medium: {medium}")
+        self.distance_m = distance_m
+        self.medium = medium
+        self.sample_rate = sample_rate
+        self.center_freq = center_freq
+        self.temp_c = temp_c
+        self.salinity_ppt = salinity_ppt
+        self.depth_m = depth_m
+        self.multipath_gain = multipath_gain
+
+        self.loss_db = self.spreading_loss_db() + self.absorption_db_per_km() * (distance_m / 1000)
+        self.attenuation = 10**(-self.loss_db / 20)  # Convert dB to linear
+        # using formula: delay_spread = distance / sound_speed × sample_rate
+        self.delay_samples = int((distance_m / speed_of_sound) * sample_rate)
+        self.noise_std = self.ambient_noise()
+
+    def spreading_loss_db(self):
+        """Cylindrical spreading, TLspread = 10log10(r) (r = distance (m))"""
+        if self.medium == 'none':  # for testing without any channel affects
+            return 0.0
+        return 10 * np.log10(self.distance_m)
+
+    def absorption_db_per_km(self):
+        if self.medium == 'none':
+            return 0.0
+        if self.medium == 'freshwater':
+            return freshwater_absorption(self.center_freq, self.temp_c, self.depth_m)
+        if self.medium == 'coastal':
+            # brackish: the dominant magnesium sulphate term scales with salinity
+            return thorp_absorption(self.center_freq) * min(self.salinity_ppt / 35, 1.0)
+        return thorp_absorption(self.center_freq)
+
+    def ambient_noise(self):
+        """Wenz curve approximation for ambient noise (std of the added noise)"""
+        if self.medium == 'arctic':
+            return 1e-4  # Quieter environment
+        noise = 5e-4 * (self.center_freq / 1000)**-1.5  # Frequency-dependent noise
+        if self.medium == 'coastal':
+            return 3 * noise  # shipping, surf and snapping shrimp, roughly +10 dB
+        return noise
+
+    def apply(self, signals, rng=None):
+        """
+        Passes signals through the channel
+
+        Args:
+            signals (np.array): one signal (n_samples,) or a batch (n_trials, n_samples)
+            rng (np.random.Generator or int): noise source or seed, for repeatable trials
+
+        Returns:
+            np.array: received signals, same shape, each renormalised to a peak of 1 (all-zero rows
+                are left unscaled, so silence comes out as noise rather than NaN)
+        """
+        rng = np.random.default_rng(rng)
+        signals = np.asarray(signals, dtype=np.float64)
+        x = np.atleast_2d(signals)
+        # Normalize signal first
+        x = x / _peak(x)
+
+        received = self.attenuation * x
+        d = self.delay_samples
+        if 0 < d < x.shape[1]:
+            # echo arriving one propagation delay later, attenuated like the direct path
+            received[:, d:] += self.attenuation * self.multipath_gain * x[:, :-d]
+        received += self.noise_std * rng.standard_normal(x.shape)
+        received /= _peak(received)  # Renormalize
+        return received.reshape(signals.shape)
+
+    def stream(self, rng=None):
+        """A ChannelStream for passing one continuous signal through the channel block by block"""
+        return ChannelStream(self, rng)
+
+
+class ChannelStream:
+    """
+    UnderwaterChannel applied to a signal that arrives in blocks, e.g. audio as it is played
+
+    apply() renormalises every call, which cuts the echo off at the block edge and
+    makes every block equally loud. Here the last delay_samples of input are kept
+    so the echo carries into the next block, and one fixed gain is used
+    throughout: a full-scale input comes out near full scale, quieter input
+    stays quieter and silence comes out as channel noise.
+    """
+
+    def __init__(self, channel, rng=None):
+        """
+        Args:
+            channel (UnderwaterChannel): the channel to emulate
+            rng (np.random.Generator or int): noise source or seed
+        """
+        self.channel = channel
+        self.rng = np.random.default_rng(rng)
+        self.gain = 1 / (channel.attenuation * (1 + channel.multipath_gain))
+        self._history = np.zeros(channel.delay_samples)
+
+    def process(self, block):
+        """
+        Passes the next block of the signal through the channel
+
+        Args:
+            block (np.array): samples (n_samples,)
+
+        Returns:
+            np.array: received samples, same length
+        """
+        block = np.asarray(block, dtype=np.float64).ravel()
+        ch = self.channel
+        received = ch.attenuation * block
+        if len(self._history):
+            # input delayed by delay_samples, the start of it from earlier blocks
+            x = np.concatenate((self._history, block))
+            received += ch.attenuation * ch.multipath_gain * x[:len(block)]
+            self._history = x[len(block):]
+        received += ch.noise_std * self.rng.standard_normal(len(block))
+        return self.gain * received
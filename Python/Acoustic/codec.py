@@ -1,14 +1,82 @@
+# python/acoustic/codec.py
+"""
+Conversion between payloads and bit arrays. Everything goes through
+np.unpackbits/np.packbits, so there is no per-bit Python work.
+"""
+import numpy as np
+
+
+def _byte_view(data):
+    # zero-copy uint8 view of bytes, bytearray, memoryview or any numpy array's raw memory
+    if isinstance(data, np.ndarray):
+        return np.ascontiguousarray(data).reshape(-1).view(np.uint8)
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def bytes_to_bits(data, bitorder='big'):
+    """
+    Unpacks binary data into bits
+
+    Args:
+        data (bytes-like or np.array): payload, e.g. bytes, bytearray, memoryview or a
+            numpy array of sensor samples (its raw memory is sent)
+        bitorder (str): 'big' for MSB first (the over-the-air order), 'little' for LSB first
+
+    Returns:
+        np.array: uint8 array of 0s and 1s, 8 per byte
+    """
+    return np.unpackbits(_byte_view(data), bitorder=bitorder)
+
+
+def bits_to_bytes(bits, bitorder='big'):
+    """
+    Packs bits back into bytes
+
+    Args:
+        bits (array): 0s and 1s, a trailing partial byte is zero padded
+        bitorder (str): 'big' for MSB first, 'little' for LSB first
+
+    Returns:
+        bytes: packed data
+    """
+    return np.packbits(np.asarray(bits, dtype=np.uint8), bitorder=bitorder).tobytes()
+
+
+def text_to_bits(text, encoding='utf-8', bitorder='big'):
+    """Encodes text (any code point with utf-8) to bits"""
+    return bytes_to_bits(text.encode(encoding), bitorder)
+
+
+def bits_to_text(bits, encoding='utf-8', bitorder='big', errors='replace'):
+    """Decodes bits to text, undecodable bytes (e.g. from bit errors) become U+FFFD by default"""
+    return bits_to_bytes(bits, bitorder).decode(encoding, errors=errors)
+
+
 def pack_bits(text):
-    #todo: document
-    bits = []
-    for char in text:
-        bits.extend(int(b) for b in format(ord(char), '08b'))
-    return bits
-    
+    """
+    Converts text (one byte per character, code points below 256) or binary data to bits, MSB first
+
+    Args:
+        text (str or bytes-like or np.array): payload
+
+    Returns:
+        np.array: uint8 array of 0s and 1s
+    """
+    if isinstance(text, str):
+        text = text.encode('latin-1')
+    return bytes_to_bits(text)
+
+
 def unpack_bits(bitgroups):
-    chars = []
-    for bits in bitgroups:
-        byte = bits
-        if len(byte) == 8:
-            chars.append(chr(int(''.join(map(str, byte)), 2)))
-    return ''.join(chars)
\ No newline at end of file
+    """
+    Converts groups of 8 bits back into text, groups of any other length are skipped
+
+    Args:
+        bitgroups (list or np.array): list of 8-bit groups, or a 2D array with 8 columns
+
+    Returns:
+        str: one character per byte
+    """
+    if not (isinstance(bitgroups, np.ndarray) and bitgroups.ndim == 2 and bitgroups.shape[1] == 8):
+        bitgroups = [group for group in bitgroups if len(group) == 8]
+    return bits_to_bytes(np.asarray(bitgroups, dtype=np.uint8).reshape(-1)).decode('latin-1')
@@ -0,0 +1,197 @@
+# python/acoustic/correlation.py
+"""
+Matched-filter preamble detection: correlates incoming audio against the
+modulated preamble using FFT overlap-save, block by block. Works on real audio
+or on the complex output of a baseband front end (see baseband.py).
+"""
+from functools import lru_cache
+
+import numpy as np
+from scipy.fft import next_fast_len
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .fsk import modulate_fsk
+
+
+@lru_cache(maxsize=16)
+def preamble_template(preamble, sample_rate, freq0, freq1, bit_rate):
+    """
+    Modulated preamble, built once per parameter set
+
+    Args:
+        preamble (tuple): preamble bits
+        sample_rate (int): Sampling rate in Hz
+        freq0 (float): Frequency for 0 bits
+        freq1 (float): Frequency for 1 bits
+        bit_rate (float): bits per second
+
+    Returns:
+        np.array: read-only waveform
+    """
+    template = modulate_fsk(bits=list(preamble), sample_rate=sample_rate, freq0=freq0, freq1=freq1, bit_rate=bit_rate)
+    template.flags.writeable = False
+    return template
+
+
+class PreambleCorrelator:
+    """
+    Streaming matched filter for the preamble
+
+    Scores are normalised cross-correlation (1.0 is a perfect match whatever the
+    received level), and every peak above the threshold is reported rather than
+    just the global maximum, so captures holding several packets find them all.
+    Correlation is done by FFT overlap-save, O(N log M) instead of O(N·M).
+    With a front_end the template goes through the same baseband conversion as
+    the received stream, and the score is the magnitude of the complex
+    correlation, since the oscillator's phase at the preamble is unknown.
+
+    Usage:
+        correlator = PreambleCorrelator(preamble, sample_rate, freq0, freq1, bit_rate)
+        for block in blocks:
+            for start, score in correlator.feed(block):
+                ...
+        peaks = correlator.flush()
+    """
+
+    def __init__(self, preamble, sample_rate=44100, freq0=1000, freq1=2000, bit_rate=10, threshold=0.7,
+                 fft_size=None, front_end=None):
+        """
+        Args:
+            preamble (array): preamble bits
+            sample_rate (int): Sampling rate in Hz
+            freq0 (float): Frequency for 0 bits
+            freq1 (float): Frequency for 1 bits
+            bit_rate (float): bits per second
+            threshold (float): minimum normalised correlation (0-1) to report
+            fft_size (int): overlap-save FFT length, defaults to a fast length of ~8x the template
+            front_end (BasebandConverter): the stream fed in is this converter's complex output;
+                sample_rate and the tones stay those of the real signal
+        """
+        self.template = preamble_template(tuple(int(b) for b in preamble), sample_rate, freq0, freq1, bit_rate)
+        self.iq = front_end is not None
+        if self.iq:
+            if front_end.sample_rate != sample_rate:
+                raise ValueError(f"front end runs at {front_end.sample_rate} Hz, the preamble at {sample_rate} Hz")
+            self.template = front_end.convert(self.template)
+            self.template.flags.writeable = False
+        self.threshold = threshold
+        m = len(self.template)
+        self.fft_size = fft_size or next_fast_len(8 * m)
+        if self.fft_size < m:
+            raise ValueError(f"fft_size {self.fft_size} is shorter than the preamble ({m} samples)")
+        self._step = self.fft_size - m + 1
+        self._fft, self._ifft = (np.fft.fft, np.fft.ifft) if self.iq else (np.fft.rfft, np.fft.irfft)
+        self._dtype = np.complex128 if self.iq else np.float64
+        self._template_spectrum = np.conj(self._fft(self.template, self.fft_size))
+        self._template_norm = np.linalg.norm(self.template)
+        self.reset()
+
+    def reset(self):
+        """Forgets buffered samples and any peak in progress"""
+        self._tail = np.zeros(0, dtype=self._dtype)
+        self._offset = 0  # absolute sample index of self._tail[0]
+        self._pending = None  # peak that may still grow in the next block
+
+    def correlate(self, signal):
+        """
+        Normalised correlation of the template at every full-overlap position of signal
+
+        Args:
+            signal (np.array): samples
+
+        Returns:
+            np.array: score per start position, length len(signal) - len(template) + 1
+        """
+        signal = np.asarray(signal, dtype=self._dtype)
+        m = len(self.template)
+        n_positions = len(signal) - m + 1
+        if n_positions <= 0:
+            return np.zeros(0)
+
+        # overlap-save: each fft_size segment yields _step valid correlation lags
+        n_segments = -(-n_positions // self._step)
+        padded = np.zeros((n_segments - 1) * self._step + self.fft_size, dtype=self._dtype)
+        padded[:len(signal)] = signal
+        segments = sliding_window_view(padded, self.fft_size)[::self._step]
+        lags = self._ifft(self._fft(segments, axis=1) * self._template_spectrum, self.fft_size, axis=1)
+        corr = lags[:, :self._step].ravel()[:n_positions]
+        if self.iq:
+            corr = np.abs(corr)
+
+        # energy of the signal under the template at each position
+        power = signal.real ** 2 + signal.imag ** 2 if self.iq else signal * signal
+        energy = np.concatenate(([0.0], np.cumsum(power)))
+        window_energy = np.maximum(energy[m:] - energy[:-m], 0.0)
+        norm = np.sqrt(window_energy) * self._template_norm
+        return np.divide(corr, norm, out=np.zeros_like(corr), where=norm > 1e-12 * self._template_norm)
+
+    def feed(self, block):
+        """
+        Correlates the next block of a stream
+
+        Args:
+            block (np.array): New samples
+
+        Returns:
+            list: (start_index, score) for every peak completed by this block, start_index
+                counted in samples from the first sample ever fed
+        """
+        buf = np.concatenate((self._tail, np.asarray(block, dtype=self._dtype).ravel()))
+        scores = self.correlate(buf)
+        peaks = self._peaks(scores, self._offset)
+        consumed = len(scores)
+        self._tail = buf[consumed:]
+        self._offset += consumed
+        return peaks
+
+    def flush(self):
+        """Ends the stream, returning the peak still in progress (if any)"""
+        peaks = [tuple(self._pending[:2])] if self._pending is not None else []
+        self._pending = None
+        return peaks
+
+    def find(self, signal, block_size=None):
+        """
+        Every preamble peak in a complete offline signal
+
+        Args:
+            signal (np.array): samples
+            block_size (int): samples correlated per step, bounds memory on long recordings
+
+        Returns:
+            list: (start_index, score) per peak
+        """
+        signal = np.asarray(signal)
+        block_size = block_size or 64 * self._step
+        self.reset()
+        peaks = []
+        for i in range(0, len(signal), block_size):
+            peaks.extend(self.feed(signal[i:i + block_size]))
+        peaks.extend(self.flush())
+        self.reset()
+        return peaks
+
+    def _peaks(self, scores, offset):
+        # above-threshold runs closer together than one template length belong to the same packet,
+        # _pending is [start, score, last above-threshold index] of the newest run
+        m = len(self.template)
+        above = np.flatnonzero(scores >= self.threshold)
+        done = []
+        if len(above):
+            splits = np.flatnonzero(np.diff(above) > m) + 1
+            for group in np.split(above, splits):
+                best = group[np.argmax(scores[group])]
+                first, last = offset + int(group[0]), offset + int(group[-1])
+                if self._pending is not None and first - self._pending[2] <= m:
+                    if scores[best] > self._pending[1]:
+                        self._pending[:2] = offset + int(best), float(scores[best])
+                    self._pending[2] = last
+                    continue
+                if self._pending is not None:
+                    done.append(tuple(self._pending[:2]))
+                self._pending = [offset + int(best), float(scores[best]), last]
+        # a run is over once a full template length has passed below the threshold
+        if self._pending is not None and offset + len(scores) - 1 - self._pending[2] > m:
+            done.append(tuple(self._pending[:2]))
+            self._pending = None
+        return done
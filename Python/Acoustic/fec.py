@@ -0,0 +1,280 @@
+# python/acoustic/fec.py
+"""
+Forward error correction
+===============================
+- Hamming(7,4) block code, done as matrix products over whole bit arrays
+- rate 1/2, constraint length 7 convolutional code (generators 171, 133 octal)
+  with a Viterbi decoder vectorized across trellis states and codewords
+- block interleaver to spread multipath burst errors across codewords
+- soft-decision decoding of both codes from per-bit LLRs (see soft.py)
+
+fec_encode / fec_decode / coded_length wrap these into named schemes used by
+the packet framing and the emulation.
+"""
+import numpy as np
+
+FEC_SCHEMES = (None, 'hamming74', 'conv')
+INTERLEAVE_DEPTH = 16
+
+# ==============================
+# Hamming(7,4)
+# ==============================
+# systematic generator: codeword = [d1 d2 d3 d4 p1 p2 p3]
+HAMMING74_G = np.array([
+    [1, 0, 0, 0, 1, 1, 0],
+    [0, 1, 0, 0, 1, 0, 1],
+    [0, 0, 1, 0, 0, 1, 1],
+    [0, 0, 0, 1, 1, 1, 1],
+], dtype=np.uint8)
+HAMMING74_H = np.array([
+    [1, 1, 0, 1, 1, 0, 0],
+    [1, 0, 1, 1, 0, 1, 0],
+    [0, 1, 1, 1, 0, 0, 1],
+], dtype=np.uint8)
+# syndrome (as an int, first row = MSB) -> bit position to flip, -1 for no error
+_SYNDROME_POSITION = np.full(8, -1)
+for _pos in range(7):
+    _SYNDROME_POSITION[int(''.join(map(str, HAMMING74_H[:, _pos])), 2)] = _pos
+
+
+def hamming74_encode(bits):
+    """
+    Args:
+        bits (array): 0/1 bits, zero padded to a multiple of 4
+
+    Returns:
+        np.array: uint8 codeword bits, 7 per 4 data bits
+    """
+    bits = np.asarray(bits, dtype=np.uint8).ravel()
+    bits = np.concatenate((bits, np.zeros(-len(bits) % 4, dtype=np.uint8)))
+    return ((bits.reshape(-1, 4) @ HAMMING74_G) % 2).astype(np.uint8).ravel()
+
+
+# all 16 codewords as +-1, for soft decoding by correlation
+_HAMMING74_SIGNS = 2.0 * ((((np.arange(16)[:, None] >> np.arange(3, -1, -1)) & 1) @ HAMMING74_G) % 2) - 1
+
+
+def hamming74_decode(bits, soft=False):
+    """
+    Corrects up to one error per codeword
+
+    Args:
+        bits (array): received codeword bits, a multiple of 7
+        soft (bool): bits are LLRs (> 0 favours 1), each word is decoded to the codeword that
+            agrees best with them, which also gets some double errors right
+
+    Returns:
+        np.array: uint8 data bits, 4 per codeword
+    """
+    if soft:
+        scores = np.asarray(bits, dtype=np.float64).reshape(-1, 7) @ _HAMMING74_SIGNS.T
+        return (_HAMMING74_SIGNS[np.argmax(scores, axis=1), :4] > 0).astype(np.uint8).ravel()
+    words = np.asarray(bits, dtype=np.uint8).reshape(-1, 7).copy()
+    syndrome = (words @ HAMMING74_H.T) % 2 @ np.array([4, 2, 1])
+    position = _SYNDROME_POSITION[syndrome]
+    rows = np.flatnonzero(position >= 0)
+    words[rows, position[rows]] ^= 1
+    return words[:, :4].ravel()
+
+
+# ==============================
+# Convolutional code + Viterbi
+# ==============================
+CONSTRAINT_LENGTH = 7
+GENERATORS = (0o171, 0o133)
+_N_STATES = 1 << (CONSTRAINT_LENGTH - 1)
+
+
+def _taps(generator):
+    # tap i multiplies the input from i steps ago, the generator MSB is the current input
+    return [(generator >> (CONSTRAINT_LENGTH - 1 - i)) & 1 for i in range(CONSTRAINT_LENGTH)]
+
+
+def conv_encode(bits):
+    """
+    Rate 1/2 convolutional encoder, terminated with K-1 zero bits
+
+    Args:
+        bits (array): 0/1 bits, shape (n_bits,) or (n_codewords, n_bits)
+
+    Returns:
+        np.array: uint8 coded bits, shape (..., 2 * (n_bits + K - 1)), outputs interleaved g0 g1 g0 g1...
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    tail = np.zeros(bits.shape[:-1] + (CONSTRAINT_LENGTH - 1,), dtype=np.uint8)
+    bits = np.concatenate((bits, tail), axis=-1)
+    n = bits.shape[-1]
+    coded = np.empty(bits.shape[:-1] + (n, len(GENERATORS)), dtype=np.uint8)
+    for j, generator in enumerate(GENERATORS):
+        out = np.zeros(bits.shape, dtype=np.uint8)
+        for delay, tap in enumerate(_taps(generator)):
+            if tap:
+                out[..., delay:] ^= bits[..., :n - delay]
+        coded[..., j] = out
+    return coded.reshape(bits.shape[:-1] + (-1,))
+
+
+def _trellis():
+    # for every next state: its two predecessor states and the expected output bits of each branch
+    next_states = np.arange(_N_STATES)
+    lsb = np.arange(2)
+    registers = (next_states[:, None] << 1) | lsb  # full shift register, input bit at the top
+    predecessors = registers & (_N_STATES - 1)
+    outputs = np.stack([
+        np.array([bin(r & g).count('1') & 1 for r in registers.ravel()]).reshape(registers.shape)
+        for g in GENERATORS
+    ], axis=-1)
+    return predecessors, outputs.astype(np.float64)
+
+
+_PREDECESSORS, _BRANCH_OUTPUTS = _trellis()
+
+
+def viterbi_decode(coded, soft=False):
+    """
+    Maximum likelihood decoding of conv_encode output
+
+    The add-compare-select step runs over all 64 states and every codeword in the
+    batch at once, only the time axis is a Python loop.
+
+    Args:
+        coded (array): received coded bits, shape (n_coded,) or (n_codewords, n_coded)
+        soft (bool): coded holds LLRs (> 0 favours 1) rather than 0/1 bits, and branches are
+            scored by how strongly the LLRs disagree with them instead of by Hamming distance
+
+    Returns:
+        np.array: uint8 decoded bits with the termination tail removed
+    """
+    coded = np.asarray(coded, dtype=np.float64)
+    single = coded.ndim == 1
+    coded = np.atleast_2d(coded)
+    batch = coded.shape[0]
+    received = coded.reshape(batch, -1, len(GENERATORS))
+    n_steps = received.shape[1]
+
+    expected = 2 * _BRANCH_OUTPUTS - 1 if soft else _BRANCH_OUTPUTS
+
+    metrics = np.full((batch, _N_STATES), np.inf)
+    metrics[:, 0] = 0.0
+    decisions = np.empty((n_steps, batch, _N_STATES), dtype=np.uint8)
+    for t in range(n_steps):
+        # (batch, next state, branch) distance between received and expected outputs
+        if soft:
+            branch = -(received[:, t, None, None, :] * expected).sum(axis=-1)
+        else:
+            branch = np.abs(received[:, t, None, None, :] - expected).sum(axis=-1)
+        candidates = metrics[:, _PREDECESSORS] + branch
+        choice = np.argmin(candidates, axis=-1)
+        decisions[t] = choice
+        metrics = np.take_along_axis(candidates, choice[..., None], axis=-1)[..., 0]
+
+    # trace back from the all-zero state the tail forces the encoder into
+    bits = np.empty((batch, n_steps), dtype=np.uint8)
+    state = np.zeros(batch, dtype=np.int64)
+    rows = np.arange(batch)
+    for t in range(n_steps - 1, -1, -1):
+        bits[:, t] = state >> (CONSTRAINT_LENGTH - 2)
+        state = _PREDECESSORS[state, decisions[t, rows, state]]
+    bits = bits[:, :n_steps - (CONSTRAINT_LENGTH - 1)]
+    return bits[0] if single else bits
+
+
+# ==============================
+# Interleaving
+# ==============================
+def interleave(bits, depth=INTERLEAVE_DEPTH):
+    """
+    Block interleaver: written in rows of `depth`, read out by column
+
+    Args:
+        bits (array): 0/1 bits, zero padded to a multiple of depth
+        depth (int): row length, a burst of up to this many bits lands in different rows
+
+    Returns:
+        np.array: interleaved bits
+    """
+    bits = np.asarray(bits, dtype=np.uint8).ravel()
+    bits = np.concatenate((bits, np.zeros(-len(bits) % depth, dtype=np.uint8)))
+    return bits.reshape(-1, depth).T.ravel()
+
+
+def deinterleave(bits, depth=INTERLEAVE_DEPTH, n_bits=None):
+    """
+    Inverse of interleave
+
+    Args:
+        bits (array): interleaved bits, a multiple of depth
+        depth (int): same depth used to interleave
+        n_bits (int): original length, strips the padding
+
+    Returns:
+        np.array: bits in their original order
+    """
+    bits = np.asarray(bits).ravel()
+    return bits.reshape(depth, -1).T.ravel()[:n_bits]
+
+
+# ==============================
+# Schemes
+# ==============================
+def _raw_coded_length(n_bits, scheme):
+    if scheme is None:
+        return n_bits
+    if scheme == 'hamming74':
+        return -(-n_bits // 4) * 7
+    if scheme == 'conv':
+        return 2 * (n_bits + CONSTRAINT_LENGTH - 1)
+    raise ValueError(f"Unknown fec scheme: {scheme}")
+
+
+def coded_length(n_bits, scheme, interleave_depth=INTERLEAVE_DEPTH):
+    """Bits on the air for n_bits of data under scheme"""
+    n = _raw_coded_length(n_bits, scheme)
+    if scheme is None:
+        return n
+    return n + (-n % interleave_depth)
+
+
+def fec_encode(bits, scheme, interleave_depth=INTERLEAVE_DEPTH):
+    """
+    Args:
+        bits (array): data bits
+        scheme (str): None, 'hamming74' or 'conv'
+        interleave_depth (int): block interleaver depth applied after coding, 1 turns it off
+
+    Returns:
+        np.array: uint8 coded bits, coded_length(len(bits), scheme) long
+    """
+    bits = np.asarray(bits, dtype=np.uint8).ravel()
+    if scheme is None:
+        return bits
+    if scheme == 'hamming74':
+        coded = hamming74_encode(bits)
+    elif scheme == 'conv':
+        coded = conv_encode(bits)
+    else:
+        raise ValueError(f"Unknown fec scheme: {scheme}")
+    return interleave(coded, interleave_depth)
+
+
+def fec_decode(bits, scheme, n_bits, interleave_depth=INTERLEAVE_DEPTH, soft=False):
+    """
+    Args:
+        bits (array): received coded bits, coded_length(n_bits, scheme) long
+        scheme (str): None, 'hamming74' or 'conv'
+        n_bits (int): data bits that were encoded
+        interleave_depth (int): same depth used to encode
+        soft (bool): bits are per-bit LLRs (see soft.py), a missing bit can be passed as 0
+
+    Returns:
+        np.array: uint8 corrected data bits
+    """
+    bits = np.asarray(bits).ravel()
+    if scheme is None:
+        return (bits[:n_bits] > 0).astype(np.uint8) if soft else bits[:n_bits].astype(np.uint8)
+    coded = deinterleave(bits, interleave_depth, _raw_coded_length(n_bits, scheme))
+    if scheme == 'hamming74':
+        return hamming74_decode(coded, soft)[:n_bits]
+    if scheme == 'conv':
+        return viterbi_decode(coded, soft)[:n_bits]
+    raise ValueError(f"Unknown fec scheme: {scheme}")
@@ -1,9 +1,54 @@
 # python/acoustic/fsk.py
 # [todo]:  switch to scipy library for simplicity and consistency
+from functools import lru_cache
+
 import numpy as np
 
+from .goertzel import goertzel_energies
+from .soft import bit_llrs
+from .timing import track_symbols
+
+
+def _fsk_waveform(freqs, samples_per_bit, bit_duration, phase_continuous, out):
+    """
+    Synthesises FSK symbols for an array of per-bit frequencies in one pass
+
+    Args:
+        freqs (np.array): Tone frequency of every bit, shape (..., n_bits)
+        samples_per_bit (int): Samples in each bit
+        bit_duration (float): Length of each bit in seconds
+        phase_continuous (bool): Carry phase across bit boundaries (CPFSK)
+        out (np.array): Destination buffer, shape (..., n_bits * samples_per_bit)
 
-def modulate_fsk(bits, sample_rate=44100, freq0=1000, freq1=2000, bit_rate=0.1):
+    Returns:
+        np.array: out, filled with the waveform
+    """
+    t = np.linspace(0, bit_duration, samples_per_bit, endpoint=False)
+    omega = 2 * np.pi * freqs
+    # per-sample phase, laid out as (..., n_bits, samples_per_bit)
+    phase = omega[..., None] * t
+    if phase_continuous and freqs.shape[-1] > 1:
+        # each bit starts where the previous one finished, wrapped to keep precision
+        advance = np.mod(omega * bit_duration, 2 * np.pi)
+        start = np.zeros_like(omega)
+        np.cumsum(advance[..., :-1], axis=-1, out=start[..., 1:])
+        phase += np.mod(start, 2 * np.pi)[..., None]
+    np.sin(phase, out=out.reshape(phase.shape))
+    return out
+
+
+def _prepare_output(shape, dtype, out):
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != shape:
+        raise ValueError(f"out has shape {out.shape}, expected {shape}")
+    if not out.flags.c_contiguous:
+        raise ValueError("out must be C-contiguous")
+    return out
+
+
+def modulate_fsk(bits, sample_rate=44100, freq0=1000, freq1=2000, bit_rate=0.1,
+                 phase_continuous=False, dtype=np.float64, out=None):
     """
     Modulates bits into FSK audio signal
     
@@ -13,76 +58,196 @@ def modulate_fsk(bits, sample_rate=44100, freq0=1000, freq1=2000, bit_rate=0.1):
         freq0 (float): Frequency for 0 bits
         freq1 (float): Frequency for 1 bits
         bit_rate (float): bits per second to send
+        phase_continuous (bool): Keep the phase continuous between bits (CPFSK),
+            avoids the clicks and splatter of restarting every tone at zero phase
+        dtype (np.dtype): Output sample type, e.g. np.float32 for sound cards
+        out (np.array): Optional preallocated buffer of len(bits) * samples_per_bit samples
         
     Returns:
         np.array: Generated audio signal
     """
     samples_per_bit = int(sample_rate / bit_rate)
-    t = np.linspace(0, 1/bit_rate, samples_per_bit, endpoint=False)
-    
-    signal = np.array([])
-    
-    for bit in bits:
-        frequency = freq1 if bit else freq0
-        samples = np.sin(2 * np.pi * frequency * t)
-        signal = np.concatenate((signal, samples))
-    
-    return signal
+    freqs = np.where(np.asarray(bits).ravel() != 0, freq1, freq0).astype(np.float64)
+    out = _prepare_output((freqs.size * samples_per_bit,), dtype, out)
+    return _fsk_waveform(freqs, samples_per_bit, 1 / bit_rate, phase_continuous, out)
+
+
+def modulate_fsk_batch(bits, sample_rate=44100, freq0=1000, freq1=2000, bit_rate=0.1,
+                       phase_continuous=False, dtype=np.float64, out=None):
+    """
+    Modulates many equal length bit vectors at once, e.g. Monte Carlo trials
+
+    Args:
+        bits (array): 2D array of 0s and 1s, shape (n_signals, n_bits)
+        sample_rate (int): Sampling rate in Hz
+        freq0 (float): Frequency for 0 bits
+        freq1 (float): Frequency for 1 bits
+        bit_rate (float): bits per second to send
+        phase_continuous (bool): Keep the phase continuous between bits (CPFSK)
+        dtype (np.dtype): Output sample type
+        out (np.array): Optional preallocated buffer, shape (n_signals, n_bits * samples_per_bit)
+
+    Returns:
+        np.array: One signal per row, shape (n_signals, n_bits * samples_per_bit)
+    """
+    bits = np.asarray(bits)
+    if bits.ndim != 2:
+        raise ValueError(f"bits must be 2D (n_signals, n_bits), got shape {bits.shape}")
+    samples_per_bit = int(sample_rate / bit_rate)
+    freqs = np.where(bits != 0, freq1, freq0).astype(np.float64)
+    out = _prepare_output((bits.shape[0], bits.shape[1] * samples_per_bit), dtype, out)
+    return _fsk_waveform(freqs, samples_per_bit, 1 / bit_rate, phase_continuous, out)
+
+# frames handed to a single rfft call, bounds the spectrum memory on long recordings
+FRAME_BATCH = 4096
+
+
+@lru_cache(maxsize=32)
+def _hanning(n):
+    window = np.hanning(n)
+    window.flags.writeable = False
+    return window
+
+
+def frame_signal(signal, samples_per_bit, start_index=0):
+    """
+    Splits a signal into whole bit frames without copying
+
+    Args:
+        signal (np.array): Audio signal
+        samples_per_bit (int): Samples in each bit
+        start_index (int): Sample index of the first frame
+
+    Returns:
+        np.array: View of shape (n_bits, samples_per_bit), partial bits at the end are dropped
+    """
+    if start_index < 0:
+        raise ValueError(f"start_index must be >= 0, got {start_index}")
+    signal = np.asarray(signal)
+    n_bits = max(0, (len(signal) - start_index) // samples_per_bit)
+    return signal[start_index:start_index + n_bits * samples_per_bit].reshape(n_bits, samples_per_bit)
+
+
+def tone_bins(freqs, n, sample_rate, neighborhood=2, two_sided=False):
+    """
+    FFT bin indices checked around each tone
 
-#[todo]: switch to scipy library instead of implementing these myself
-# code partially from DeepSeek lmao 
-def demodulate_fsk(signal, sample_rate=44100, freq0=1000, freq1=2000, bit_rate=10, start_index=0):
+    Args:
+        freqs (array): Tone frequencies in Hz
+        n (int): FFT length (samples per bit)
+        sample_rate (int): Sampling rate in Hz
+        neighborhood (int): bins to check either side of the tone
+        two_sided (bool): index a full (complex input) FFT, where negative tones are valid
+
+    Returns:
+        np.array: shape (n_tones, 2 * neighborhood + 1), edges are clipped to the
+            positive spectrum so the bin range is the same as the per-bit loop used;
+            with two_sided, clipped to -n/2..n/2 and wrapped to FFT order
+    """
+    scaled = np.asarray(freqs, dtype=np.float64) * n / sample_rate
+    if two_sided:
+        centers = np.floor(scaled).astype(np.int64)
+        lo = np.maximum(-(n // 2), centers - neighborhood)
+        hi = np.minimum((n - 1) // 2, centers + neighborhood)
+    else:
+        centers = scaled.astype(np.int64)
+        lo = np.maximum(0, centers - neighborhood)
+        hi = np.minimum(n // 2, centers + neighborhood + 1) - 1
+    if np.any(hi < lo):
+        raise ValueError(f"tone(s) {freqs} outside the usable band for sample rate {sample_rate}")
+    offsets = np.arange(-neighborhood, neighborhood + 1)
+    # repeated edge bins don't change the max
+    bins = np.clip(centers[:, None] + offsets, lo[:, None], hi[:, None])
+    return bins % n if two_sided else bins
+
+
+def fft_tone_energies(frames, freqs, sample_rate, neighborhood=2):
+    """
+    Peak spectral magnitude around each tone for every frame
+
+    Args:
+        frames (np.array): shape (n_frames, samples_per_bit), real or complex (baseband, see baseband.py)
+        freqs (array): Tone frequencies in Hz
+        sample_rate (int): Sampling rate in Hz
+        neighborhood (int): bins to check either side of the tone
+
+    Returns:
+        np.array: shape (n_frames, n_tones)
+    """
+    n_frames, n = frames.shape
+    is_complex = np.iscomplexobj(frames)
+    bins = tone_bins(freqs, n, sample_rate, neighborhood, two_sided=is_complex)
+    transform = np.fft.fft if is_complex else np.fft.rfft
+    # hanning window to reduce spectral leakage, aka artificial high-frequency components introduced at start and end of signal
+    # https://numpy.org/doc/stable/reference/generated/numpy.hanning.html  note: different from Hamming!
+    window = _hanning(n)
+    energies = np.empty((n_frames, len(bins)))
+    for i in range(0, n_frames, FRAME_BATCH):
+        spectrum = np.abs(transform(frames[i:i + FRAME_BATCH] * window, axis=1))
+        energies[i:i + FRAME_BATCH] = spectrum[:, bins].max(axis=-1)
+    return energies
+
+
+def demodulate_fsk(signal, sample_rate=44100, freq0=1000, freq1=2000, bit_rate=10, start_index=0,
+                   return_energies=False, backend='fft', timing=None, soft=False):
     """
     Demodulates FSK audio signal to bits using FFT with improved robustness
+
+    All bits are windowed and transformed together as one batch of frames. The
+    'goertzel' backend only evaluates freq0 and freq1 rather than a whole spectrum,
+    which is much cheaper per bit on small receiver hosts.
     
     Args:
-        signal (np.array): Audio signal to demodulate
+        signal (np.array): Audio signal to demodulate, or the complex output of a BasebandConverter
+            (then sample_rate is its output_rate and the tones are relative to its center_freq)
         sample_rate (int): Sampling rate in Hz
         freq0 (float): Frequency for 0 bits
         freq1 (float): Frequency for 1 bits
         bit_rate (float): Data rate in bits per second
         start_index (int): Sample index to start decoding from (skip preamble)
+        return_energies (bool): Also return the tone energies behind each decision
+        backend (str): 'fft' (peak of the bins around each tone) or 'goertzel' (exact tone frequencies)
+        timing (SymbolTimingRecovery): follow the sender's symbol clock instead of slicing at fixed
+            offsets; bits are then detected one at a time with the goertzel tone bank and the
+            clock offset is left in timing.ppm
+        soft (bool): return per-bit LLRs and a SoftQuality (see soft.py) instead of hard bits,
+            for fec_decode(..., soft=True) or find_sync_word_soft
         
     Returns:
-        list: Demodulated bits
+        list: Demodulated bits (with soft: np.array of LLRs, then a SoftQuality)
+        np.array: (only if return_energies) per-bit energies, shape (n_bits, 2) as [energy0, energy1]
     """
     samples_per_bit = int(sample_rate / bit_rate)
-    bits = []
-    
-    # Add windowing and neighborhood check parameters
-    neighborhood = 2  # bins to check around target frequency
-    window = np.hanning(samples_per_bit)  # Pre-calculate window
-    # https://numpy.org/doc/stable/reference/generated/numpy.hanning.html 
-    # note: different from Hamming!
-    # hanning window to spectral leakage, aka artificial high-frequency components introduced at start and end of signal
-    for i in range(start_index, len(signal), samples_per_bit):
-        #window = np.hanning(len(chunk)) 
-        chunk = signal[i:i+samples_per_bit]
-        if len(chunk) < samples_per_bit:
-            break  # Skip partial bits at end
-
-        # Apply window function to reduce spectral leakage
-        windowed_chunk = chunk * window
-        
-        # Compute FFT and magnitudes
-        fft = np.fft.fft(windowed_chunk)
-        magnitudes = np.abs(fft)
-        
-        # Calculate frequency bins with neighborhood check
-        n = len(chunk)
-        max_bin = n // 2
-        
-        def get_max_energy(target_freq):
-            bin_center = int(target_freq * n / sample_rate)
-            bin_start = max(0, bin_center - neighborhood)
-            bin_end = min(max_bin, bin_center + neighborhood + 1)
-            return np.max(magnitudes[bin_start:bin_end])
-        
-        energy0 = get_max_energy(freq0)
-        energy1 = get_max_energy(freq1)
-        
-        bits.append(1 if energy1 > energy0 else 0)
-    
-    return bits
+    if timing is not None:
+        energies, _ = track_symbols(signal, (freq0, freq1), sample_rate, samples_per_bit, timing, start_index)
+        return decide_bits(energies, return_energies, soft)
+    frames = frame_signal(signal, samples_per_bit, start_index)
+    if backend == 'fft':
+        energies = fft_tone_energies(frames, (freq0, freq1), sample_rate)
+    elif backend == 'goertzel':
+        energies = goertzel_energies(frames, (freq0, freq1), sample_rate)
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+    return decide_bits(energies, return_energies, soft)
 
 
+def decide_bits(energies, return_energies=False, soft=False):
+    """
+    Bit decisions from per-bit tone energies, the last step of demodulate_fsk
+
+    Args:
+        energies (np.array): shape (n_bits, 2 or more) as [energy0, energy1, ...]
+        return_energies (bool): also return the energies
+        soft (bool): LLRs and a SoftQuality instead of hard bits
+
+    Returns:
+        list: hard bits, or np.array of LLRs and a SoftQuality with soft
+        np.array: (only if return_energies) the energies
+    """
+    if soft:
+        llrs, quality = bit_llrs(energies, return_quality=True)
+        return (llrs, quality, energies) if return_energies else (llrs, quality)
+    bits = (energies[:, 1] > energies[:, 0]).astype(np.uint8).tolist()
+    if return_energies:
+        return bits, energies
+    return bits
@@ -0,0 +1,307 @@
+# python/acoustic/link.py
+"""
+Link adaptation: pick the fastest (bit rate, M, FEC) profile the water allows.
+
+Every adaptive frame starts with the preamble and a short rate header sent at
+the most robust rate, so the receiver always knows how the rest of the frame
+was modulated:
+
+    [preamble][rate header][sync word][type][length][payload][crc]
+     base rate  base rate   ------- chosen profile, FEC coded -------
+
+The receiver measures the SNR from the demodulator's tone energies and checks
+the CRC; that LinkQuality goes back to the sender's LinkAdapter, which steps the
+profile up when there is margin and down as soon as frames start failing.
+"""
+from collections import namedtuple
+
+import numpy as np
+from scipy.signal import find_peaks
+
+from .constants import *
+from .correlation import PreambleCorrelator
+from .fec import coded_length, hamming74_decode, hamming74_encode
+from .mfsk import demodulate_mfsk, mfsk_tones, modulate_mfsk
+from .protocol import (CRC_SIZES, HEADER, PLAIN_TEXT_HEADER_TYPE, SYNC_WORD, PacketError, PacketParser,
+                       encode_packet_bits)
+
+LinkProfile = namedtuple('LinkProfile', ['bit_rate', 'M', 'fec'])
+LinkQuality = namedtuple('LinkQuality', ['rate_id', 'snr_db', 'crc_ok'])
+
+# slowest / most robust first, the index is the rate id sent in the rate header
+PROFILES = (
+    LinkProfile(10, 2, 'conv'),
+    LinkProfile(20, 2, 'hamming74'),
+    LinkProfile(40, 4, 'hamming74'),
+    LinkProfile(80, 4, None),
+    LinkProfile(120, 8, None),
+    LinkProfile(160, 16, None),
+)
+# lowest measured SNR (dB, per sample) at which each profile delivered >= 90% of
+# frames through the emulated saltwater channel with a 0.4 echo, from
+# Emulation/calibrate_link.py (100 frames per profile and distance); LinkAdapter
+# requires them non-decreasing
+PROFILE_MIN_SNR_DB = (-24.0, -20.0, -20.0, -16.0, -16.0, -16.0)
+SPACING_BINS = 2  # tone spacing in FFT bins of the symbol length
+BASE_FREQ = 1000
+RATE_HEADER_BITS = 14  # 4 bit rate id + its complement, Hamming(7,4) coded
+# preamble candidates tried by demodulate_adaptive: local correlation peaks within SYNC_TOLERANCE of the
+# best one and SYNC_SIGMAS times the rms score of white noise alone, 1 / sqrt(template length)
+SYNC_SIGMAS = 7.0
+SYNC_TOLERANCE = 0.75
+CODE_RATES = {None: 1.0, 'hamming74': 4 / 7, 'conv': 0.5}
+
+
+def net_bit_rate(profile):
+    """Payload bits per second a profile carries once FEC overhead is taken off"""
+    return profile.bit_rate * CODE_RATES[profile.fec]
+
+
+def _symbol_rate(profile):
+    return profile.bit_rate / np.log2(profile.M)
+
+
+def profile_tones(profile, sample_rate=SAMPLE_RATE, base_freq=BASE_FREQ):
+    """Tone frequencies a profile uses, see mfsk_tones"""
+    return mfsk_tones(profile.M, base_freq, _symbol_rate(profile), sample_rate, SPACING_BINS)
+
+
+def encode_rate_header(rate_id):
+    """Rate id -> the 14 header bits"""
+    if not 0 <= rate_id < 16:
+        raise ValueError(f"rate id must fit in 4 bits, got {rate_id}")
+    nibble = (rate_id >> np.arange(3, -1, -1)) & 1
+    return hamming74_encode(np.concatenate((nibble, 1 - nibble)))
+
+
+def decode_rate_header(bits):
+    """
+    The 14 header bits -> rate id
+
+    Raises:
+        PacketError: the id and its complement disagree after error correction
+    """
+    nibble, check = np.split(hamming74_decode(np.asarray(bits, dtype=np.uint8)), 2)
+    if np.any(nibble == check):
+        raise PacketError("rate header failed its check")
+    return int(nibble @ (1 << np.arange(3, -1, -1)))
+
+
+def estimate_snr_db(energies, samples_per_symbol):
+    """
+    Per-sample SNR from the unwindowed tone magnitudes of orthogonal FSK symbols
+
+    The strongest tone of a symbol holds the signal plus its share of noise, the
+    other tones only noise. For an N sample DFT a tone of amplitude A has power
+    (A N / 2)^2 and white noise of variance s^2 has N s^2 per bin, so the per-sample
+    SNR (A^2 / 2) / s^2 is the bin power ratio times 2 / N, the same whatever the
+    profile.
+
+    Args:
+        energies (np.array): tone magnitudes, shape (n_symbols, M)
+        samples_per_symbol (int): DFT length behind the magnitudes
+
+    Returns:
+        float: SNR in dB, None without any symbols
+    """
+    power = np.asarray(energies, dtype=np.float64) ** 2
+    if power.size == 0:
+        return None
+    peak = power.max(axis=1)
+    noise = (power.sum(axis=1) - peak) / (power.shape[1] - 1)
+    noise_mean = max(noise.mean(), 1e-30)
+    signal_mean = max(peak.mean() - noise_mean, 1e-30)
+    return float(10 * np.log10(signal_mean / noise_mean * 2 / samples_per_symbol))
+
+
+def modulate_adaptive(payload, rate_id, sample_rate=SAMPLE_RATE, base_freq=BASE_FREQ,
+                      message_type=PLAIN_TEXT_HEADER_TYPE, crc='crc16', preamble=PREAMBLE, profiles=PROFILES):
+    """
+    Builds an adaptive frame: preamble and rate header at the base rate, the packet at profiles[rate_id]
+
+    Args:
+        payload (bytes or str): message, str is sent as UTF-8
+        rate_id (int): index into profiles
+        sample_rate (int): Sampling rate in Hz
+        base_freq (float): lowest tone in Hz
+        message_type (int): packet type byte
+        crc (str): 'crc16' or 'crc32'
+        preamble (list): preamble bits
+        profiles (tuple): LinkProfile table shared with the receiver
+
+    Returns:
+        np.array: audio signal
+    """
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    base, profile = profiles[0], profiles[rate_id]
+    header = np.concatenate((np.asarray(preamble, dtype=np.uint8), encode_rate_header(rate_id)))
+    body = encode_packet_bits(payload, message_type, crc, profile.fec)
+    return np.concatenate((
+        modulate_mfsk(header, 2, sample_rate, base_freq, base.bit_rate, SPACING_BINS),
+        modulate_mfsk(body, profile.M, sample_rate, base_freq, _symbol_rate(profile), SPACING_BINS),
+    ))
+
+
+def adaptive_correlator(sample_rate=SAMPLE_RATE, base_freq=BASE_FREQ, preamble=PREAMBLE, profiles=PROFILES,
+                        threshold=0.5):
+    """PreambleCorrelator for the base rate tones adaptive frames start with"""
+    freq0, freq1 = profile_tones(LinkProfile(profiles[0].bit_rate, 2, None), sample_rate, base_freq)
+    return PreambleCorrelator(preamble, sample_rate, freq0, freq1, profiles[0].bit_rate, threshold)
+
+
+def _preamble_candidates(signal, sample_rate, base_freq, preamble, profiles):
+    # at the base rate the rate header and body use the preamble's tones, so the correlation has
+    # near-equal peaks a few bits either side of the real one (the alternating preamble continues
+    # into some headers), and near the noise floor a run of data can outscore the preamble itself;
+    # list every local peak close to the best, in time order
+    correlator = adaptive_correlator(sample_rate, base_freq, preamble, profiles, threshold=0.0)
+    threshold = SYNC_SIGMAS / np.sqrt(len(correlator.template))
+    scores = correlator.correlate(signal)
+    if len(scores) == 0 or scores.max() < threshold:
+        return []
+    base_samples = int(sample_rate / profiles[0].bit_rate)
+    peaks, _ = find_peaks(scores, height=max(threshold, SYNC_TOLERANCE * scores.max()),
+                          distance=max(base_samples // 2, 1))
+    return peaks.tolist()
+
+
+def demodulate_adaptive(signal, start_index=None, sample_rate=SAMPLE_RATE, base_freq=BASE_FREQ, crc='crc16',
+                        preamble=PREAMBLE, profiles=PROFILES):
+    """
+    Decodes one adaptive frame and measures the link
+
+    Args:
+        signal (np.array): audio holding the frame
+        start_index (int): first sample of the preamble, None to search for it
+        sample_rate (int): Sampling rate in Hz
+        base_freq (float): lowest tone in Hz
+        crc (str): 'crc16' or 'crc32'
+        preamble (list): preamble bits
+        profiles (tuple): LinkProfile table shared with the sender
+
+    Returns:
+        tuple: (message_type, payload), or None if the frame didn't decode
+        LinkQuality: rate id (None if the rate header failed), SNR and CRC result, to feed back to the sender
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    base = profiles[0]
+    base_samples = int(sample_rate / base.bit_rate)
+    if start_index is None:
+        starts = _preamble_candidates(signal, sample_rate, base_freq, preamble, profiles)
+        if not starts:
+            return None, LinkQuality(None, None, False)
+    else:
+        starts = [start_index]
+
+    # the first candidate whose rate header passes its check is the frame, a shifted match reads
+    # part of the preamble as the header and fails
+    first_snr = None
+    for start in starts:
+        header_start = start + len(preamble) * base_samples
+        header_bits, header_energies = demodulate_mfsk(signal[:header_start + RATE_HEADER_BITS * base_samples], 2,
+                                                       sample_rate, base_freq, base.bit_rate, SPACING_BINS,
+                                                       header_start, return_energies=True)
+        header_snr = estimate_snr_db(header_energies, base_samples)
+        if first_snr is None:
+            first_snr = header_snr
+        if len(header_bits) < RATE_HEADER_BITS:
+            continue
+        try:
+            rate_id = decode_rate_header(header_bits)
+            profile = profiles[rate_id]
+            break
+        except (PacketError, IndexError):
+            continue
+    else:
+        return None, LinkQuality(None, first_snr, False)
+
+    symbol_rate = _symbol_rate(profile)
+    bits, energies = demodulate_mfsk(signal, profile.M, sample_rate, base_freq, symbol_rate, SPACING_BINS,
+                                     header_start + RATE_HEADER_BITS * base_samples, return_energies=True)
+    parser = PacketParser(crc=crc, fec=profile.fec)
+    packets = parser.feed(bits)
+    if packets:
+        # only the symbols of this frame count towards its SNR, not whatever follows it
+        frame_bits = (len(SYNC_WORD) * 8 + coded_length((HEADER.size - len(SYNC_WORD)) * 8, profile.fec)
+                      + coded_length((len(packets[0][1]) + CRC_SIZES[crc]) * 8, profile.fec))
+        energies = energies[:-(-frame_bits // int(np.log2(profile.M)))]
+    snr_db = estimate_snr_db(energies, int(sample_rate / symbol_rate))
+    return (packets[0] if packets else None), LinkQuality(rate_id, snr_db, bool(packets))
+
+
+class LinkAdapter:
+    """
+    Sender side rate control from the receiver's LinkQuality reports
+
+    The SNR is smoothed over reports; the sender moves up one profile at a time
+    after `patience` reports with enough margin for the next profile, and drops
+    straight to what the SNR supports (at least one profile) on a CRC failure.
+    """
+
+    def __init__(self, profiles=PROFILES, min_snr_db=PROFILE_MIN_SNR_DB, margin_db=3.0, smoothing=0.3,
+                 patience=2, rate_id=0):
+        """
+        Args:
+            profiles (tuple): LinkProfile table, slowest first
+            min_snr_db (tuple): calibrated SNR each profile needs, non-decreasing, see
+                Emulation/calibrate_link.py
+            margin_db (float): headroom kept above min_snr_db
+            smoothing (float): weight of the newest SNR report (0-1)
+            patience (int): good reports needed before stepping up
+            rate_id (int): profile to start on
+        """
+        if len(min_snr_db) != len(profiles):
+            raise ValueError(f"{len(min_snr_db)} SNR thresholds for {len(profiles)} profiles")
+        if np.any(np.diff(min_snr_db) < 0):
+            raise ValueError(f"SNR thresholds must not decrease from one profile to the next, got {tuple(min_snr_db)}")
+        self.profiles = profiles
+        self.min_snr_db = np.asarray(min_snr_db, dtype=np.float64)
+        self.margin_db = margin_db
+        self.smoothing = smoothing
+        self.patience = patience
+        self.rate_id = rate_id
+        self.snr_db = None
+        self._good = 0
+
+    @property
+    def profile(self):
+        return self.profiles[self.rate_id]
+
+    def supported(self):
+        """Fastest profile the smoothed SNR supports with margin"""
+        if self.snr_db is None:
+            return 0
+        ok = np.flatnonzero(self.min_snr_db + self.margin_db <= self.snr_db)
+        return int(ok[-1]) if len(ok) else 0
+
+    def update(self, quality):
+        """
+        Takes one receiver report and picks the profile for the next frame
+
+        Args:
+            quality (LinkQuality): from demodulate_adaptive
+
+        Returns:
+            int: rate id to send the next frame with
+        """
+        if quality.snr_db is not None:
+            if self.snr_db is None:
+                self.snr_db = quality.snr_db
+            else:
+                self.snr_db += self.smoothing * (quality.snr_db - self.snr_db)
+        target = self.supported()
+        if not quality.crc_ok:
+            self._good = 0
+            self.rate_id = min(target, max(self.rate_id - 1, 0))
+        elif target < self.rate_id:
+            self._good = 0
+            self.rate_id = target
+        elif target > self.rate_id:
+            self._good += 1
+            if self._good >= self.patience:
+                self._good = 0
+                self.rate_id += 1
+        else:
+            self._good = 0
+        return self.rate_id
@@ -0,0 +1,125 @@
+# python/acoustic/mfsk.py
+"""
+M-ary FSK: log2(M) bits per symbol on one of M tones.
+
+Tones sit on FFT bins of the symbol length, spaced by a whole number of bins
+(1 bin = 1 / symbol duration), so they are orthogonal over a symbol and the
+demodulator can read them straight out of an unwindowed rfft. Symbols are Gray
+coded, so mistaking a tone for its neighbour only costs one bit.
+"""
+import numpy as np
+
+from .fsk import FRAME_BATCH, _fsk_waveform, _prepare_output, frame_signal
+
+
+def gray_encode(values):
+    """Binary -> Gray code"""
+    values = np.asarray(values)
+    return values ^ (values >> 1)
+
+
+def gray_decode(codes):
+    """Gray code -> binary"""
+    values = np.array(codes, copy=True)
+    shift = values >> 1
+    while np.any(shift):
+        values ^= shift
+        shift >>= 1
+    return values
+
+
+def _bits_per_symbol(M):
+    k = int(M).bit_length() - 1
+    if M < 2 or (1 << k) != M:
+        raise ValueError(f"M must be a power of two >= 2, got {M}")
+    return k
+
+
+def mfsk_tones(M, base_freq, symbol_rate, sample_rate=44100, spacing_bins=1):
+    """
+    Orthogonal tone set for an MFSK symbol
+
+    Args:
+        M (int): number of tones, a power of two
+        base_freq (float): lowest tone in Hz, snapped to the nearest FFT bin
+        symbol_rate (float): symbols per second
+        sample_rate (int): Sampling rate in Hz
+        spacing_bins (int): tone spacing in FFT bins (1 bin = symbol_rate Hz for whole-sample symbols)
+
+    Returns:
+        np.array: M tone frequencies in Hz, ascending
+    """
+    samples_per_symbol = int(sample_rate / symbol_rate)
+    bin_width = sample_rate / samples_per_symbol
+    first_bin = int(round(base_freq / bin_width))
+    bins = first_bin + spacing_bins * np.arange(M)
+    if bins[-1] >= samples_per_symbol // 2:
+        raise ValueError(f"{M} tones from {base_freq} Hz exceed Nyquist at {sample_rate} Hz")
+    return bins * bin_width
+
+
+def modulate_mfsk(bits, M=4, sample_rate=44100, base_freq=1000, symbol_rate=10, spacing_bins=1,
+                  phase_continuous=False, dtype=np.float64, out=None):
+    """
+    Modulates bits into an MFSK audio signal, log2(M) bits per symbol
+
+    Args:
+        bits (array): Array of 0s and 1s, zero padded to a whole number of symbols
+        M (int): number of tones (4, 8, 16, ...)
+        sample_rate (int): Sampling rate in Hz
+        base_freq (float): lowest tone in Hz
+        symbol_rate (float): symbols per second
+        spacing_bins (int): tone spacing in FFT bins
+        phase_continuous (bool): Keep the phase continuous between symbols
+        dtype (np.dtype): Output sample type
+        out (np.array): Optional preallocated buffer
+
+    Returns:
+        np.array: Generated audio signal
+    """
+    k = _bits_per_symbol(M)
+    tones = mfsk_tones(M, base_freq, symbol_rate, sample_rate, spacing_bins)
+    bits = np.asarray(bits, dtype=np.int64).ravel()
+    bits = np.concatenate((bits, np.zeros(-len(bits) % k, dtype=np.int64)))
+    values = bits.reshape(-1, k) @ (1 << np.arange(k - 1, -1, -1))
+    # tone i carries the bits gray_encode(i)
+    freqs = tones[gray_decode(values)]
+    samples_per_symbol = int(sample_rate / symbol_rate)
+    out = _prepare_output((len(freqs) * samples_per_symbol,), dtype, out)
+    return _fsk_waveform(freqs, samples_per_symbol, 1 / symbol_rate, phase_continuous, out)
+
+
+def demodulate_mfsk(signal, M=4, sample_rate=44100, base_freq=1000, symbol_rate=10, spacing_bins=1,
+                    start_index=0, return_energies=False):
+    """
+    Demodulates an MFSK signal by picking the strongest of the M tone bins per symbol
+
+    Args:
+        signal (np.array): Audio signal to demodulate
+        M (int): number of tones
+        sample_rate (int): Sampling rate in Hz
+        base_freq (float): lowest tone in Hz
+        symbol_rate (float): symbols per second
+        spacing_bins (int): tone spacing in FFT bins
+        start_index (int): Sample index to start decoding from
+        return_energies (bool): Also return the per-symbol tone magnitudes
+
+    Returns:
+        np.array: uint8 demodulated bits, log2(M) per symbol
+        np.array: (only if return_energies) shape (n_symbols, M)
+    """
+    k = _bits_per_symbol(M)
+    tones = mfsk_tones(M, base_freq, symbol_rate, sample_rate, spacing_bins)
+    samples_per_symbol = int(sample_rate / symbol_rate)
+    frames = frame_signal(signal, samples_per_symbol, start_index)
+    bins = np.rint(tones * samples_per_symbol / sample_rate).astype(np.int64)
+
+    # no window: the tones are orthogonal over a symbol, so each lands in its own bin
+    energies = np.empty((len(frames), M))
+    for i in range(0, len(frames), FRAME_BATCH):
+        energies[i:i + FRAME_BATCH] = np.abs(np.fft.rfft(frames[i:i + FRAME_BATCH], axis=1)[:, bins])
+    values = gray_encode(energies.argmax(axis=1))
+    bits = ((values[:, None] >> np.arange(k - 1, -1, -1)) & 1).astype(np.uint8).ravel()
+    if return_energies:
+        return bits, energies
+    return bits
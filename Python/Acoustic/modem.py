@@ -0,0 +1,273 @@
+# python/acoustic/modem.py
+"""
+FSKModem: a binary FSK configuration checked and planned once, then reused.
+
+Like an FFT "plan", building the modem does all of the setup (symbol length,
+window, FFT bin indices or tone-bank kernel, preamble template, receive
+filter or baseband front end) and the modulate / demodulate / sync calls
+only run the numerics. Sender and receiver built from the same config (see
+FSKModem.config) agree on every parameter, and a config that can't work,
+e.g. tones on the same FFT bin or above Nyquist, is rejected up front.
+"""
+import numpy as np
+from scipy.signal import find_peaks, sosfilt
+
+from .baseband import BasebandConverter
+from .constants import *
+from .correlation import PreambleCorrelator
+from .fsk import FRAME_BATCH, _hanning, decide_bits, frame_signal, modulate_fsk, modulate_fsk_batch, tone_bins
+from .goertzel import _real_tone_bank, tone_bank
+from .signal_filters import butter_bandpass_sos
+
+# sync() takes the earliest correlation peak scoring at least this fraction of the best one
+SYNC_TOLERANCE = 0.9
+
+
+class FSKModem:
+    """
+    Binary FSK modem with its setup precomputed
+
+    Usage:
+        modem = FSKModem(88200, 650, 41000, 39000, preamble, decimation=15)
+        tx = modem.modulate(bits)
+        rx = modem.filter(received)
+        start = modem.sync(rx)
+        bits = modem.demodulate(rx, start)
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, bit_rate=1 / DURATION, freq0=FREQ0, freq1=FREQ1, preamble=PREAMBLE,
+                 control_tones=(), backend='goertzel', neighborhood=2, guard_band=100, filter_order=5,
+                 decimation=None, threshold=0.7):
+        """
+        Args:
+            sample_rate (int): Sampling rate in Hz
+            bit_rate (float): bits per second
+            freq0 (float): Frequency for 0 bits
+            freq1 (float): Frequency for 1 bits
+            preamble (list): preamble bits, sent ahead of every modulate() and searched for by sync()
+            control_tones (tuple): extra tones measured by tone_energies, e.g. (FREQ_START, FREQ_STOP)
+            backend (str): 'goertzel' (exact tones) or 'fft' (peak of the bins around each tone)
+            neighborhood (int): bins either side of each tone the 'fft' backend checks, 2 as in
+                demodulate_fsk, 0 for the nearest bin only
+            guard_band (float): Hz either side of the tones kept by the receive bandpass
+            filter_order (int): order of the receive bandpass
+            decimation (int): None filters at the full rate, otherwise the receive side runs on
+                complex baseband decimated by this much (see baseband.py)
+            threshold (float): normalised preamble correlation sync() accepts
+        """
+        self.sample_rate = sample_rate
+        self.bit_rate = bit_rate
+        self.freq0, self.freq1 = float(freq0), float(freq1)
+        self.preamble = tuple(int(b) for b in preamble)
+        self.control_tones = tuple(float(f) for f in control_tones)
+        self.backend = backend
+        self.neighborhood = neighborhood
+        self.guard_band = guard_band
+        self.filter_order = filter_order
+        self.decimation = decimation
+        self.threshold = threshold
+        self._validate()
+
+        self.samples_per_bit = int(sample_rate / bit_rate)
+        self.tones = (self.freq0, self.freq1) + self.control_tones
+        self.band = (min(self.tones) - guard_band, max(self.tones) + guard_band)
+
+        # receive side: everything after filter() runs at rx_rate on rx_tones
+        self.front_end = None
+        self.sos = None
+        if decimation is None:
+            self.sos = butter_bandpass_sos(self.band[0], self.band[1], sample_rate, filter_order).copy()
+            self.rx_rate, self.rx_tones = sample_rate, self.tones
+        else:
+            center = (self.freq0 + self.freq1) / 2
+            self.front_end = BasebandConverter(center, sample_rate, decimation)
+            self.rx_rate = self.front_end.output_rate
+            self.rx_tones = tuple(f - center for f in self.tones)
+        self.rx_samples_per_bit = int(self.rx_rate / bit_rate)
+        self._check_rx_tones()
+
+        n = self.rx_samples_per_bit
+        iq = self.front_end is not None
+        if backend == 'fft':
+            self.window = _hanning(n)
+            self.bins = tone_bins(self.rx_tones, n, self.rx_rate, neighborhood, two_sided=iq)
+            self._transform = np.fft.fft if iq else np.fft.rfft
+        else:
+            self.kernel = (tone_bank if iq else _real_tone_bank)(self.rx_tones, n, self.rx_rate, 'hanning')
+        self.correlator = PreambleCorrelator(self.preamble, sample_rate, self.freq0, self.freq1, bit_rate, threshold,
+                                             front_end=self.front_end)
+        self.template = self.correlator.template
+
+    @property
+    def config(self):
+        """The constructor arguments, FSKModem(**modem.config) builds the same modem"""
+        return dict(sample_rate=self.sample_rate, bit_rate=self.bit_rate, freq0=self.freq0, freq1=self.freq1,
+                    preamble=list(self.preamble), control_tones=self.control_tones, backend=self.backend,
+                    neighborhood=self.neighborhood, guard_band=self.guard_band, filter_order=self.filter_order,
+                    decimation=self.decimation, threshold=self.threshold)
+
+    def __repr__(self):
+        return f"FSKModem({', '.join(f'{k}={v!r}' for k, v in self.config.items())})"
+
+    # ==============================
+    # Validation
+    # ==============================
+    def _validate(self):
+        if self.backend not in ('goertzel', 'fft'):
+            raise ValueError(f"Unknown backend: {self.backend}")
+        if self.sample_rate <= 0 or self.bit_rate <= 0:
+            raise ValueError(f"sample_rate and bit_rate must be positive, got {self.sample_rate} and {self.bit_rate}")
+        if int(self.sample_rate / self.bit_rate) < 2:
+            raise ValueError(f"bit rate {self.bit_rate} leaves less than 2 samples per bit at {self.sample_rate} Hz")
+        if not self.preamble or any(b not in (0, 1) for b in self.preamble):
+            raise ValueError(f"preamble must be a non-empty list of 0/1 bits, got {list(self.preamble)}")
+        tones = (self.freq0, self.freq1) + self.control_tones
+        nyquist = self.sample_rate / 2
+        for freq in tones:
+            if not self.guard_band < freq < nyquist - self.guard_band:
+                raise ValueError(f"tone {freq} Hz plus the {self.guard_band} Hz guard band doesn't fit between 0 and "
+                                 f"Nyquist ({nyquist} Hz)")
+        if self.decimation is not None and int(self.sample_rate / self.bit_rate) % self.decimation:
+            raise ValueError(f"decimation {self.decimation} doesn't divide the {int(self.sample_rate / self.bit_rate)} "
+                             f"samples per bit")
+
+    def _check_rx_tones(self):
+        # tones must be told apart at the rate and symbol length the detector sees
+        n, rate = self.rx_samples_per_bit, self.rx_rate
+        resolution = rate / n
+        if self.front_end is not None:
+            edge = self.front_end.bandwidth / 2
+            outside = [f for f, rx in zip(self.tones, self.rx_tones) if abs(rx) >= edge]
+            if outside:
+                raise ValueError(f"tone(s) {outside} Hz outside the {self.front_end.bandwidth:.0f} Hz baseband passband, "
+                                 f"use a smaller decimation")
+        order = np.argsort(self.rx_tones)
+        tones = np.asarray(self.rx_tones)[order]
+        gaps = np.diff(tones)
+        # fft compares the peaks of 2 * neighborhood + 1 bin ranges, which must not overlap
+        min_gap = resolution * (2 * self.neighborhood + 1 if self.backend == 'fft' else 1)
+        for i in np.flatnonzero(gaps < min_gap):
+            a, b = np.asarray(self.tones)[order[i:i + 2]]
+            hint = ", use backend='goertzel'" if self.backend == 'fft' and gaps[i] >= resolution else ""
+            raise ValueError(f"tones {a} and {b} Hz are {gaps[i]:.0f} Hz apart, the {self.backend} detector needs "
+                             f"{min_gap:.0f} Hz at {n} samples per bit{hint}")
+
+    # ==============================
+    # Transmit
+    # ==============================
+    def modulate(self, bits, preamble=True, phase_continuous=False, dtype=np.float64):
+        """
+        Modulates bits, one signal per row for a 2D (n_signals, n_bits) array
+
+        Args:
+            bits (array): 0s and 1s
+            preamble (bool): send the preamble first
+            phase_continuous (bool): CPFSK, see modulate_fsk
+            dtype (np.dtype): output sample type
+
+        Returns:
+            np.array: audio at sample_rate
+        """
+        bits = np.asarray(bits, dtype=np.uint8)
+        if preamble:
+            head = np.broadcast_to(self.preamble, bits.shape[:-1] + (len(self.preamble),))
+            bits = np.concatenate((head, bits), axis=-1)
+        modulate = modulate_fsk_batch if bits.ndim == 2 else modulate_fsk
+        return modulate(bits, self.sample_rate, self.freq0, self.freq1, self.bit_rate, phase_continuous, dtype)
+
+    # ==============================
+    # Receive
+    # ==============================
+    def filter(self, signal):
+        """
+        Receive front end: bandpass at sample_rate, or complex baseband at rx_rate with decimation
+
+        Args:
+            signal (np.array): received audio, shape (n,) or (n_signals, n)
+
+        Returns:
+            np.array: what sync() and demodulate() expect
+        """
+        if self.front_end is not None:
+            return self.front_end.convert(signal)
+        return sosfilt(self.sos, signal)
+
+    def tone_energies(self, frames):
+        """
+        Tone magnitudes per frame, columns in the order of self.tones
+
+        Args:
+            frames (np.array): shape (n_frames, rx_samples_per_bit), output of filter() framed per bit
+
+        Returns:
+            np.array: shape (n_frames, n_tones)
+        """
+        frames = np.atleast_2d(frames)
+        if frames.shape[-1] != self.rx_samples_per_bit:
+            raise ValueError(f"frames of {frames.shape[-1]} samples, the modem was planned for "
+                             f"{self.rx_samples_per_bit}")
+        n_tones = len(self.tones)
+        if self.backend == 'goertzel':
+            if self.front_end is not None:
+                return np.abs(frames @ self.kernel)
+            parts = frames @ self.kernel
+            return np.hypot(parts[:, :n_tones], parts[:, n_tones:])
+        energies = np.empty((len(frames), n_tones))
+        for i in range(0, len(frames), FRAME_BATCH):
+            spectrum = np.abs(self._transform(frames[i:i + FRAME_BATCH] * self.window, axis=1))
+            energies[i:i + FRAME_BATCH] = spectrum[:, self.bins].max(axis=-1)
+        return energies
+
+    def demodulate(self, signal, start_index=0, return_energies=False, soft=False):
+        """
+        Bits from a received signal, sliced at fixed offsets from start_index
+
+        Args:
+            signal (np.array): output of filter()
+            start_index (int): first sample of the data, e.g. from sync()
+            return_energies (bool): also return the tone magnitudes
+            soft (bool): LLRs and a SoftQuality instead of hard bits, see soft.py
+
+        Returns:
+            list: demodulated bits (with soft: np.array of LLRs, then a SoftQuality)
+            np.array: (only if return_energies) shape (n_bits, n_tones)
+        """
+        energies = self.tone_energies(frame_signal(signal, self.rx_samples_per_bit, start_index))
+        return decide_bits(energies, return_energies, soft)
+
+    def find_preambles(self, signal):
+        """Every preamble in a filter()ed signal, (start_index, score) per peak"""
+        return self.correlator.find(signal)
+
+    def sync(self, signal):
+        """
+        First data sample after the first preamble in a filter()ed signal
+
+        Data that repeats the preamble correlates as well as the preamble itself, so
+        rather than the strongest peak this takes the earliest local peak within
+        SYNC_TOLERANCE of it. For a raw bit stream that is only a guess: if the real
+        preamble is faded or cut off, a copy of it in the data wins. Send framed
+        packets (protocol.py's sync word and CRC) where that matters.
+
+        Returns:
+            int: sample index to demodulate from, None if no preamble scored above threshold
+        """
+        scores = self.correlator.correlate(signal)
+        if len(scores) == 0 or scores.max() < self.threshold:
+            return None
+        height = max(self.threshold, SYNC_TOLERANCE * scores.max())
+        # padded so a peak on the first or last position still counts as one
+        padded = np.concatenate(([-np.inf], scores, [-np.inf]))
+        peaks, _ = find_peaks(padded, height=height, distance=max(self.rx_samples_per_bit // 2, 1))
+        return int(peaks[0]) - 1 + len(self.preamble) * self.rx_samples_per_bit
+
+    def receive(self, signal):
+        """
+        filter -> sync -> demodulate for one received signal
+
+        Returns:
+            list: bits after the preamble, empty if none was found
+        """
+        filtered = self.filter(signal)
+        start = self.sync(filtered)
+        return [] if start is None else self.demodulate(filtered, start)
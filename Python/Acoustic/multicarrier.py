@@ -0,0 +1,108 @@
+# python/acoustic/multicarrier.py
+"""
+Multi-carrier FSK: the bit stream is split across N independent freq0/freq1
+subchannels that are transmitted at the same time, so throughput scales with
+the number of carriers instead of with ever shorter symbols.
+"""
+import numpy as np
+
+from .fsk import _fsk_waveform, _prepare_output, fft_tone_energies, frame_signal
+
+
+def carrier_pairs(n_carriers, base_freq, bit_rate, sample_rate=44100, spacing_bins=2):
+    """
+    Evenly spaced (freq0, freq1) pairs on FFT bins of the symbol length
+
+    With the demodulator's hanning window an on-bin tone leaks only into its
+    neighbouring bin, so tones 2 bins apart don't interfere.
+
+    Args:
+        n_carriers (int): number of subchannels
+        base_freq (float): lowest tone in Hz, snapped to the nearest FFT bin
+        bit_rate (float): bits per second on each carrier
+        sample_rate (int): Sampling rate in Hz
+        spacing_bins (int): distance between neighbouring tones in FFT bins
+
+    Returns:
+        list: [(freq0, freq1), ...] one pair per carrier
+    """
+    samples_per_bit = int(sample_rate / bit_rate)
+    bin_width = sample_rate / samples_per_bit
+    first_bin = int(round(base_freq / bin_width))
+    bins = first_bin + spacing_bins * np.arange(2 * n_carriers)
+    if bins[-1] >= samples_per_bit // 2:
+        raise ValueError(f"{n_carriers} carriers from {base_freq} Hz exceed Nyquist at {sample_rate} Hz")
+    freqs = bins * bin_width
+    return [(float(freqs[2 * c]), float(freqs[2 * c + 1])) for c in range(n_carriers)]
+
+
+def modulate_multicarrier_fsk(bits, carriers, sample_rate=44100, bit_rate=10, phase_continuous=False,
+                              dtype=np.float64, out=None):
+    """
+    Modulates bits onto several FSK subchannels summed into one waveform
+
+    Bits are dealt round robin: bit i goes on carrier i % N, so each symbol
+    period carries N bits.
+
+    Args:
+        bits (array): Array of 0s and 1s, zero padded to a multiple of N
+        carriers (list): (freq0, freq1) per subchannel
+        sample_rate (int): Sampling rate in Hz
+        bit_rate (float): symbols per second on each carrier
+        phase_continuous (bool): Keep each carrier's phase continuous between symbols
+        dtype (np.dtype): Output sample type
+        out (np.array): Optional preallocated buffer
+
+    Returns:
+        np.array: Generated audio signal, peak amplitude at most 1
+    """
+    carriers = np.asarray(carriers, dtype=np.float64)
+    n_carriers = len(carriers)
+    bits = np.asarray(bits, dtype=np.uint8).ravel()
+    bits = np.concatenate((bits, np.zeros(-len(bits) % n_carriers, dtype=np.uint8)))
+    # (n_carriers, n_symbols) tone per carrier per symbol
+    symbols = bits.reshape(-1, n_carriers).T
+    freqs = np.where(symbols != 0, carriers[:, 1:2], carriers[:, 0:1])
+    samples_per_bit = int(sample_rate / bit_rate)
+    waves = _fsk_waveform(freqs, samples_per_bit, 1 / bit_rate, phase_continuous,
+                          np.empty((n_carriers, freqs.shape[1] * samples_per_bit)))
+    out = _prepare_output((waves.shape[1],), dtype, out)
+    np.sum(waves, axis=0, out=out, dtype=out.dtype)
+    out /= n_carriers
+    return out
+
+
+def demodulate_multicarrier_fsk(signal, carriers, sample_rate=44100, bit_rate=10, start_index=0,
+                                neighborhood=0, normalize=True, return_energies=False):
+    """
+    Recovers every subchannel from a single FFT per symbol period
+
+    Args:
+        signal (np.array): Audio signal to demodulate
+        carriers (list): (freq0, freq1) per subchannel
+        sample_rate (int): Sampling rate in Hz
+        bit_rate (float): symbols per second on each carrier
+        start_index (int): Sample index to start decoding from
+        neighborhood (int): bins checked either side of each tone, keep below half the tone spacing
+        normalize (bool): scale each carrier's energies by its average symbol peak (the stronger
+            tone of each symbol), so carriers that lost different amounts (e.g. to absorption)
+            compare in the returned energies; the bits don't depend on it, whatever the data
+        return_energies (bool): Also return the tone energies
+
+    Returns:
+        np.array: uint8 bits in the original order, N per symbol
+        np.array: (only if return_energies) shape (n_symbols, n_carriers, 2) as [energy0, energy1]
+    """
+    carriers = np.asarray(carriers, dtype=np.float64)
+    samples_per_bit = int(sample_rate / bit_rate)
+    frames = frame_signal(signal, samples_per_bit, start_index)
+    energies = fft_tone_energies(frames, carriers.ravel(), sample_rate, neighborhood)
+    energies = energies.reshape(len(frames), len(carriers), 2)
+    if normalize and len(energies):
+        # both tones of a carrier share one scale: a per-tone scale would assume balanced 0s and 1s
+        level = energies.max(axis=2).mean(axis=0)
+        energies = energies / np.where(level > 0, level, 1.0)[:, None]
+    bits = (energies[..., 1] > energies[..., 0]).astype(np.uint8).ravel()
+    if return_energies:
+        return bits, energies
+    return bits
@@ -1,15 +1,412 @@
+"""
+Audio I/O: tone synthesis and pluggable backends
+
+A backend is where samples go to and come from. Senders and receivers take one
+as an argument, so the same code can drive a sound card (SoundDeviceBackend),
+replay or capture a WAV file (WavBackend) or talk to itself in-process through
+the emulated channel (LoopbackBackend) on a host with no audio hardware.
+
+Every backend hands out sounddevice-shaped streams: output streams have
+start()/write(frames)/close(), input streams call
+callback(indata, frames, time, status) with (frames, 1) blocks, so
+StreamingReceiver.callback and TransmitScheduler work with any of them.
+"""
+import queue
+import threading
+import time
+import wave
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
 import numpy as np
-import sounddevice as sd
+from scipy.io import wavfile
+try:
+    import sounddevice as sd
+except (ImportError, OSError):  # no sound card / PortAudio on headless hosts
+    sd = None
 from .constants import *
 
-#[todo]: for debugging
-def record_audio():
-    pass
-#[todo]: for debugging
-def play_audio():
-    pass
+BACKENDS = ('sounddevice', 'wav', 'loopback')
+
+
+def play_audio(signal, sample_rate=SAMPLE_RATE, backend=None):
+    """
+    Plays a signal and waits until it has been written
+
+    Args:
+        signal (np.array): samples, peak amplitude at most 1
+        sample_rate (int): Sampling rate in Hz
+        backend (AudioBackend): defaults to the sound card
+    """
+    (backend or get_backend()).play(signal, sample_rate)
+
+
+def record_audio(duration, sample_rate=SAMPLE_RATE, backend=None):
+    """
+    Records a fixed length of audio
+
+    Args:
+        duration (float): seconds
+        sample_rate (int): Sampling rate in Hz
+        backend (AudioBackend): defaults to the sound card
+
+    Returns:
+        np.array: float64 samples of the first channel
+    """
+    return (backend or get_backend()).record(duration, sample_rate)
+
+
+def get_backend(name='sounddevice', **kwargs):
+    """
+    Builds a backend by name
+
+    Args:
+        name (str): 'sounddevice', 'wav' or 'loopback'
+        **kwargs: passed on to the backend, e.g. path= for 'wav', channel= for 'loopback'
+    """
+    if name == 'sounddevice':
+        return SoundDeviceBackend(**kwargs)
+    if name == 'wav':
+        return WavBackend(**kwargs)
+    if name == 'loopback':
+        return LoopbackBackend(**kwargs)
+    raise ValueError(f"Unknown backend: {name}")
+
+
+def to_float(samples):
+    """PCM samples of any WAV sample type -> float64 in [-1, 1]"""
+    samples = np.asarray(samples)
+    if samples.dtype == np.uint8:
+        return (samples.astype(np.float64) - 128) / 128
+    if samples.dtype.kind == 'i':
+        return samples.astype(np.float64) / -float(np.iinfo(samples.dtype).min)
+    return samples.astype(np.float64)
+
+
+def read_wav(path):
+    """
+    Opens a WAV file without reading it into memory
+
+    Args:
+        path (str): WAV file
+
+    Returns:
+        int: sample rate
+        np.memmap: raw samples of the first channel, in the file's sample type
+    """
+    sample_rate, samples = wavfile.read(path, mmap=True)
+    if samples.ndim > 1:
+        samples = samples[:, 0]
+    return sample_rate, samples
+
+
+class AudioBackend(ABC):
+    """Interface every audio backend implements, a backend missing any of the abstract methods can't be built"""
+
+    @abstractmethod
+    def output_stream(self, sample_rate=SAMPLE_RATE, dtype=np.float32):
+        """Returns an unstarted output stream with start(), write(frames) and close()"""
+
+    @abstractmethod
+    def input_stream(self, callback, sample_rate=SAMPLE_RATE, block_size=None):
+        """Returns an unstarted input stream that calls callback(indata, frames, time, status) per block"""
+
+    def play(self, signal, sample_rate=SAMPLE_RATE):
+        stream = self.output_stream(sample_rate)
+        stream.start()
+        try:
+            stream.write(np.asarray(signal, dtype=np.float32).reshape(-1, 1))
+        finally:
+            stream.close()
+
+    @abstractmethod
+    def record(self, duration, sample_rate=SAMPLE_RATE):
+        """Blocks for duration seconds and returns the captured samples as a float array"""
+
+
+class SoundDeviceBackend(AudioBackend):
+    """The sound card, through sounddevice / PortAudio"""
+
+    def __init__(self, device=None, latency='low'):
+        """
+        Args:
+            device: sounddevice device id or name, None for the default
+            latency: sounddevice latency setting
+        """
+        self.device = device
+        self.latency = latency
+
+    def _sd(self):
+        if sd is None:
+            raise RuntimeError("sounddevice is not available, use the 'wav' or 'loopback' backend")
+        return sd
+
+    def output_stream(self, sample_rate=SAMPLE_RATE, dtype=np.float32):
+        return self._sd().OutputStream(samplerate=sample_rate, channels=1, dtype=np.dtype(dtype).name,
+                                       device=self.device, latency=self.latency)
+
+    def input_stream(self, callback, sample_rate=SAMPLE_RATE, block_size=None):
+        return self._sd().InputStream(samplerate=sample_rate, channels=1, blocksize=block_size or 0,
+                                      callback=callback, device=self.device, latency=self.latency)
+
+    def play(self, signal, sample_rate=SAMPLE_RATE):
+        self._sd().play(signal, samplerate=sample_rate, device=self.device)
+        sd.wait()
+
+    def record(self, duration, sample_rate=SAMPLE_RATE):
+        recording = self._sd().rec(int(duration * sample_rate), samplerate=sample_rate, channels=1,
+                                   device=self.device)
+        sd.wait()
+        return recording[:, 0].astype(np.float64)
+
+
+class _BlockFeeder:
+    """Input stream that pushes blocks from a generator into a callback on a background thread"""
+
+    def __init__(self, blocks, callback, pace=None):
+        self._blocks = blocks
+        self._callback = callback
+        self._pace = pace  # sample rate to play back at, None for as fast as possible
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def active(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='BlockFeeder', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for block in self._blocks(self._stop):
+            if self._stop.is_set():
+                break
+            self._callback(block.reshape(-1, 1), len(block), None, None)
+            if self._pace:
+                time.sleep(len(block) / self._pace)
+
+    def join(self, timeout=None):
+        """Waits for the source to run out (end of file), returns True if it has"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.active
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    close = stop
 
-def generate_tone(freq):
-    t = np.linspace(0, DURATION, int(SAMPLE_RATE * DURATION), endpoint=False)
+
+class _WavWriter:
+    """Output stream that appends 16 bit PCM to a WAV file chunk by chunk"""
+
+    def __init__(self, path, sample_rate):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._file = None
+
+    def start(self):
+        self._file = wave.open(self.path, 'wb')
+        self._file.setnchannels(1)
+        self._file.setsampwidth(2)
+        self._file.setframerate(int(self.sample_rate))
+
+    def write(self, frames):
+        pcm = np.clip(np.asarray(frames, dtype=np.float64).ravel(), -1.0, 1.0) * 32767
+        self._file.writeframes(pcm.astype('<i2').tobytes())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()  # patches the header with the final length
+            self._file = None
+
+
+class WavBackend(AudioBackend):
+    """
+    A WAV file instead of a sound card
+
+    Reads memory-map the file, so replaying a long field recording never loads it
+    whole. record() carries on from where the last call stopped. Writes stream
+    16 bit PCM to disk chunk by chunk.
+    """
+
+    def __init__(self, path, realtime=False):
+        """
+        Args:
+            path (str): file to read from / write to (writing replaces it)
+            realtime (bool): pace input streams at the file's sample rate instead of
+                feeding blocks as fast as the receiver takes them
+        """
+        self.path = path
+        self.realtime = realtime
+        self._position = 0
+
+    def _open(self, sample_rate):
+        file_rate, samples = read_wav(self.path)
+        if sample_rate is not None and file_rate != sample_rate:
+            raise ValueError(f"{self.path} is sampled at {file_rate} Hz, expected {sample_rate} Hz")
+        return file_rate, samples
+
+    def blocks(self, block_size, sample_rate=None):
+        """Yields float64 blocks of the file in order, the last one may be short"""
+        _, samples = self._open(sample_rate)
+        for start in range(0, len(samples), block_size):
+            yield to_float(samples[start:start + block_size])
+
+    def output_stream(self, sample_rate=SAMPLE_RATE, dtype=np.float32):
+        return _WavWriter(self.path, sample_rate)
+
+    def input_stream(self, callback, sample_rate=SAMPLE_RATE, block_size=None):
+        block_size = block_size or int(sample_rate * DURATION)
+        self._open(sample_rate)  # fail now on a rate mismatch, not on the feeder thread
+        return _BlockFeeder(lambda stop: self.blocks(block_size, sample_rate), callback,
+                            sample_rate if self.realtime else None)
+
+    def record(self, duration, sample_rate=SAMPLE_RATE):
+        _, samples = self._open(sample_rate)
+        n = int(duration * sample_rate)
+        chunk = to_float(samples[self._position:self._position + n])
+        self._position += len(chunk)
+        return np.pad(chunk, (0, n - len(chunk)))  # silence past the end of the file
+
+
+class _LoopbackWriter:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def start(self):
+        pass
+
+    def write(self, frames):
+        self._backend._put(frames)  # mono, so (frames, 1) flattens to the samples
+
+    def close(self):
+        pass
+
+
+class LoopbackBackend(AudioBackend):
+    """
+    In-process loopback: whatever is played comes back out of the input side
+
+    With a channel, played audio goes through a ChannelStream first, so a
+    sender and a receiver in one process see emulated attenuation, multipath
+    and noise, with the echo and the level continuous across written blocks.
+    """
+
+    def __init__(self, channel=None, rng=None, timeout=0.1):
+        """
+        Args:
+            channel (UnderwaterChannel): optional channel model applied to played audio
+            rng (np.random.Generator or int): channel noise source or seed
+            timeout (float): seconds record() and input streams wait for audio before giving up / polling again
+        """
+        self.channel = channel
+        self.rng = np.random.default_rng(rng)
+        self._channel_stream = channel.stream(self.rng) if channel is not None else None
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._pending = np.zeros(0)
+
+    def _put(self, samples):
+        samples = np.asarray(samples, dtype=np.float64).ravel()
+        if self._channel_stream is not None and len(samples):
+            samples = self._channel_stream.process(samples)
+        self._queue.put(samples)
+
+    def _take(self, n, stop=None):
+        """Up to n samples; fewer only if nothing more arrives within the timeout"""
+        parts, have = [self._pending], len(self._pending)
+        while have < n and not (stop is not None and stop.is_set()):
+            try:
+                samples = self._queue.get(timeout=self.timeout)
+            except queue.Empty:
+                if stop is None:
+                    break
+                continue
+            parts.append(samples)
+            have += len(samples)
+        samples = np.concatenate(parts)
+        self._pending = samples[n:]
+        return samples[:n]
+
+    def output_stream(self, sample_rate=SAMPLE_RATE, dtype=np.float32):
+        return _LoopbackWriter(self)
+
+    def play(self, signal, sample_rate=SAMPLE_RATE):
+        self._put(signal)
+
+    def input_stream(self, callback, sample_rate=SAMPLE_RATE, block_size=None):
+        block_size = block_size or int(sample_rate * DURATION)
+
+        def blocks(stop):
+            while not stop.is_set():
+                block = self._take(block_size, stop)
+                if len(block):
+                    yield block
+
+        return _BlockFeeder(blocks, callback)
+
+    def record(self, duration, sample_rate=SAMPLE_RATE):
+        n = int(duration * sample_rate)
+        samples = self._take(n)
+        return np.pad(samples, (0, n - len(samples)))
+
+
+@lru_cache(maxsize=128)
+def _cached_tone(freq, duration, sample_rate, amplitude, dtype):
+    t = np.linspace(0, duration, int(sample_rate * duration), endpoint=False)
     wave = np.sin(2 * np.pi * freq * t)
-    return wave
\ No newline at end of file
+    if amplitude != 1.0:
+        wave *= amplitude
+    wave = wave.astype(dtype, copy=False)
+    wave.flags.writeable = False
+    return wave
+
+
+def generate_tone(freq, duration=DURATION, sample_rate=SAMPLE_RATE, amplitude=1.0, dtype=np.float64):
+    """
+    One symbol's worth of sine wave, computed once and then served from a cache
+
+    A message only uses a handful of distinct tones, so after the first call
+    each symbol is a lookup instead of linspace + sin. The returned array is
+    shared and read-only, copy it before modifying.
+
+    Args:
+        freq (float): tone frequency in Hz, 0 gives silence
+        duration (float): seconds
+        sample_rate (int): Sampling rate in Hz
+        amplitude (float): peak amplitude
+        dtype (np.dtype): sample type, e.g. np.float32 for sound cards
+
+    Returns:
+        np.array: read-only waveform
+    """
+    return _cached_tone(float(freq), float(duration), int(sample_rate), float(amplitude), np.dtype(dtype))
+
+
+def assemble_symbols(symbols, sample_rate=SAMPLE_RATE, amplitude=1.0, dtype=np.float64, out=None):
+    """
+    Builds a whole transmission from cached symbol waveforms in a single copy
+
+    Args:
+        symbols (list): (freq, duration) per symbol, freq 0 for silence
+        sample_rate (int): Sampling rate in Hz
+        amplitude (float): peak amplitude
+        dtype (np.dtype): sample type
+        out (np.array): Optional preallocated buffer of exactly the total length
+
+    Returns:
+        np.array: the concatenated signal
+    """
+    tones = [generate_tone(freq, duration, sample_rate, amplitude, dtype) for freq, duration in symbols]
+    if not tones:
+        return np.zeros(0, dtype=dtype) if out is None else out
+    total = sum(len(tone) for tone in tones)
+    if out is None:
+        out = np.empty(total, dtype=dtype)
+    elif out.shape != (total,):
+        raise ValueError(f"out has shape {out.shape}, expected ({total},)")
+    return np.concatenate(tones, out=out)
@@ -1,3 +1,12 @@
+import struct
+import zlib
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .codec import bytes_to_bits, bits_to_bytes
+from .fec import coded_length, fec_encode, fec_decode
+
 ### contains protocol definitions and information for data serialisation 
 ###
 ### Send chars 
@@ -5,20 +14,361 @@ PLAIN_TEXT_HEADER_TYPE = 0
 # format for making a plaintext header 
 #PLAIN_TEXT_HEADER = struct.pack('!BH', message_type, message_len)  # Big-endian format
 
-#todo: ideally this will apply a header to a msg, 
-def encode_packet():
-    pass
+# ==============================
+# Packet framing
+# ==============================
+# [sync word][type][length][payload][crc], all big-endian:
+#   sync word : 2 bytes, marks the start of a frame in the bit stream
+#   type      : 1 byte, message type (see MESSAGE_TYPE in protocol.h)
+#   length    : 2 bytes, payload length in bytes
+#   crc       : CRC-16/CCITT-FALSE (2 bytes) or CRC-32 (4 bytes) over type, length and payload
+SYNC_WORD = b'\x2d\xd4'
+HEADER = struct.Struct('!2sBH')
+CRC_SIZES = {'crc16': 2, 'crc32': 4}
+MAX_PAYLOAD = 0xFFFF
+# longest payload PacketParser waits for by default: a corrupted length field otherwise holds the
+# parser on a bogus frame for up to 64 KiB, losing the valid frames behind it
+PARSER_MAX_PAYLOAD = 255
+# total |LLR| of sync word bits allowed to disagree in a soft search, about one bit that was 95% sure
+SOFT_SYNC_COST = 3.0
+
+
+class PacketError(ValueError):
+    """Raised when a frame is truncated, has no sync word or fails its CRC"""
+
+
+def _crc16_table(poly=0x1021):
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return tuple(table)
+
+
+CRC16_TABLE = _crc16_table()
+
+
+def crc16(data, crc=0xFFFF):
+    """CRC-16/CCITT-FALSE, one table lookup per byte"""
+    for byte in bytes(data):
+        crc = ((crc << 8) & 0xFFFF) ^ CRC16_TABLE[(crc >> 8) ^ byte]
+    return crc
+
+
+def crc32(data):
+    """CRC-32 (IEEE), table driven in zlib"""
+    return zlib.crc32(data) & 0xFFFFFFFF
+
+
+def _checksum(data, crc):
+    if crc == 'crc16':
+        return crc16(data).to_bytes(2, 'big')
+    if crc == 'crc32':
+        return crc32(data).to_bytes(4, 'big')
+    raise ValueError(f"Unknown crc: {crc}")
+
+
+def encode_packet(payload, message_type=PLAIN_TEXT_HEADER_TYPE, crc='crc16'):
+    """
+    Wraps a payload in a frame
+
+    Args:
+        payload (bytes-like or str): message, str is sent as utf-8
+        message_type (int): MESSAGE_TYPE value, 0-255
+        crc (str): 'crc16' or 'crc32'
+
+    Returns:
+        bytes: [sync word][type][length][payload][crc]
+    """
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    payload = bytes(payload)
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"payload of {len(payload)} bytes exceeds the {MAX_PAYLOAD} byte limit")
+    header = HEADER.pack(SYNC_WORD, message_type, len(payload))
+    return header + payload + _checksum(header[len(SYNC_WORD):] + payload, crc)
+
+
+def encode_packet_bits(payload, message_type=PLAIN_TEXT_HEADER_TYPE, crc='crc16', fec=None):
+    """
+    Frame as over-the-air bits, optionally protected by forward error correction
+
+    The sync word stays uncoded so receivers can still search for it. Type and
+    length are coded as one block and payload and crc as a second, so the
+    receiver learns the frame length before the payload arrives.
+
+    Args:
+        payload (bytes-like or str): message, str is sent as utf-8
+        message_type (int): MESSAGE_TYPE value, 0-255
+        crc (str): 'crc16' or 'crc32'
+        fec (str): None, 'hamming74' or 'conv' (see fec.py)
+
+    Returns:
+        np.array: uint8 bits, MSB first
+    """
+    frame = bytes_to_bits(encode_packet(payload, message_type, crc))
+    sync_end = len(SYNC_WORD) * 8
+    header_end = HEADER.size * 8
+    return np.concatenate((frame[:sync_end], fec_encode(frame[sync_end:header_end], fec),
+                           fec_encode(frame[header_end:], fec)))
+
+
+def packet_length(header, crc='crc16'):
+    """
+    Total frame length in bytes, known as soon as the header has arrived
+
+    Args:
+        header (bytes-like): at least the first HEADER.size bytes of a frame
+        crc (str): 'crc16' or 'crc32'
+
+    Returns:
+        int: bytes in the whole frame, header and crc included
+    """
+    if len(header) < HEADER.size:
+        raise PacketError(f"need {HEADER.size} header bytes, got {len(header)}")
+    sync, _, length = HEADER.unpack_from(bytes(header[:HEADER.size]))
+    if sync != SYNC_WORD:
+        raise PacketError("missing sync word")
+    return HEADER.size + length + CRC_SIZES[crc]
+
+
+def decode_packet(data, crc='crc16'):
+    """
+    Strips and checks the frame around a payload
+
+    Args:
+        data (bytes-like): frame starting at the sync word, trailing bytes are ignored
+        crc (str): 'crc16' or 'crc32'
+
+    Returns:
+        tuple: (message_type, payload bytes)
+    """
+    data = bytes(data)
+    total = packet_length(data, crc)
+    if len(data) < total:
+        raise PacketError(f"truncated frame: need {total} bytes, got {len(data)}")
+    _, message_type, _ = HEADER.unpack_from(data)
+    body = data[len(SYNC_WORD):total - CRC_SIZES[crc]]
+    if _checksum(body, crc) != data[total - CRC_SIZES[crc]:total]:
+        raise PacketError("crc mismatch")
+    return message_type, body[HEADER.size - len(SYNC_WORD):]
 
-#todo: ideally this will strip and decode a header + the msg 
-def decode_packet():
-    pass
 
 # sync marker: 
 #[todo]: adjust some sort of timing window based on the preamble note duration
-def detect_preamble(bits, PREAMBLE = [1,0,1,0,1,0,1,0]):
-    preamble_str = ''.join(map(str, PREAMBLE))
-    bits_str = ''.join(map(str, bits))
-    index = bits_str.find(preamble_str)
-    return index if index != -1 else None
+def _bit_array(bits, packed=False):
+    bits = np.asarray(bits, dtype=np.uint8)
+    return np.unpackbits(bits) if packed else bits
+
+
+def find_sync_word(bits, PREAMBLE=[1,0,1,0,1,0,1,0], max_errors=0, packed=False):
+    """
+    Finds every position where the sync word appears in a bit array
+
+    Args:
+        bits (array): 0/1 bits, or packed bytes if packed=True
+        PREAMBLE (array): sync word bits
+        max_errors (int): bit errors (Hamming distance) tolerated in a match
+        packed (bool): bits are packed 8 to a byte (MSB first), as from np.packbits
+
+    Returns:
+        np.array: bit index of each match, ascending
+    """
+    bits = _bit_array(bits, packed)
+    sync = np.asarray(PREAMBLE, dtype=np.uint8)
+    if len(bits) < len(sync):
+        return np.zeros(0, dtype=np.int64)
+    distances = np.count_nonzero(sliding_window_view(bits, len(sync)) != sync, axis=1)
+    return np.flatnonzero(distances <= max_errors)
+
+
+def find_sync_word_soft(llrs, PREAMBLE=[1,0,1,0,1,0,1,0], max_cost=SOFT_SYNC_COST):
+    """
+    Finds every position where the sync word appears in a stream of soft bits
+
+    A hard search counts disagreeing bits; here each disagreement costs its |LLR|, so
+    a match is kept when the bits that contradict the sync word were doubtful ones
+    and rejected when even one of them was a confident decision.
+
+    Args:
+        llrs (array): per-bit LLRs, > 0 favours 1 (see soft.py)
+        PREAMBLE (array): sync word bits
+        max_cost (float): total |LLR| of disagreeing bits tolerated in a match
+
+    Returns:
+        np.array: bit index of each match, ascending
+    """
+    llrs = np.asarray(llrs, dtype=np.float64)
+    signs = 2.0 * np.asarray(PREAMBLE, dtype=np.float64) - 1
+    if len(llrs) < len(signs):
+        return np.zeros(0, dtype=np.int64)
+    costs = np.maximum(-sliding_window_view(llrs, len(signs)) * signs, 0.0).sum(axis=1)
+    return np.flatnonzero(costs <= max_cost)
+
+
+def detect_preamble(bits, PREAMBLE = [1,0,1,0,1,0,1,0], max_errors=0, packed=False):
+    """
+    Index of the first sync word in bits, or None if there isn't one
+
+    Args:
+        bits (array): 0/1 bits, or packed bytes if packed=True
+        PREAMBLE (array): sync word bits
+        max_errors (int): bit errors (Hamming distance) tolerated in a match
+        packed (bool): bits are packed 8 to a byte (MSB first)
+    """
+    matches = find_sync_word(bits, PREAMBLE, max_errors, packed)
+    return int(matches[0]) if len(matches) else None
+
+
+class SyncSearcher:
+    """
+    Incremental sync word search for a growing bit stream
+
+    Only the newly fed bits (plus the last len(PREAMBLE) - 1 already seen) are
+    scanned on each call, so the cost doesn't grow with the message length.
+    """
+
+    def __init__(self, PREAMBLE=[1,0,1,0,1,0,1,0], max_errors=0):
+        self.sync = np.asarray(PREAMBLE, dtype=np.uint8)
+        self.max_errors = max_errors
+        self.reset()
+
+    def reset(self):
+        self._tail = np.zeros(0, dtype=np.uint8)
+        self._scanned = 0  # absolute bit index of self._tail[0]
+
+    def feed(self, bits, packed=False):
+        """
+        Args:
+            bits (array): newly received bits, or packed bytes if packed=True
+            packed (bool): bits are packed 8 to a byte (MSB first)
+
+        Returns:
+            np.array: absolute bit index (from the first bit ever fed) of each new match
+        """
+        buf = np.concatenate((self._tail, _bit_array(bits, packed)))
+        matches = find_sync_word(buf, self.sync, self.max_errors) + self._scanned
+        keep = min(len(buf), len(self.sync) - 1)
+        self._scanned += len(buf) - keep
+        self._tail = buf[len(buf) - keep:]
+        return matches
+
+
+class PacketParser:
+    """
+    Pulls frames out of a demodulated bit stream as the bits arrive
+
+    Once the sync word and header are in, the exact frame length is known, so
+    decoding happens the moment the last CRC bit lands. A frame that fails its
+    CRC only costs one check, the search then resumes just after its sync word.
+    Bits are only scanned for the sync word once and the header is decoded once
+    per candidate frame, so feeding one bit at a time costs the same per bit as
+    feeding whole blocks.
+    """
+
+    def __init__(self, crc='crc16', max_errors=0, max_payload=PARSER_MAX_PAYLOAD, fec=None, soft=False,
+                 max_cost=SOFT_SYNC_COST):
+        """
+        Args:
+            crc (str): 'crc16' or 'crc32'
+            max_errors (int): bit errors tolerated in the sync word
+            max_payload (int): longer length fields are treated as a false sync instead of waited for;
+                raise it (up to MAX_PAYLOAD) for links that send longer frames
+            fec (str): forward error correction the frames were sent with (see encode_packet_bits)
+            soft (bool): feed() takes per-bit LLRs (demodulate_fsk(..., soft=True)); the sync word
+                is searched with find_sync_word_soft and the FEC decodes soft decisions
+            max_cost (float): sync word tolerance with soft, see find_sync_word_soft
+        """
+        self.crc = crc
+        self.max_errors = max_errors
+        self.soft = soft
+        self.max_cost = max_cost
+        self.max_payload = max_payload
+        self.fec = fec
+        self._sync_bits = bytes_to_bits(SYNC_WORD)
+        self._header_bits = coded_length((HEADER.size - len(SYNC_WORD)) * 8, fec)
+        self.rejected = 0
+        self.reset()
+
+    def reset(self):
+        self._buf = np.zeros(256, dtype=np.float64 if self.soft else np.uint8)
+        self._pos = 0  # searching: next possible sync word start, locked: start of the frame
+        self._end = 0
+        self._locked = False
+        self._header = None  # decoded header of the locked frame, once it is in
+        self._body_bits = 0
+        self._total_bits = 0
+
+    def _append(self, bits):
+        # amortised O(1) per bit: compact in place, or double the buffer when it is really full
+        live = self._end - self._pos
+        if self._end + len(bits) > len(self._buf):
+            size = len(self._buf)
+            while live + len(bits) > size // 2:
+                size *= 2
+            buf = self._buf if size == len(self._buf) else np.zeros(size, dtype=self._buf.dtype)
+            buf[:live] = self._buf[self._pos:self._end]
+            self._buf, self._pos, self._end = buf, 0, live
+        self._buf[self._end:self._end + len(bits)] = bits
+        self._end += len(bits)
+
+    def _resume(self, position):
+        # back to searching from position
+        self._pos = position
+        self._locked = False
+        self._header = None
+
+    def feed(self, bits):
+        """
+        Args:
+            bits (array): newly demodulated 0/1 bits, or LLRs with soft
+
+        Returns:
+            list: (message_type, payload) for every frame completed by these bits
+        """
+        self._append(np.asarray(bits, dtype=self._buf.dtype).ravel())
+        packets = []
+        sync_len = len(self._sync_bits)
+        header_end = sync_len + self._header_bits
+        while True:
+            if not self._locked:
+                window = self._buf[self._pos:self._end]
+                if self.soft:
+                    starts = find_sync_word_soft(window, self._sync_bits, self.max_cost)
+                else:
+                    starts = find_sync_word(window, self._sync_bits, self.max_errors)
+                if not len(starts):
+                    # only the last sync_len - 1 bits can still begin a sync word
+                    self._pos = max(self._pos, self._end - (sync_len - 1))
+                    return packets
+                self._pos += int(starts[0])
+                self._locked = True
+            frame = self._buf[self._pos:self._end]
 
+            if self._header is None:
+                if len(frame) < header_end:
+                    return packets
+                # the sync word may have matched with errors, the header check only needs type and length
+                header = SYNC_WORD + bits_to_bytes(fec_decode(frame[sync_len:header_end], self.fec,
+                                                              (HEADER.size - len(SYNC_WORD)) * 8, soft=self.soft))
+                body_bits = (packet_length(header, self.crc) - HEADER.size) * 8
+                if body_bits > (self.max_payload + CRC_SIZES[self.crc]) * 8:
+                    self.rejected += 1
+                    self._resume(self._pos + 1)
+                    continue
+                self._header = header
+                self._body_bits = body_bits
+                self._total_bits = header_end + coded_length(body_bits, self.fec)
 
+            if len(frame) < self._total_bits:
+                return packets
+            body = bits_to_bytes(fec_decode(frame[header_end:self._total_bits], self.fec, self._body_bits,
+                                            soft=self.soft))
+            try:
+                packets.append(decode_packet(self._header + body, self.crc))
+                self._resume(self._pos + self._total_bits)
+            except PacketError:
+                self.rejected += 1
+                self._resume(self._pos + 1)
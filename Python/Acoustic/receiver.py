@@ -0,0 +1,242 @@
+# python/acoustic/receiver.py
+"""
+Streaming start/stop FSK receiver, fed incrementally (e.g. from a
+sounddevice InputStream callback) instead of buffering a whole message.
+"""
+import asyncio
+import queue
+
+import numpy as np
+
+from .codec import bits_to_bytes
+from .constants import *
+from .fsk import fft_tone_energies
+from .goertzel import goertzel_energies
+from .protocol import PacketParser
+from .signal_filters import BandpassFilter
+from .timing import SymbolTimingRecovery
+
+# symbol order matches the tone order handed to the detector
+SYMBOLS = (0, 1, 'start', 'stop')
+
+
+class StreamingReceiver:
+    """
+    Decodes [preamble][start][byte][stop]... transmissions block by block, or
+    [preamble][packet frame] transmissions with framing='packet'
+
+    Samples go into a preallocated ring buffer, every complete symbol is detected
+    as soon as it arrives, and each byte is queued the moment its stop symbol
+    completes (or each packet payload the moment its CRC checks out). Filter state and symbol timing carry over between blocks, so
+    latency is bounded by one symbol plus one block and memory stays constant.
+
+    Usage:
+        receiver = StreamingReceiver()
+        with sd.InputStream(samplerate=SAMPLE_RATE, channels=1, callback=receiver.callback):
+            for byte in receiver.iter_bytes():
+                ...
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, symbol_duration=DURATION, freq0=FREQ0, freq1=FREQ1,
+                 freq_start=FREQ_START, freq_stop=FREQ_STOP, preamble=PREAMBLE, min_energy=5.0,
+                 backend='goertzel', band=None, filter_order=4, block_size=None, idle_symbols=10,
+                 max_pending=1024, framing='startstop', crc='crc16', timing_recovery=False):
+        """
+        Args:
+            sample_rate (int): Sampling rate in Hz
+            symbol_duration (float): seconds per symbol
+            freq0, freq1, freq_start, freq_stop (float): Protocol tone frequencies in Hz
+            preamble (list): bits that must be seen before bytes are decoded
+            min_energy (float): symbols quieter than this are treated as silence
+            backend (str): 'goertzel' (only the four tones) or 'fft'
+            band (tuple): optional (lowcut, highcut) bandpass applied before detection
+            filter_order (int): order of the bandpass
+            block_size (int): largest block expected per feed, sizes the ring buffer
+            idle_symbols (int): silent symbols after which the receiver hunts for a new preamble
+            max_pending (int): decoded bytes held for the consumer before new ones are dropped
+            framing (str): 'startstop' (a byte per start/stop pair) or 'packet' (encode_packet frames)
+            crc (str): frame crc for framing='packet'
+            timing_recovery (bool): follow the sender's symbol clock (see timing.py) instead of
+                slicing at fixed offsets, needed for long gapless transmissions between
+                sound cards whose clocks differ; the measured offset is in self.timing.ppm
+        """
+        if backend not in ('goertzel', 'fft'):
+            raise ValueError(f"Unknown backend: {backend}")
+        if framing not in ('startstop', 'packet'):
+            raise ValueError(f"Unknown framing: {framing}")
+        self.sample_rate = sample_rate
+        self.samples_per_bit = int(sample_rate * symbol_duration)
+        self.freqs = (freq0, freq1, freq_start, freq_stop)
+        self.preamble = list(preamble)
+        self.min_energy = min_energy
+        self.backend = backend
+        self.idle_symbols = idle_symbols
+        self.framing = framing
+        self._packets = PacketParser(crc=crc)
+
+        self.timing = SymbolTimingRecovery(self.samples_per_bit) if timing_recovery else None
+        # with timing recovery, half a symbol before the read position is kept for the boundary window
+        self._history = self.samples_per_bit // 2 if timing_recovery else 0
+
+        block_size = block_size or self.samples_per_bit
+        self._ring = np.zeros(max(block_size, self.samples_per_bit) + self.samples_per_bit + self._history)
+        self._written = 0  # absolute sample counters, positions in the ring are taken modulo its length
+        self._read = 0
+
+        self._filter = None
+        if band is not None:
+            lowcut, highcut = band
+            self._filter = BandpassFilter(lowcut, highcut, sample_rate, order=filter_order)
+
+        self._bytes = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.reset()
+
+    def reset(self):
+        """Forgets any partial preamble/byte and waits for a new preamble"""
+        self.locked = False
+        self._recent_bits = []
+        self._current_byte = []
+        self._collecting = False
+        self._silent = 0
+        self._previous_tone = None
+        self._packets.reset()
+
+    # ==============================
+    # Input
+    # ==============================
+    def callback(self, indata, frames, time, status):
+        """sounddevice InputStream callback, decodes the first channel"""
+        self.feed(indata[:, 0])
+
+    def feed(self, block):
+        """
+        Pushes a block of samples through the receiver
+
+        Args:
+            block (np.array): New audio samples, any length
+        """
+        block = np.asarray(block, dtype=np.float64).ravel()
+        if self._filter is not None:
+            block = self._filter.process(block)
+        capacity = len(self._ring)
+        pos = 0
+        while pos < len(block):
+            n = min(len(block) - pos, capacity - self._history - (self._written - self._read))
+            start = self._written % capacity
+            first = min(n, capacity - start)
+            self._ring[start:start + first] = block[pos:pos + first]
+            self._ring[:n - first] = block[pos + first:pos + n]
+            self._written += n
+            pos += n
+            self._process()
+
+    def _frames(self, start, n_symbols, length):
+        idx = (start + np.arange(n_symbols * length)) % len(self._ring)
+        return self._ring[idx].reshape(n_symbols, length)
+
+    def _energies(self, frames):
+        if self.backend == 'goertzel':
+            return goertzel_energies(frames, self.freqs, self.sample_rate)
+        return fft_tone_energies(frames, self.freqs, self.sample_rate, neighborhood=0)
+
+    def _process(self):
+        if self.timing is not None:
+            return self._process_tracked()
+        n_symbols = (self._written - self._read) // self.samples_per_bit
+        if n_symbols == 0:
+            return
+        frames = self._frames(self._read, n_symbols, self.samples_per_bit)
+        self._read += n_symbols * self.samples_per_bit
+
+        energies = self._energies(frames)
+        best = energies.argmax(axis=1)
+        loud = energies[np.arange(n_symbols), best] >= self.min_energy
+        for symbol_idx, is_loud in zip(best.tolist(), loud.tolist()):
+            self._on_symbol(SYMBOLS[symbol_idx] if is_loud else None)
+
+    def _process_tracked(self):
+        # one symbol at a time, each step set by the timing loop
+        n = self.samples_per_bit
+        half = n // 2
+        while self._written - self._read >= n:
+            window = self._frames(self._read - half, 1, n + half)
+            energies = self._energies(window[:, half:])[0]
+            best = int(energies.argmax())
+            loud = energies[best] >= self.min_energy
+            error = 0.0
+            if loud and self._previous_tone is not None and best != self._previous_tone and self._read >= half:
+                boundary = goertzel_energies(window[:, :n], self.freqs, self.sample_rate, None)[0]
+                error = self.timing.error(boundary, self._previous_tone, best)
+            self._previous_tone = best if loud else None
+            self._read += self.timing.advance(error)
+            self._on_symbol(SYMBOLS[best] if loud else None)
+
+    # ==============================
+    # Framing state machine
+    # ==============================
+    def _on_symbol(self, symbol):
+        if symbol is None:
+            self._silent += 1
+            if self._silent >= self.idle_symbols:
+                self.reset()
+            return
+        self._silent = 0
+
+        if self.framing == 'packet':
+            # the frame's own sync word locks on, only data tones matter
+            if isinstance(symbol, int):
+                for _, payload in self._packets.feed([symbol]):
+                    self._emit(payload)
+            return
+
+        if not self.locked:
+            if isinstance(symbol, int):
+                self._recent_bits = (self._recent_bits + [symbol])[-len(self.preamble):]
+                self.locked = self._recent_bits == self.preamble
+            return
+
+        if symbol == 'start':
+            self._collecting = True
+            self._current_byte = []
+        elif symbol == 'stop':
+            if self._collecting and len(self._current_byte) == 8:
+                self._emit(bits_to_bytes(self._current_byte))
+            self._collecting = False
+        elif self._collecting:
+            self._current_byte.append(symbol)
+
+    def _emit(self, byte):
+        try:
+            self._bytes.put_nowait(byte)
+        except queue.Full:
+            self.dropped += 1
+
+    # ==============================
+    # Output
+    # ==============================
+    def iter_bytes(self, timeout=None):
+        """
+        Yields each decoded byte (or packet payload) as soon as it completes
+
+        Args:
+            timeout (float): stop after this many seconds without a byte, None waits forever
+
+        Yields:
+            bytes: one decoded byte, or a whole payload with framing='packet'
+        """
+        while True:
+            try:
+                yield self._bytes.get(timeout=timeout)
+            except queue.Empty:
+                return
+
+    def __iter__(self):
+        return self.iter_bytes()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._bytes.get)
@@ -1,7 +1,9 @@
 # python/acoustic/signal_filters.py
 
+from functools import lru_cache
 
-from scipy.signal import correlate, butter, lfilter
+import numpy as np
+from scipy.signal import butter, sosfilt, sosfiltfilt
 
 # ==============================
 # Filtering
@@ -14,8 +16,75 @@ def butter_bandpass(lowcut, highcut, fs, order=5):
     return b, a
 
 
+@lru_cache(maxsize=32)
+def butter_bandpass_sos(lowcut, highcut, fs, order=5):
+    """
+    Butterworth bandpass as second-order sections, designed once per (lowcut, highcut, fs, order)
+
+    Second-order sections stay stable at high orders and with narrow bands near
+    Nyquist (e.g. 39-41 kHz at 88.2 kHz) where the (b, a) form loses precision.
+
+    Returns:
+        np.array: read-only sos array shared between callers, shape (n_sections, 6); scipy's
+            sosfilt wants a writable one, so filter with a copy
+    """
+    sos = butter(order, [lowcut, highcut], btype='band', fs=fs, output='sos')
+    sos.flags.writeable = False
+    return sos
+
+
+class BandpassFilter:
+    """
+    Stateful bandpass for block-by-block filtering of a live stream
+
+    The filter state carries across process() calls, so filtering a stream in
+    blocks gives the same output as filtering it all at once, with no edge
+    transients at block boundaries.
+    """
+
+    def __init__(self, lowcut, highcut, fs, order=5):
+        self.sos = butter_bandpass_sos(lowcut, highcut, fs, order).copy()
+        self.reset()
+
+    def reset(self):
+        """Clears the filter state, e.g. between unrelated recordings"""
+        self.zi = np.zeros((self.sos.shape[0], 2))
+
+    def process(self, block):
+        """
+        Filters the next block of the stream
+
+        Args:
+            block (np.array): New samples
+
+        Returns:
+            np.array: Filtered samples, same length as block
+        """
+        y, self.zi = sosfilt(self.sos, block, zi=self.zi)
+        return y
+
+    def filtfilt(self, data):
+        """Zero-phase (forward-backward) filtering of a whole offline signal, doesn't touch the stream state"""
+        return sosfiltfilt(self.sos, data)
+
+
 # todo add different filters
-def bandpass_filter(data, lowcut, highcut, fs, order=5):
-    b, a = butter_bandpass(lowcut, highcut, fs, order=order)
-    y = lfilter(b, a, data)
-    return y
\ No newline at end of file
+def bandpass_filter(data, lowcut, highcut, fs, order=5, zero_phase=False):
+    """
+    One-shot bandpass using the cached second-order-section design
+
+    Args:
+        data (np.array): Signal to filter
+        lowcut (float): Lower band edge in Hz
+        highcut (float): Upper band edge in Hz
+        fs (int): Sampling rate in Hz
+        order (int): Butterworth order
+        zero_phase (bool): Filter forwards and backwards for no phase delay (offline only)
+
+    Returns:
+        np.array: Filtered signal
+    """
+    sos = butter_bandpass_sos(lowcut, highcut, fs, order).copy()
+    if zero_phase:
+        return sosfiltfilt(sos, data)
+    return sosfilt(sos, data)
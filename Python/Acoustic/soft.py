@@ -0,0 +1,89 @@
+# python/acoustic/soft.py
+"""
+Soft decisions: per-bit log-likelihood ratios from the demodulator's tone energies.
+
+A hard decision (energy1 > energy0) throws away how close the call was. The
+noncoherent FSK detector sees the true tone as a Rician magnitude and the other
+as Rayleigh noise, so with the tone amplitude A and the per-bin noise power s^2
+the log-likelihood ratio of a bit is
+
+    LLR = ln I0(2 A r1 / s^2) - ln I0(2 A r0 / s^2)
+
+where r0, r1 are the two magnitudes; > 0 favours 1. A and s^2 come from running
+averages over the bits themselves (see bit_llrs), so the LLRs follow fading and
+noise that changes over a long capture. The FEC decoders
+(fec_decode(..., soft=True)) and find_sync_word_soft take these LLRs directly.
+"""
+from collections import namedtuple
+
+import numpy as np
+from scipy.signal import lfilter
+from scipy.special import expit, i0e
+
+SoftQuality = namedtuple('SoftQuality', ['snr_db', 'noise_power', 'confidence', 'expected_ber'])
+SoftQuality.__doc__ = """Per-frame metrics from bit_llrs: detector SNR in dB, mean per-bin noise power (pass
+it to the next call's noise_power), mean |LLR| and the bit error rate the LLRs themselves predict"""
+
+
+def _log_i0(x):
+    # ln I0(x) without overflow for large x
+    return np.log(i0e(x)) + x
+
+
+def _running_mean(values, smoothing, initial):
+    # exponential moving average, as a one-pole filter over the whole array at once
+    zi = [(1 - smoothing) * initial]
+    return lfilter([smoothing], [1, smoothing - 1], values, zi=zi)[0]
+
+
+def bit_llrs(energies, smoothing=0.05, noise_power=None, return_quality=False):
+    """
+    Log-likelihood ratios of binary FSK bits from their tone magnitudes
+
+    Args:
+        energies (np.array): tone magnitudes, shape (n_bits, 2 or more) with [energy0, energy1, ...]
+            first, as returned by demodulate_fsk(..., return_energies=True)
+        smoothing (float): weight of each new bit in the running noise and signal estimates (0-1),
+            about 1 / smoothing bits are averaged
+        noise_power (float): noise estimate to start from, e.g. the previous frame's
+            SoftQuality.noise_power; None takes it from the first bits of this frame
+        return_quality (bool): also return a SoftQuality for the frame
+
+    Returns:
+        np.array: float LLR per bit, ln P(1) / P(0); the hard decision is llrs > 0
+        SoftQuality: (only if return_quality)
+    """
+    energies = np.asarray(energies, dtype=np.float64)
+    power = energies[:, :2] ** 2
+    n_bits = len(power)
+    if n_bits == 0:
+        llrs = np.zeros(0)
+        return (llrs, SoftQuality(None, noise_power, 0.0, 0.0)) if return_quality else llrs
+
+    # the two bins are independent, one holding tone + noise and the other noise, whichever is which:
+    # E[p0 + p1] = A^2 + 2 s^2 and E[p0 p1] = (A^2 + s^2) s^2, solved for s^2 on running means. Unlike
+    # taking the weaker bin as the noise, this doesn't read low when noise wins the comparison.
+    total, product = power.sum(axis=1), power.prod(axis=1)
+    warmup = max(int(round(1 / smoothing)), 1)
+    total_mean = _running_mean(total, smoothing, total[:warmup].mean())
+    if noise_power is None:
+        initial = product[:warmup].mean()
+    else:
+        initial = noise_power * max(total[:warmup].mean() - noise_power, noise_power)
+    product_mean = _running_mean(product, smoothing, initial)
+    spread = np.sqrt(np.maximum(total_mean ** 2 - 4 * product_mean, 0.0))
+    noise = np.maximum((total_mean - spread) / 2, 1e-30)
+    # floored so the LLRs keep the hard decision's sign even when no tone is measured
+    tone = np.maximum(total_mean - 2 * noise, 1e-3 * noise)
+    amplitude = np.sqrt(tone)
+    scale = 2 * amplitude / noise
+    llrs = _log_i0(scale * energies[:, 1]) - _log_i0(scale * energies[:, 0])
+    if not return_quality:
+        return llrs
+
+    signal_mean = max(float(np.mean(tone)), 1e-30)
+    noise_mean = float(np.mean(noise))
+    confidence = np.abs(llrs)
+    quality = SoftQuality(float(10 * np.log10(signal_mean / noise_mean)), noise_mean, float(confidence.mean()),
+                          float(expit(-confidence).mean()))
+    return llrs, quality
@@ -0,0 +1,229 @@
+# python/acoustic/squelch.py
+"""
+Idle squelch: a cheap band-energy detector that sits in front of the receiver.
+
+A receiver spends nearly all of its time listening to noise. Running the whole
+demodulation pipeline on every sample of it wastes CPU (and battery), and a
+single energy threshold on the raw block opens on every click. The squelch
+only measures the preamble tones, a few multiply-adds per sample, against a
+noise floor it keeps learning; it opens after several loud frames in a row,
+holds open through short gaps, and replays the audio from just before it
+opened so the start of the packet still reaches the receiver.
+"""
+import numpy as np
+
+from .constants import *
+from .goertzel import goertzel_energies
+
+# percentile of the warm-up levels taken as the first noise floor
+WARMUP_PERCENTILE = 20
+
+
+class Squelch:
+    """
+    Gates audio to a sink (e.g. StreamingReceiver.feed) while the preamble band is active
+
+    Every frame_duration of audio gives one band level, the strongest of the
+    listened-for tones' Goertzel powers. Idle, the level is compared with the
+    noise floor: attack consecutive frames attack_db above it open the squelch,
+    and the sink first receives the pre-trigger history and then every block as
+    it arrives. Open, the floor is frozen and the squelch closes after hang
+    seconds below release_db (release_db < attack_db, so a level hovering around
+    one threshold doesn't chatter). While closed, the floor follows the level
+    with a time constant of floor_time, each frame's pull on it capped at the
+    attack threshold so a transmission can't drag the floor up behind it.
+
+    Usage:
+        receiver = StreamingReceiver()
+        squelch = Squelch(sink=receiver.feed, on_release=receiver.reset)
+        stream = get_backend().input_stream(squelch.callback, SAMPLE_RATE, blocksize)
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, freqs=(FREQ0, FREQ1), sink=None, on_release=None,
+                 frame_duration=0.01, attack_db=10.0, release_db=5.0, attack=0.03, hang=0.5, pretrigger=0.3,
+                 floor_time=2.0, min_level=1e-6, max_open=30.0):
+        """
+        Args:
+            sample_rate (int): Sampling rate in Hz
+            freqs (tuple): tones that wake the squelch, the preamble's by default
+            sink (callable): takes each gated block of samples
+            on_release (callable): called without arguments when the squelch closes
+            frame_duration (float): seconds per level measurement
+            attack_db (float): level above the noise floor that counts towards opening
+            release_db (float): level above the noise floor that keeps it open
+            attack (float): seconds above attack_db needed to open
+            hang (float): seconds below release_db before closing
+            pretrigger (float): seconds of audio from before the opening handed to the sink
+            floor_time (float): time constant of the noise floor, in seconds; after a reset the
+                first estimate is a low percentile of this long, opening against the estimate so
+                far once a tenth of it has gone by
+            min_level (float): floor never drops below this band power, so digital silence
+                doesn't open on the first sample of dither
+            max_open (float): seconds after which an open squelch takes the current level as
+                its new floor and closes, in case the noise itself got louder
+        """
+        if release_db > attack_db:
+            raise ValueError(f"release_db ({release_db}) must not exceed attack_db ({attack_db})")
+        self.sample_rate = sample_rate
+        self.freqs = tuple(float(f) for f in freqs)
+        self.sink = sink
+        self.on_release = on_release
+        self.frame = max(int(sample_rate * frame_duration), 1)
+        self.attack_ratio = 10 ** (attack_db / 10)
+        self.release_ratio = 10 ** (release_db / 10)
+        frame_time = self.frame / sample_rate
+        self.attack_frames = max(int(round(attack / frame_time)), 1)
+        self.hang_frames = max(int(round(hang / frame_time)), 1)
+        self.max_open_frames = max(int(round(max_open / frame_time)), 1)
+        self.floor_alpha = min(frame_time / floor_time, 1.0)
+        self.warmup_frames = max(int(round(floor_time / frame_time)), 1)
+        self.min_level = min_level
+        self._history = np.zeros(max(int(sample_rate * pretrigger), 0))
+        self.triggers = 0
+        self.reset()
+
+    def reset(self):
+        """Closes the squelch and forgets the noise floor and the pre-trigger history"""
+        self.active = False
+        self.floor = 0.0
+        self.level = 0.0
+        self._warmup = []  # levels behind the first floor estimate
+        self.samples = 0  # everything fed so far
+        self.gated = 0  # of which handed to the sink
+        self._count = 0  # idle: loud frames in a row, open: frames since the last sustained tone
+        self._run = 0  # loud frames in a row while open
+        self._open_frames = 0
+        self._partial = np.zeros(0)
+        self._history[:] = 0.0
+        self._history_fill = 0
+        self._history_pos = 0  # where the next sample goes in the ring
+        self._sent_until = 0  # absolute index after the last sample handed to the sink
+
+    @property
+    def duty(self):
+        """Fraction of the audio so far that was passed on"""
+        return self.gated / self.samples if self.samples else 0.0
+
+    # ==============================
+    # Input
+    # ==============================
+    def callback(self, indata, frames, time, status):
+        """sounddevice InputStream callback, gates the first channel"""
+        self.feed(indata[:, 0])
+
+    def feed(self, block):
+        """
+        Measures a block and passes it on if the squelch is (or becomes) open
+
+        Args:
+            block (np.array): New audio samples, any length
+        """
+        block = np.asarray(block, dtype=np.float64).ravel()
+        was_active = self.active
+        opened = False
+        for level in self._levels(block):
+            opened |= self._step(level)
+        block_start = self.samples
+        self.samples += len(block)
+
+        if opened and not was_active:
+            # replay what the sink hasn't seen from before the opening
+            n = min(self._history_fill, block_start - self._sent_until)
+            if n:
+                idx = (self._history_pos - n + np.arange(n)) % len(self._history)
+                self._emit(self._history[idx])
+        if was_active or opened:
+            self._emit(block)
+            self._sent_until = self.samples
+        self._remember(block)
+        if (was_active or opened) and not self.active and self.on_release is not None:
+            self.on_release()
+
+    def _levels(self, block):
+        # band power of every frame completed by this block
+        samples = np.concatenate((self._partial, block)) if len(self._partial) else block
+        n_frames = len(samples) // self.frame
+        self._partial = samples[n_frames * self.frame:].copy()
+        if n_frames == 0:
+            return []
+        frames = samples[:n_frames * self.frame].reshape(n_frames, self.frame)
+        power = goertzel_energies(frames, self.freqs, self.sample_rate) ** 2
+        # per sample, so thresholds don't depend on the frame length
+        return (power.max(axis=1) / self.frame).tolist()
+
+    def _step(self, level):
+        """State machine for one frame, True if the squelch opened on it"""
+        self.level = level
+        if self._warmup is not None:
+            return self._warm_up(level)
+        if self.active:
+            self._open_frames += 1
+            if self._open_frames >= self.max_open_frames:
+                self.floor = max(level, self.min_level)
+                self.active = False
+                self._count = 0
+                return False
+            # only a sustained tone holds it open, isolated clicks run the hang time down as well
+            self._run = self._run + 1 if level >= self.floor * self.release_ratio else 0
+            self._count = 0 if self._run >= self.attack_frames else self._count + 1
+            if self._count >= self.hang_frames:
+                self.active = False
+                self._count = 0
+            return False
+
+        if self._attack(level):
+            return True
+        capped = min(level, self.floor * self.attack_ratio)
+        self.floor = max(self.floor + self.floor_alpha * (capped - self.floor), self.min_level)
+        return False
+
+    def _warm_up(self, level):
+        # the first floor_time sets the floor from a low percentile of its levels rather than the
+        # median, so a transmission that starts early can't become the floor. The estimate so far
+        # is already a provisional floor to open against, once it has a tenth of those frames.
+        self._warmup.append(level)
+        self.floor = max(float(np.percentile(self._warmup, WARMUP_PERCENTILE)), self.min_level)
+        if len(self._warmup) == self.warmup_frames:
+            self._warmup = None
+            return False
+        if len(self._warmup) < self.warmup_frames // 10:
+            return False
+        if self._attack(level):
+            self._warmup = None  # keep the provisional floor, the rest would be the transmission
+            return True
+        return False
+
+    def _attack(self, level):
+        # idle: count loud frames and open after attack_frames of them in a row
+        if level < self.floor * self.attack_ratio:
+            self._count = 0
+            return False
+        self._count += 1
+        if self._count < self.attack_frames:
+            return False
+        self.active = True
+        self.triggers += 1
+        self._count = 0
+        self._run = 0
+        self._open_frames = 0
+        return True
+
+    # ==============================
+    # Output
+    # ==============================
+    def _emit(self, samples):
+        self.gated += len(samples)
+        if self.sink is not None:
+            self.sink(samples)
+
+    def _remember(self, block):
+        size = len(self._history)
+        if size == 0:
+            return
+        block = block[-size:]
+        start = self._history_pos
+        first = min(len(block), size - start)
+        self._history[start:start + first] = block[:first]
+        self._history[:len(block) - first] = block[first:]
+        self._history_pos = (start + len(block)) % size
+        self._history_fill = min(self._history_fill + len(block), size)
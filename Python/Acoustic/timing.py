@@ -0,0 +1,163 @@
+# python/acoustic/timing.py
+"""
+Symbol timing recovery: keeps the demodulator on the sender's symbol clock.
+
+Slicing at fixed samples_per_bit offsets drifts whenever the sender's and the
+receiver's sound card clocks differ (100 ppm is a 0.44 sample slip per symbol at
+44.1 kHz / 10 bps, a whole symbol after ~10000). Tracking the symbol boundaries
+keeps long frames aligned without silence gaps to re-synchronise on, and the
+measured boundaries give the clock offset.
+"""
+import numpy as np
+
+from .goertzel import goertzel_energies
+
+
+class SymbolTimingRecovery:
+    """
+    Decision-directed early-late gate on tone transitions
+
+    Whenever two consecutive symbols differ, a window of one symbol straddling
+    their boundary is correlated with both tones. Lined up, each tone fills half of
+    it; more of the earlier tone means the true boundary is later than assumed, and
+    vice versa, in proportion to the offset. A proportional + integral loop turns
+    that error into the start of the next symbol, its integral term following the
+    sender / receiver clock rate offset.
+
+    Usage:
+        timing = SymbolTimingRecovery(samples_per_bit)
+        bits = demodulate_fsk(signal, ..., timing=timing)
+        print(timing.ppm)
+    """
+
+    def __init__(self, samples_per_symbol, loop_gain=0.2, rate_gain=0.002, max_ppm=5000):
+        """
+        Args:
+            samples_per_symbol (int): nominal symbol length in samples
+            loop_gain (float): fraction of each measured timing error corrected straight away
+            rate_gain (float): how fast the clock rate estimate follows the errors
+            max_ppm (float): clock offsets tracked at most
+        """
+        self.samples_per_symbol = samples_per_symbol
+        self.loop_gain = loop_gain
+        self.rate_gain = rate_gain
+        self.max_rate = max_ppm * 1e-6
+        # a single step never moves by more than a quarter symbol
+        self.max_correction = samples_per_symbol // 4
+        self.reset()
+
+    def reset(self):
+        """Forgets the clock estimate"""
+        self.rate = 0.0  # received symbol period / nominal - 1, as tracked by the loop
+        self.transitions = 0
+        self.symbols = 0
+        self.elapsed = 0  # start of the current symbol, in samples since reset
+        self._fraction = 0.0
+        # running least-squares fit of measured boundary positions against symbol count
+        self._fit = np.zeros(4)  # mean symbol, mean position, co-moment, symbol variance sum
+
+    @property
+    def ppm(self):
+        """
+        Clock offset in parts per million, positive when received symbols are longer than nominal
+
+        A straight line fitted through every measured symbol boundary, so it doesn't
+        depend on how the loop pulled in; falls back to the loop's rate before there
+        are enough transitions.
+        """
+        if self.transitions < 2 or self._fit[3] <= 0:
+            return self.rate * 1e6
+        period = self._fit[2] / self._fit[3]
+        return (period / self.samples_per_symbol - 1) * 1e6
+
+    def _observe(self, symbol, position):
+        # Welford-style update, stays exact over long recordings
+        fit = self._fit
+        d_symbol = symbol - fit[0]
+        fit[0] += d_symbol / self.transitions
+        fit[1] += (position - fit[1]) / self.transitions
+        fit[2] += d_symbol * (position - fit[1])
+        fit[3] += d_symbol * (symbol - fit[0])
+
+    def error(self, boundary_energies, previous, current):
+        """
+        Timing error at a transition, in samples
+
+        Args:
+            boundary_energies (np.array): unwindowed tone magnitudes of the window
+                centred on the assumed boundary
+            previous (int): tone index of the symbol before the boundary
+            current (int): tone index of the symbol after it
+
+        Returns:
+            float: how much later the true boundary is than the assumed one
+        """
+        before, after = boundary_energies[previous], boundary_energies[current]
+        total = before + after
+        if previous == current or total <= 0:
+            return 0.0
+        return (before - after) / total * (self.samples_per_symbol / 2)
+
+    def advance(self, error=0.0):
+        """
+        Samples from the current symbol's start to the next one
+
+        Args:
+            error (float): timing error measured at the current symbol's start, 0 if none
+
+        Returns:
+            int: step in samples, the fractional part is carried to the next call
+        """
+        if error:
+            self.transitions += 1
+            self._observe(self.symbols, self.elapsed + error)
+            self.rate = float(np.clip(self.rate + self.rate_gain * error / self.samples_per_symbol,
+                                      -self.max_rate, self.max_rate))
+        correction = float(np.clip(self.loop_gain * error, -self.max_correction, self.max_correction))
+        step = self.samples_per_symbol * (1 + self.rate) + correction + self._fraction
+        n = int(round(step))
+        self._fraction = step - n
+        self.symbols += 1
+        self.elapsed += n
+        return n
+
+
+def track_symbols(signal, freqs, sample_rate, samples_per_symbol, timing, start_index=0, window='hanning'):
+    """
+    Detects symbols one at a time, following the sender's clock
+
+    Args:
+        signal (np.array): Audio signal, real or complex baseband
+        freqs (tuple): tone frequency of each symbol value in Hz
+        sample_rate (int): Sampling rate in Hz
+        samples_per_symbol (int): nominal symbol length
+        timing (SymbolTimingRecovery): loop state, updated in place
+        start_index (int): sample index of the first symbol
+        window (str): window for the symbol decisions, see goertzel_energies
+
+    Returns:
+        np.array: tone magnitudes per symbol, shape (n_symbols, n_tones)
+        np.array: start sample of every symbol
+    """
+    signal = np.asarray(signal)
+    if not np.iscomplexobj(signal):
+        signal = signal.astype(np.float64, copy=False)
+    freqs = tuple(float(f) for f in freqs)
+    half = samples_per_symbol // 2
+    energies, starts = [], []
+    previous = None
+    pos = start_index
+    while pos + samples_per_symbol <= len(signal):
+        symbol_energies = goertzel_energies(signal[None, pos:pos + samples_per_symbol], freqs, sample_rate,
+                                            window)[0]
+        current = int(symbol_energies.argmax())
+        error = 0.0
+        if previous is not None and current != previous and pos >= half:
+            boundary = goertzel_energies(signal[None, pos - half:pos - half + samples_per_symbol], freqs,
+                                         sample_rate, None)[0]
+            error = timing.error(boundary, previous, current)
+        energies.append(symbol_energies)
+        starts.append(pos)
+        previous = current
+        pos += timing.advance(error)
+    return np.array(energies).reshape(-1, len(freqs)), np.array(starts, dtype=np.int64)
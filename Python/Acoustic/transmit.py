@@ -0,0 +1,176 @@
+# python/acoustic/transmit.py
+"""
+Transmit scheduler: one long-lived output stream shared by every sender.
+
+Transmissions are queued by priority and written to the stream one symbol at a
+time by a single worker thread. Between symbols the worker picks the most
+urgent job again, so a movement tone queued in the middle of a text message goes
+out at the next symbol boundary and the message carries on afterwards, instead
+of two sd.play calls cutting each other off.
+"""
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+from . import physical
+from .constants import *
+
+PRIORITY_CONTROL = 0  # movement / latency critical
+PRIORITY_DATA = 10  # bulk text and packets
+
+
+class _Job:
+    __slots__ = ('priority', 'order', 'symbols', 'position', 'future')
+
+    def __init__(self, priority, order, symbols, future):
+        self.priority = priority
+        self.order = order
+        self.symbols = symbols
+        self.position = 0
+        self.future = future
+
+    def __lt__(self, other):
+        # lower priority value first, first come first served within a priority
+        return (self.priority, self.order) < (other.priority, other.order)
+
+
+class TransmitScheduler:
+    """
+    Plays queued transmissions through a single output stream, most urgent first
+
+    Usage:
+        with TransmitScheduler(SAMPLE_RATE) as tx:
+            done = tx.send_tones([(FREQ_START, DURATION), ...])
+            tx.send_tones([(FREQ_FORWARD, DURATION)], priority=PRIORITY_CONTROL)
+            done.result()
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, dtype=np.float32, backend=None, stream=None):
+        """
+        Args:
+            sample_rate (int): Sampling rate in Hz
+            dtype (np.dtype): sample type written to the stream
+            backend (AudioBackend): opens the output stream on start(), defaults to the sound card
+            stream: an already built output stream (start(), write(frames), close()) to use instead
+        """
+        self.sample_rate = sample_rate
+        self.dtype = np.dtype(dtype)
+        self.backend = backend
+        self._stream = stream
+        self._queue = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._drain = True
+        self._worker = None
+
+    def start(self):
+        if self._worker is not None:
+            return self
+        if self._stream is None:
+            self._stream = (self.backend or physical.get_backend()).output_stream(self.sample_rate, self.dtype)
+        self._stream.start()
+        self._worker = threading.Thread(target=self._run, name='TransmitScheduler', daemon=True)
+        self._worker.start()
+        return self
+
+    def send(self, symbols, priority=PRIORITY_DATA):
+        """
+        Queues a transmission
+
+        Args:
+            symbols (list): waveforms, one per symbol; preemption happens between them.
+                A single array is sent as one symbol.
+            priority (int): lower goes first, see PRIORITY_CONTROL / PRIORITY_DATA
+
+        Returns:
+            concurrent.futures.Future: resolves to None once the last symbol is written,
+                cancel() drops it if it hasn't started yet
+        """
+        if isinstance(symbols, np.ndarray):
+            symbols = [symbols]
+        symbols = [np.asarray(s, dtype=self.dtype).reshape(-1, 1) for s in symbols]
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("TransmitScheduler is closed")
+            heapq.heappush(self._queue, _Job(priority, next(self._order), symbols, future))
+            self._cond.notify()
+        return future
+
+    def send_tones(self, tones, priority=PRIORITY_DATA, amplitude=1.0):
+        """
+        Queues a transmission of cached tones
+
+        Args:
+            tones (list): (freq, duration) per symbol, freq 0 for silence
+            priority (int): lower goes first
+            amplitude (float): peak amplitude
+
+        Returns:
+            concurrent.futures.Future: see send()
+        """
+        return self.send([physical.generate_tone(freq, duration, self.sample_rate, amplitude, self.dtype)
+                          for freq, duration in tones], priority)
+
+    def pending(self):
+        """Number of transmissions waiting for the stream, including preempted ones"""
+        with self._cond:
+            return len(self._queue)
+
+    def close(self, drain=True):
+        """
+        Stops the worker and closes the stream
+
+        Args:
+            drain (bool): finish everything queued first, otherwise drop it
+        """
+        with self._cond:
+            self._closed = True
+            self._drain = drain
+            if not drain:
+                for job in self._queue:
+                    if not job.future.cancel():
+                        job.future.set_exception(RuntimeError("TransmitScheduler closed mid transmission"))
+                self._queue.clear()
+            self._cond.notify()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        if self._stream is not None:
+            self._stream.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                job = heapq.heappop(self._queue)
+            if job.position == 0 and not job.future.set_running_or_notify_cancel():
+                continue  # cancelled before it started
+            try:
+                self._stream.write(job.symbols[job.position])
+            except Exception as exc:
+                job.future.set_exception(exc)
+                continue
+            job.position += 1
+            if job.position == len(job.symbols):
+                job.future.set_result(None)
+                continue
+            with self._cond:
+                if not self._drain:
+                    job.future.set_exception(RuntimeError("TransmitScheduler closed mid transmission"))
+                    continue
+                # back in the queue: anything more urgent that arrived meanwhile goes first
+                heapq.heappush(self._queue, job)
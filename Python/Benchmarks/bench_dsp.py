@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+"""
+DSP benchmark suite
+===============================
+Times every hot path of the stack headless (no sound card needed) for a few
+payload sizes in both the audible and ultrasonic configurations, and reports
+throughput as samples/s, bits/s and how many times faster than real time each
+stage runs. Anything below 1x real time can't keep up with a live link on that host.
+Bit packing never sees audio, so it is reported in bits/s only.
+
+    python bench_dsp.py                          # print results
+    python bench_dsp.py --save baseline.json     # store a baseline
+    python bench_dsp.py --compare baseline.json  # flag regressions against it
+"""
+
+CONFIGS = {
+    # name: (sample rate, freq0, freq1, bit rate)
+    'audible': (44100, 1200, 1500, 10),
+    'ultrasonic': (88200, 41000, 39000, 650),
+}
+# configurations also timed through the complex baseband front end, and its decimation
+BASEBAND_DECIMATION = {'ultrasonic': 15}
+PAYLOAD_BYTES = (16, 128, 1024)
+PREAMBLE_BITS = [1, 1, 1, 0, 0, 0, 1, 0, 0, 1, 0]
+# bins either side of each tone demodulate_fsk's fft backend takes the peak of
+FFT_NEIGHBORHOOD = 2
+
+
+def best_time(fn, repeat):
+    """Fastest of `repeat` runs, the least noisy estimate of the cost"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def stages(config, payload_bytes, rng):
+    """
+    (stage name, callable, samples processed, bits processed) for one configuration and payload,
+    samples is None for stages that only handle bits
+    """
+    sample_rate, freq0, freq1, bit_rate = CONFIGS[config]
+    payload = rng.integers(0, 256, payload_bytes, dtype=np.uint8).tobytes()
+    text = payload.decode('latin-1')
+    bits = np.concatenate([PREAMBLE_BITS, pack_bits(text)])
+    signal = modulate_fsk(bits, sample_rate=sample_rate, freq0=freq0, freq1=freq1, bit_rate=bit_rate)
+    n_samples, n_bits = len(signal), len(bits)
+    lowcut, highcut = min(freq0, freq1) - 100, max(freq0, freq1) + 100
+    correlator = PreambleCorrelator(PREAMBLE_BITS, sample_rate=sample_rate, freq0=freq0, freq1=freq1,
+                                    bit_rate=bit_rate)
+    channel = UnderwaterChannel(100, medium='saltwater', sample_rate=sample_rate, center_freq=(freq0 + freq1) / 2)
+    groups = pack_bits(text).reshape(-1, 8)
+
+    demod = dict(sample_rate=sample_rate, freq0=freq0, freq1=freq1, bit_rate=bit_rate)
+    timed = [('modulate_fsk', lambda: modulate_fsk(bits, **demod), n_samples, n_bits)]
+    # where the bin ranges around the two tones overlap (the ultrasonic pair at 650 bit/s) the fft
+    # backend can't tell them apart, and timing a demodulator that returns noise means nothing
+    bin_width = sample_rate / int(sample_rate / bit_rate)
+    if abs(freq1 - freq0) >= (2 * FFT_NEIGHBORHOOD + 1) * bin_width:
+        timed.append(('demodulate_fsk[fft]', lambda: demodulate_fsk(signal, **demod), n_samples, n_bits))
+    timed += [
+        ('demodulate_fsk[goertzel]', lambda: demodulate_fsk(signal, backend='goertzel', **demod), n_samples, n_bits),
+        ('bandpass_filter', lambda: bandpass_filter(signal, lowcut, highcut, sample_rate), n_samples, n_bits),
+        ('preamble_correlation', lambda: correlator.find(signal), n_samples, n_bits),
+        ('pack_bits', lambda: pack_bits(text), None, n_bits - len(PREAMBLE_BITS)),
+        ('unpack_bits', lambda: unpack_bits(groups), None, n_bits - len(PREAMBLE_BITS)),
+        ('add_channel_effects', lambda: channel.apply(signal, rng), n_samples, n_bits),
+    ]
+    if config in BASEBAND_DECIMATION:
+        # the baseband stages still count input samples, so real time compares with the full rate ones
+        front_end = BasebandConverter((freq0 + freq1) / 2, sample_rate, BASEBAND_DECIMATION[config])
+        iq = front_end.convert(signal)
+        iq_correlator = PreambleCorrelator(PREAMBLE_BITS, sample_rate=sample_rate, freq0=freq0, freq1=freq1,
+                                           bit_rate=bit_rate, front_end=front_end)
+        iq_demod = dict(sample_rate=front_end.output_rate, freq0=freq0 - front_end.center_freq,
+                        freq1=freq1 - front_end.center_freq, bit_rate=bit_rate)
+        timed += [
+            ('baseband_front_end', lambda: front_end.convert(signal), n_samples, n_bits),
+            ('preamble_correlation[baseband]', lambda: iq_correlator.find(iq), n_samples, n_bits),
+            ('demodulate_fsk[baseband]', lambda: demodulate_fsk(iq, backend='goertzel', **iq_demod), n_samples,
+             n_bits),
+        ]
+    return timed
+
+
+def run(repeat, sizes, seed=0):
+    rng = np.random.default_rng(seed)
+    results = {}
+    for config in CONFIGS:
+        sample_rate = CONFIGS[config][0]
+        for payload_bytes in sizes:
+            for name, fn, n_samples, n_bits in stages(config, payload_bytes, rng):
+                seconds = best_time(fn, repeat)
+                key = f"{config}/{payload_bytes}B/{name}"
+                results[key] = {'seconds': seconds, 'bits_per_s': n_bits / seconds}
+                if n_samples is None:
+                    print(f"{key:<48} {seconds * 1e3:10.2f} ms {'':>24} {n_bits / seconds:12.3e} bits/s")
+                    continue
+                results[key]['samples_per_s'] = n_samples / seconds
+                results[key]['x_realtime'] = (n_samples / sample_rate) / seconds
+                print(f"{key:<48} {seconds * 1e3:10.2f} ms {n_samples / seconds:14.3e} samples/s "
+                      f"{n_bits / seconds:12.3e} bits/s {results[key]['x_realtime']:10.1f}x real time")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Prints the speed ratio against the baseline, returns the keys that got slower than tolerance allows"""
+    regressions = []
+    print(f"\n{'stage':<48} {'baseline':>12} {'now':>12} {'speed':>8}")
+    for key, now in results.items():
+        if key not in baseline:
+            continue
+        before = baseline[key]['seconds']
+        speed = before / now['seconds']
+        flag = ''
+        if speed < 1 - tolerance:
+            flag = '  REGRESSION'
+            regressions.append(key)
+        print(f"{key:<48} {before * 1e3:10.2f}ms {now['seconds'] * 1e3:10.2f}ms {speed:7.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DSP hot paths against real time")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(PAYLOAD_BYTES), help="payload sizes in bytes")
+    parser.add_argument('--save', help="write results to this JSON baseline")
+    parser.add_argument('--compare', help="JSON baseline to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown before flagging, 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.sizes)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'host': platform.platform(), 'python': platform.python_version(),
+                       'numpy': np.__version__, 'results': results}, f, indent=2)
+        print(f"\nbaseline written to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
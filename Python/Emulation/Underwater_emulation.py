@@ -1,6 +1,5 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.signal import correlate, butter, lfilter
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -23,30 +22,35 @@ guard_band = 100 #  guard band
 preamble = np.array([1, 1, 1, 0, 0, 0, 1, 0, 0, 1, 0])  # Barker code
 samples_per_bit = int(sample_rate_fs / bit_rate)
 
-SPEED_OF_SOUND = 1447  
-# speed of sound in water 10 degrees celsius. source: https://www.omnicalculator.com/physics/speed-of-sound
-# adjust as needed 
+# speed of sound in water: see SPEED_OF_SOUND in Acoustic/channel.py, adjust as needed
 DISTANCE_M = 100
 MEDIUM_TYPE = "none"
+USE_CHANNEL = False  # pass the single run through UnderwaterChannel (Monte Carlo runs always do)
+FEC_SCHEME = None  # None, 'hamming74' or 'conv', see Acoustic/fec.py
+SOFT_DECISIONS = True  # decode FEC from per-bit LLRs (see Acoustic/soft.py) instead of hard bits
+# goertzel reads the exact tones; at 650 bps the fft backend's bin neighbourhoods of 39k/41k overlap
+DEMOD_BACKEND = 'goertzel'
+# 'bandpass' works on the full 88.2 kHz stream; 'baseband' mixes 39-41 kHz down to complex baseband
+# and decimates by DECIMATION (see Acoustic/baseband.py), so correlation and demodulation run at 5.88 kHz
+FRONT_END = 'baseband'
+DECIMATION = 15  # divides samples_per_bit (135), so bits stay whole output samples
+N_DATA_BITS = 21
+MONTE_CARLO_TRIALS = 1000
 
-# Generate random data then append preamble @ the start: 
-data_bits = np.random.randint(0, 2, 21)
-tx_bits = np.concatenate([preamble, data_bits])
-
-tx_signal = modulate_fsk(bits=tx_bits, sample_rate=sample_rate_fs, freq0=f0, freq1=f1,bit_rate=bit_rate)
-
+# Apply bandpass filter
+lowcut = min(f0, f1) - guard_band 
+highcut = max(f0, f1) + guard_band
 
 
-# todo: could probably make this it's own class 
 # Underwater Channel Effects
 def add_channel_effects(signal, distance_m, medium='saltwater', temp_c=10, salinity_ppt=35, depth_m=100):
     """
-    Simulates underwater acoustic channel effects
-    
+    Simulates underwater acoustic channel effects, see UnderwaterChannel in Acoustic/channel.py
+
     Args:
         signal (np.array): Input signal
         distance_m (float): Distance from source in meters
-        medium (str): Water type ('saltwater', 'freshwater', 'coastal', 'arctic')
+        medium (str): Water type ('none', 'saltwater', 'freshwater', 'coastal', 'arctic')
         temp_c (float): Water temperature in °C
         salinity_ppt (float): Salinity in parts per thousand
         depth_m (float): Depth in meters
@@ -54,111 +58,69 @@ def add_channel_effects(signal, distance_m, medium='saltwater', temp_c=10, salin
     Returns:
         np.array: Signal with channel effects
     """
-    # Normalize signal first
-    signal = signal / np.max(np.abs(signal))
-    
-    # 1. Calculate attenuation
-    def get_attenuation(freq, distance):
-        """Combines spreading and absorption loss"""
-        if medium == 'none':  # for testing without any channel affects
-            return 0  # 0 dB total loss
-        # Spreading loss (cylindrical)
-        # according to formula: TLspread​=10log10​(r) (r = distance (m))
-        spreading_loss = 10 * np.log10(distance)  # dB
-        
-        # example test for different environments: For best accuracy,
-        # the user should fill in stats depending on the water they are in
-        # Absorption loss (Thorp formula for frequencies > 400 Hz)
-        # Thorp's equation (dB/km)
-        # source for this: https://gorbatschow.github.io/SonarDocs/sound_absorption_sea_thorp.en/#octavematlab-implementation 
-         # Absorption loss (Thorp formula for frequencies > 400 Hz)
-        if medium == 'saltwater':
-            f_kHz = freq / 1000  
-            # Apply the Thorp formula from the source
-            alpha = 1.0936 * (
-                0.1 * (f_kHz**2) / (1 + f_kHz**2) + 
-                40 * (f_kHz**2) / (4100 + f_kHz**2)
-            )
-            absorption  = alpha * (distance_m / 1000) 
-            # ideally would measure these values where you were deploying for best accuracy. 
-        elif medium == 'freshwater':
-            #todo: 
-            pass
-        elif medium == 'coastal':
-             #todo: 
-            pass
-        elif medium == 'arctic':
-             #todo: 
-            pass
-        else:
-            raise ValueError(f"Unknown medium: {medium}")
-        
-        absorption_loss = absorption * (distance/1000)  # Convert to dB, div to convrt to km
-        
-        return spreading_loss + absorption_loss
-    
-    # 2. Apply frequency-dependent attenuation 
-    center_freq = (f0 + f1)/2
-    total_loss_db = get_attenuation(center_freq, distance_m)
-    attenuation = 10**(-total_loss_db/20)  # Convert dB to linear
-    
-    # 3. Apply basic multipath time spreading
-    # using formula: delay_spread=distanc/sound_speede​×sample_rate
-    delay_spread = int((distance_m / SPEED_OF_SOUND) * sample_rate_fs) 
-    multipath = 0.4 * np.roll(signal, delay_spread)
-    multipath[:delay_spread] = 0
-    
-    # example test for different environments: the user should fill in stats depending on the water they are in
-    # 4. Add environmental noise
-    def ambient_noise(freq):
-        """Wenz curve approximation for ambient noise"""
-        if medium == 'arctic':
-            return 1e-4  # Quieter environment
-        return 5e-4 * (freq/1000)**-1.5  # Frequency-dependent noise
-    
-    noise_level = ambient_noise(center_freq) * np.random.randn(len(signal))
-    
-    # 5. Combine all effects
-    attenuated_signal = signal * attenuation
-    noisy_signal = attenuated_signal + multipath + noise_level
-    
-    return noisy_signal / np.max(np.abs(noisy_signal))  # Renormalize
-
-
-#rx_signal = add_channel_effects(signal=tx_signal, distance_m=DISTANCE_M, medium=MEDIUM_TYPE)
-
-rx_signal = tx_signal
-# Apply bandpass filter
-lowcut = min(f0, f1) - guard_band 
-highcut = max(f0, f1) + guard_band
-filtered_signal = bandpass_filter(rx_signal, lowcut, highcut, sample_rate_fs)
-
-
-# [todo]: investigate if this is the best way to detect preamble
-def detect_preamble(signal, preamble):
-    # generates a signal, then compares the  signal read with the known generated one 
-    # todo: swap this out with the one that compares the bits 
-    preamble_signal = modulate_fsk(bits=preamble, sample_rate=sample_rate_fs, freq0=f0, freq1=f1,bit_rate=bit_rate)
-    correlation = correlate(signal, preamble_signal, mode='full')
-    peak_idx = np.argmax(correlation)
-    return peak_idx - len(preamble_signal) + 1  # Proper correlation offset
-
-
-# Detect preamble and demodulate (using filtered signal)
-preamble_start = detect_preamble(filtered_signal, preamble)
-#rx_bits = demodulate_fsk(filtered_signal, preamble_start + len(preamble) * samples_per_bit)
-rx_bits = demodulate_fsk(signal=filtered_signal, sample_rate=sample_rate_fs, freq0=f0, freq1=f1, bit_rate=bit_rate, start_index=preamble_start + len(preamble)* samples_per_bit )
+    channel = UnderwaterChannel(distance_m, medium=medium, sample_rate=sample_rate_fs, center_freq=(f0 + f1) / 2,
+                                temp_c=temp_c, salinity_ppt=salinity_ppt, depth_m=depth_m)
+    return channel.apply(signal)
+
+
+# one validated plan for both ends: tones, symbol length, preamble template, receive filter or baseband
+# front end and the demodulator kernels are all set up here, a bad combination fails on import
+if FRONT_END not in ('bandpass', 'baseband'):
+    raise ValueError(f"Unknown front end: {FRONT_END}")
+modem = FSKModem(sample_rate_fs, bit_rate, f0, f1, preamble, backend=DEMOD_BACKEND, guard_band=guard_band,
+                 decimation=DECIMATION if FRONT_END == 'baseband' else None)
+
+
+def receive_bits(filtered_signal, n_coded_bits, n_data_bits, fec=FEC_SCHEME, soft=SOFT_DECISIONS):
+    """Preamble sync, demodulation and FEC decoding of one signal out of modem.filter, None if no preamble was found"""
+    # after the first preamble scoring within 90% of the best (see FSKModem.sync);
+    # modem.find_preambles(signal) lists every packet in a longer capture
+    start = modem.sync(filtered_signal)
+    if start is None:
+        return None
+    if fec is None:
+        return np.array(modem.demodulate(filtered_signal, start)[:n_data_bits])
+    # missing trailing bits are decoded as zeros (hard) or erasures (soft, LLR 0), BER is measured
+    # on the corrected data bits
+    if soft:
+        rx_bits, _ = modem.demodulate(filtered_signal, start, soft=True)
+        rx_coded = np.zeros(n_coded_bits)
+    else:
+        rx_bits = modem.demodulate(filtered_signal, start)
+        rx_coded = np.zeros(n_coded_bits, dtype=np.uint8)
+    rx_coded[:min(len(rx_bits), n_coded_bits)] = rx_bits[:n_coded_bits]
+    return fec_decode(rx_coded, fec, n_data_bits, soft=soft)
+
+
+def monte_carlo_ber(n_trials=MONTE_CARLO_TRIALS, n_bits=N_DATA_BITS, distance_m=DISTANCE_M, medium=MEDIUM_TYPE,
+                    fec=FEC_SCHEME, seed=None, soft=SOFT_DECISIONS):
+    """
+    BER of many independent trials, modulated and passed through the channel as one batch
 
+    Returns:
+        np.array: BER of each trial, 1 for a trial whose preamble wasn't found
+        int: trials lost to sync failures
+    """
+    rng = np.random.default_rng(seed)
+    channel = UnderwaterChannel(distance_m, medium=medium, sample_rate=sample_rate_fs, center_freq=(f0 + f1) / 2)
+    data = rng.integers(0, 2, (n_trials, n_bits), dtype=np.uint8)
+    coded = np.stack([fec_encode(row, fec) for row in data])
+    filtered = modem.filter(channel.apply(modem.modulate(coded), rng))
+    ber = np.empty(n_trials)
+    sync_failures = 0
+    for i in range(n_trials):
+        rx = receive_bits(filtered[i], coded.shape[1], n_bits, fec, soft)
+        if rx is None:
+            sync_failures += 1
+            rx = []
+        ber[i] = np.mean(rx[:n_bits] != data[i, :len(rx)]) if len(rx) else 1.0
+    return ber, sync_failures
 
-# Bit Error Rate (BER)
-min_len = min(len(rx_bits), len(data_bits))
-ber = np.sum(np.abs(rx_bits[:min_len] - data_bits[:min_len])) / min_len
-print(f"Bit Error Rate (BER): {ber:.4f}")
 
 # ==============================
 #  Plotting
 # ==============================
-def plot_tx_rx_filtered(expected_bits, rx_bits, tx_signal, rx_signal, filtered_signal, samples_per_bit, distance=0, medium="unknown", temp=10): 
+def plot_tx_rx_filtered(expected_bits, rx_bits, tx_signal, rx_signal, filtered_signal, samples_per_bit, distance=0, medium="unknown", temp=10, tx_bits=()): 
     
     # Plot 1: Transmitted signal with bits
     plt.subplot(4, 1, 1)
@@ -218,16 +180,50 @@ def plot_tx_rx_filtered(expected_bits, rx_bits, tx_signal, rx_signal, filtered_s
     plt.tight_layout()
     plt.show()
 
-# Generate plots
-print("data bits:    ", ''.join(str(b) for b in data_bits[:len(rx_bits)]))
-print("received bits:", ''.join(str(b) for b in rx_bits))
-plot_tx_rx_filtered(
-    expected_bits=data_bits,  
-    rx_bits=rx_bits,
-    tx_signal=tx_signal,
-    rx_signal=rx_signal,
-    filtered_signal=filtered_signal,
-    samples_per_bit=samples_per_bit,
-    distance=DISTANCE_M,
-    medium=MEDIUM_TYPE
-)
\ No newline at end of file
+def main():
+    # Generate random data then append preamble @ the start: 
+    data_bits = np.random.randint(0, 2, N_DATA_BITS)
+    coded_bits = fec_encode(data_bits, FEC_SCHEME)
+    tx_bits = np.concatenate([preamble, coded_bits])
+
+    tx_signal = modem.modulate(coded_bits)
+    if USE_CHANNEL:
+        rx_signal = add_channel_effects(signal=tx_signal, distance_m=DISTANCE_M, medium=MEDIUM_TYPE)
+    else:
+        rx_signal = tx_signal
+    filtered_signal = bandpass_filter(rx_signal, lowcut, highcut, sample_rate_fs)
+
+    # Detect preamble and demodulate (using filtered signal)
+    received = filtered_signal if FRONT_END == 'bandpass' else modem.filter(rx_signal)
+    rx_bits = receive_bits(received, len(coded_bits), len(data_bits))
+
+    trial_ber, sync_failures = monte_carlo_ber()
+    print(f"Monte Carlo BER over {len(trial_ber)} trials ({MEDIUM_TYPE}, {DISTANCE_M}m): {trial_ber.mean():.4f}, "
+          f"{sync_failures} lost to sync failures")
+    if rx_bits is None:
+        print("No preamble found in the received signal")
+        return
+
+    # Bit Error Rate (BER)
+    min_len = min(len(rx_bits), len(data_bits))
+    ber = np.sum(np.abs(rx_bits[:min_len] - data_bits[:min_len])) / min_len
+    print(f"Bit Error Rate (BER): {ber:.4f}")
+
+    # Generate plots
+    print("data bits:    ", ''.join(str(b) for b in data_bits[:len(rx_bits)]))
+    print("received bits:", ''.join(str(b) for b in rx_bits))
+    plot_tx_rx_filtered(
+        expected_bits=data_bits,  
+        rx_bits=rx_bits,
+        tx_signal=tx_signal,
+        rx_signal=rx_signal,
+        filtered_signal=filtered_signal,
+        samples_per_bit=samples_per_bit,
+        distance=DISTANCE_M,
+        medium=MEDIUM_TYPE,
+        tx_bits=tx_bits
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+from Acoustic.link import PROFILE_MIN_SNR_DB
+"""
+Link adaptation calibration
+===============================
+Sends adaptive frames (Acoustic/link.py) at every profile through UnderwaterChannel
+over a range of distances, and records the SNR the receiver measured next to
+whether the frame got through. For each profile the threshold is the lowest
+measured SNR above which at least (1 - target PER) of the frames decoded, raised
+where needed so that a faster profile never needs less SNR than a slower one;
+these are the PROFILE_MIN_SNR_DB values LinkAdapter uses. Since thresholds are in
+measured SNR, they carry over to any distance / medium with similar noise.
+
+example:
+    python calibrate_link.py --out link_calibration.json
+"""
+
+PADDING_S = 0.5  # silence either side of each frame
+
+
+def run_profile_point(rate_id, distance_m, medium, multipath_gain, trials, payload_bytes, seed):
+    """(measured SNR, decoded) for `trials` frames at one profile and distance"""
+    rng = np.random.default_rng(seed)
+    tones = profile_tones(PROFILES[rate_id])
+    channel = UnderwaterChannel(distance_m, medium=medium, sample_rate=SAMPLE_RATE,
+                                center_freq=(tones[0] + tones[-1]) / 2, multipath_gain=multipath_gain)
+    results = []
+    for _ in range(trials):
+        payload = rng.integers(0, 256, payload_bytes, dtype=np.uint8).tobytes()
+        frame = modulate_adaptive(payload, rate_id)
+        lead = int(rng.integers(0, int(PADDING_S * SAMPLE_RATE)))
+        signal = np.zeros(len(frame) + int(2 * PADDING_S * SAMPLE_RATE))
+        signal[lead:lead + len(frame)] = frame
+        packet, quality = demodulate_adaptive(channel.apply(signal, rng))
+        ok = packet is not None and packet[1] == payload
+        results.append((quality.snr_db, ok))
+    return rate_id, results
+
+
+def threshold(results, target_per, bin_db=2.0):
+    """
+    Lower edge of the first SNR bin that, together with the next measured bin above
+    it, delivered >= 1 - target_per of its frames. Scanning up from the noise floor
+    keeps the odd multipath loss at high SNR from hiding where the noise threshold is.
+    """
+    results = [(snr, ok) for snr, ok in results if snr is not None]
+    if not results:
+        return None
+    snr = np.array([s for s, _ in results])
+    ok = np.array([o for _, o in results], dtype=np.float64)
+    bins = np.floor(snr / bin_db).astype(np.int64)
+    measured = np.unique(bins)
+    passed = [ok[bins == b].mean() >= 1 - target_per for b in measured]
+    for i in range(len(measured) - 1):
+        if passed[i] and passed[i + 1]:
+            return float(measured[i] * bin_db)
+    return None
+
+
+def monotonic_threshold(measured, slower):
+    """measured, raised to the highest threshold of the slower profiles (None if never reached)"""
+    known = [t for t in slower if t is not None]
+    if measured is None or not known:
+        return measured
+    return max(measured, max(known))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate the link adaptation SNR thresholds in the emulated channel")
+    parser.add_argument('--distances', type=float, nargs='+',
+                        default=np.geomspace(50e3, 700e3, 40).round(-2).tolist(),
+                        help="metres, the default spans roughly +10 to -40 dB at the audible tones")
+    parser.add_argument('--medium', default='saltwater')
+    parser.add_argument('--multipath-gain', type=float, default=0.4, help="echo amplitude, see UnderwaterChannel")
+    parser.add_argument('--trials', type=int, default=100, help="frames per profile and distance")
+    parser.add_argument('--payload', type=int, default=16, help="payload bytes per frame")
+    parser.add_argument('--target-per', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--out', help="write the thresholds and raw results to this JSON file")
+    args = parser.parse_args(argv)
+
+    points = [(rate_id, distance) for rate_id in range(len(PROFILES)) for distance in args.distances]
+    seeds = np.random.SeedSequence(args.seed).generate_state(len(points))
+    results = {rate_id: [] for rate_id in range(len(PROFILES))}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(run_profile_point, rate_id, distance, args.medium, args.multipath_gain, args.trials,
+                               args.payload, seed)
+                   for (rate_id, distance), seed in zip(points, seeds)]
+        for future in futures:
+            rate_id, point_results = future.result()
+            results[rate_id].extend(point_results)
+
+    thresholds = []
+    for rate_id, profile in enumerate(PROFILES):
+        measured = threshold(results[rate_id], args.target_per)
+        # running max: a dip below a slower profile is calibration noise, and LinkAdapter would
+        # skip the slower profile on the way up
+        min_snr = monotonic_threshold(measured, thresholds)
+        thresholds.append(min_snr)
+        print(f"profile {rate_id} {profile}: {net_bit_rate(profile):6.1f} bit/s net, needs {min_snr} dB "
+              f"(measured {measured} dB, currently {PROFILE_MIN_SNR_DB[rate_id]} dB)")
+    print(f"\nPROFILE_MIN_SNR_DB = {tuple(thresholds)}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'profiles': [list(p) for p in PROFILES], 'min_snr_db': thresholds,
+                       'target_per': args.target_per, 'medium': args.medium,
+                       'results': {str(k): v for k, v in results.items()}}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+"""
+BER / throughput sweep
+===============================
+Runs the modulate -> channel -> filter -> sync -> demodulate pipeline over a grid of
+operating points (distance, medium, bit rate, frequency pair, filter order, FEC)
+across a process pool. Every grid point gets its own seed derived from its
+parameters, so results are repeatable whatever order the workers finish in.
+Rows are appended to a CSV as they complete; rerunning with the same --out file
+skips points already run with the same trials, bits and seed, so long sweeps
+can be resumed. A point that fails (e.g. tones the modem can't separate at its
+bit rate) is reported and left out, the rest of the sweep carries on.
+
+example:
+    python sweep.py --distances 100 500 1000 --mediums saltwater coastal --bit-rates 325 650 \
+        --fec none hamming74 conv --trials 200 --out sweep.csv
+"""
+
+PREAMBLE_BITS = np.array([1, 1, 1, 0, 0, 0, 1, 0, 0, 1, 0])  # Barker code, as in Underwater_emulation.py
+GUARD_BAND = 100
+FIELDS = ['key', 'distance_m', 'medium', 'bit_rate', 'freq0', 'freq1', 'filter_order', 'fec', 'sample_rate',
+          'trials', 'data_bits', 'seed', 'ber', 'per', 'throughput_bps', 'elapsed_s']
+
+
+def point_key(point):
+    return '|'.join(f"{name}={point[name]}" for name in sorted(point))
+
+
+def run_key(point, trials, data_bits, seed):
+    # what a CSV row is resumed by: the point and everything else that changes its result
+    return point_key(dict(point, trials=trials, data_bits=data_bits, seed=seed))
+
+
+def point_seed(base_seed, key):
+    # crc32 rather than hash(): str hashes are salted per interpreter
+    return np.random.SeedSequence([base_seed, zlib.crc32(key.encode())]).generate_state(1)[0]
+
+
+def run_point(point, trials, data_bits, seed):
+    """
+    Simulates `trials` packets at one operating point
+
+    Args:
+        point (dict): distance_m, medium, bit_rate, freq0, freq1, filter_order, fec, sample_rate
+        trials (int): packets to simulate
+        data_bits (int): data bits per packet (before FEC)
+        seed (int): seed for data and channel noise
+
+    Returns:
+        dict: one CSV row
+    """
+    start_time = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    fs, bit_rate = point['sample_rate'], point['bit_rate']
+    freq0, freq1 = point['freq0'], point['freq1']
+    fec = None if point['fec'] == 'none' else point['fec']
+    samples_per_bit = int(fs / bit_rate)
+
+    # rejects a frequency pair the demodulator can't separate at this bit rate before any trial runs
+    modem = FSKModem(fs, bit_rate, freq0, freq1, PREAMBLE_BITS, guard_band=GUARD_BAND,
+                     filter_order=point['filter_order'], threshold=0.0)
+    data = rng.integers(0, 2, (trials, data_bits), dtype=np.uint8)
+    coded = np.stack([fec_encode(row, fec) for row in data])
+    signals = modem.modulate(coded)
+    # keep listening one bit past the end so the filter delay doesn't cut off the last bit
+    signals = np.pad(signals, ((0, 0), (0, samples_per_bit)))
+
+    channel = UnderwaterChannel(point['distance_m'], medium=point['medium'], sample_rate=fs,
+                                center_freq=(freq0 + freq1) / 2)
+    filtered = modem.filter(channel.apply(signals, rng))
+
+    bit_errors = 0
+    packet_errors = 0
+    for i in range(trials):
+        start = modem.sync(filtered[i])
+        if start is None:
+            # no preamble found: the packet is lost and every data bit counts as an error
+            bit_errors += data_bits
+            packet_errors += 1
+            continue
+        rx = np.zeros(coded.shape[1], dtype=np.uint8)
+        bits = modem.demodulate(filtered[i], start)
+        rx[:min(len(bits), len(rx))] = bits[:len(rx)]
+        errors = int(np.count_nonzero(fec_decode(rx, fec, data_bits) != data[i]))
+        bit_errors += errors
+        packet_errors += errors > 0
+
+    per = packet_errors / trials
+    airtime = (len(PREAMBLE_BITS) + coded.shape[1]) / bit_rate
+    return dict(point, key=run_key(point, trials, data_bits, seed), trials=trials, data_bits=data_bits, seed=seed,
+                ber=bit_errors / (trials * data_bits), per=per,
+                throughput_bps=data_bits * (1 - per) / airtime,
+                elapsed_s=round(time.perf_counter() - start_time, 3))
+
+
+def build_grid(args):
+    grid = []
+    for distance, medium, bit_rate, pair, order, fec in itertools.product(
+            args.distances, args.mediums, args.bit_rates, args.freq_pairs, args.filter_orders, args.fec):
+        freq0, freq1 = (float(f) for f in pair.split(':'))
+        grid.append(dict(distance_m=distance, medium=medium, bit_rate=bit_rate, freq0=freq0, freq1=freq1,
+                         filter_order=order, fec=fec, sample_rate=args.sample_rate))
+    return grid
+
+
+def completed_keys(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, newline='') as f:
+        return {row['key'] for row in csv.DictReader(f)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel BER/throughput sweep over channel and modem settings")
+    parser.add_argument('--distances', type=float, nargs='+', default=[100.0])
+    parser.add_argument('--mediums', nargs='+', default=['saltwater'])
+    parser.add_argument('--bit-rates', type=float, nargs='+', default=[650.0])
+    parser.add_argument('--freq-pairs', nargs='+', default=['41000:39000'], help="freq0:freq1 in Hz")
+    parser.add_argument('--filter-orders', type=int, nargs='+', default=[5])
+    parser.add_argument('--fec', nargs='+', default=['none'], choices=['none', 'hamming74', 'conv'])
+    parser.add_argument('--sample-rate', type=int, default=88200)
+    parser.add_argument('--trials', type=int, default=200, help="packets per grid point")
+    parser.add_argument('--bits', type=int, default=64, help="data bits per packet")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--out', default='sweep.csv')
+    args = parser.parse_args(argv)
+
+    done = completed_keys(args.out)
+    todo = []
+    for point in build_grid(args):
+        seed = point_seed(args.seed, point_key(point))
+        if run_key(point, args.trials, args.bits, seed) not in done:
+            todo.append((point, seed))
+    print(f"{len(todo)} grid points to run, {len(done)} already in {args.out}")
+    if not todo:
+        return
+
+    new_file = not os.path.exists(args.out)
+    with open(args.out, 'a', newline='') as f, ProcessPoolExecutor(max_workers=args.workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        if new_file:
+            writer.writeheader()
+        futures = {pool.submit(run_point, point, args.trials, args.bits, seed): point for point, seed in todo}
+        failed = 0
+        for n, future in enumerate(as_completed(futures), 1):
+            try:
+                row = future.result()
+            except Exception as e:
+                # not written, so a rerun tries the point again
+                failed += 1
+                print(f"[{n}/{len(todo)}] {point_key(futures[future])}: failed, {type(e).__name__}: {e}")
+                continue
+            writer.writerow(row)
+            f.flush()  # a killed sweep keeps every finished point
+            print(f"[{n}/{len(todo)}] {row['key']}: BER {row['ber']:.4f}, PER {row['per']:.3f}, "
+                  f"{row['throughput_bps']:.1f} bit/s")
+    if failed:
+        print(f"{failed} of {len(todo)} grid points failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,4 @@
-# simple_receive_loop_startstop.py
-import numpy as np
-import sounddevice as sd
-
+# example_receive.py
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -10,104 +7,48 @@ from Acoustic import *
 # using constants defined in constants.y in acoustic module
 # can redefine these if not fit for purpose
 
-def detect_symbol(chunk):
-    window = np.hanning(len(chunk))
-    chunk = chunk * window
-    fft = np.fft.fft(chunk)
-    magnitudes = np.abs(fft)
-
-    n = len(chunk)
-    freq_bins = np.fft.fftfreq(n, 1/SAMPLE_RATE)
-
-    def get_energy(target_freq):
-        idx = np.argmin(np.abs(freq_bins - target_freq))
-        return magnitudes[idx]
-
-    energy0 = get_energy(FREQ0)
-    energy1 = get_energy(FREQ1)
-    energy_start = get_energy(FREQ_START)
-    energy_stop = get_energy(FREQ_STOP)
-
-    energies = {
-        'start': energy_start,
-        'stop': energy_stop,
-        0: energy0,
-        1: energy1,
-    }
-
-    detected = max(energies, key=energies.get)
-    if energies[detected] < 5.0:
-        return None
-
-    return detected
-
-
-
-def main():
-    print("FSK Receiver with start/stop bits Ready. Listening... Press Ctrl+C to stop.")
+# 'fft' computes the whole spectrum, 'goertzel' only the four protocol tones (cheaper on small hosts)
+BACKEND = 'fft'
+# must match FRAMING in example_send.py: 'startstop' and 'gapless' print each byte as it arrives,
+# 'packet' prints each message once its crc checks out
+FRAMING = 'startstop'
+# follow the sender's symbol clock, required for FRAMING = 'gapless' in example_send.py
+TIMING_RECOVERY = True
+# only watch the preamble tones while idle (see squelch.py), the receiver wakes when they light up
+IDLE_SQUELCH = True
+SYMBOL_FREQS = (FREQ0, FREQ1, FREQ_START, FREQ_STOP)
+
+
+def main(backend=None, timeout=None, framing=FRAMING):
+    # backend: None for the sound card, or e.g. WavBackend('field_recording.wav') to replay a capture
+    # timeout: stop after this many seconds without a byte (useful at the end of a file)
+    if framing not in ('startstop', 'gapless', 'packet'):
+        raise ValueError(f"Unknown framing: {framing}")
+    print(f"FSK Receiver ({framing} framing) Ready. Listening... Press Ctrl+C to stop.")
     blocksize = int(SAMPLE_RATE * DURATION)
 
-    stream = sd.InputStream(samplerate=SAMPLE_RATE, channels=1, blocksize=blocksize)
+    # decodes each byte as soon as its stop symbol arrives (each packet as soon as its crc does),
+    # instead of buffering a whole message
+    receiver = StreamingReceiver(backend=BACKEND, block_size=blocksize, timing_recovery=TIMING_RECOVERY,
+                                 framing='packet' if framing == 'packet' else 'startstop')
+    callback = receiver.callback
+    if IDLE_SQUELCH:
+        # start/stop symbols keep it open between bytes, and a closed squelch means the next byte starts afresh
+        squelch = Squelch(SAMPLE_RATE, freqs=SYMBOL_FREQS, sink=receiver.feed, on_release=receiver.reset)
+        callback = squelch.callback
+    stream = (backend or get_backend()).input_stream(callback, SAMPLE_RATE, blocksize)
     stream.start()
 
-    buffer = []
-    recording = False
-
     try:
-        while True:
-            block, _ = stream.read(blocksize)
-            block = block[:, 0]
-            energy = np.sum(block ** 2) / len(block)
-
-            if not recording:
-                if energy > THRESHOLD:
-                    print("Signal detected, recording message...")
-                    recording = True
-                    buffer = list(block)
+        for data in receiver.iter_bytes(timeout):
+            if framing == 'packet':
+                print(f"Received message: '{data.decode('utf-8', errors='replace')}'")
             else:
-                buffer.extend(block)
-
-                if len(buffer) >= blocksize * (len(PREAMBLE) + (10 * 10)):  # Enough for small message
-                    samples_per_bit = int(SAMPLE_RATE * DURATION)
-                    symbols = []
-                    for i in range(0, len(buffer), samples_per_bit):
-                        chunk = buffer[i:i+samples_per_bit]
-                        if len(chunk) < samples_per_bit:
-                            break
-                        symbol = detect_symbol(chunk)
-                        if symbol is not None:
-                            symbols.append(symbol)
-
-                    # Separate preamble
-                    bits = [s for s in symbols if isinstance(s, int)]
-                    idx = detect_preamble(bits, PREAMBLE=PREAMBLE)
-                    if idx is not None:
-                        bits = symbols[idx + len(PREAMBLE):]
-                        
-                        # Now parse chars by start/stop wrapping
-                        current_byte = []
-                        collecting = False
-
-                        for sym in bits:
-                            if sym == 'start':
-                                collecting = True
-                                current_byte = []
-                            elif sym == 'stop':
-                                if collecting:
-                                    # We finished a byte, decode and print it
-                                    byte_text = unpack_bits([current_byte])
-                                    print(f"Received byte: '{byte_text}'")
-                                    collecting = False
-
-                            elif collecting and isinstance(sym, int):
-                                current_byte.append(sym)
-                    else:
-                        print("Preamble not found.")
-                    recording = False
-                    buffer = []
+                print(f"Received byte: '{data.decode('latin-1')}'")
 
     except KeyboardInterrupt:
         print("\nExiting receiver...")
+    finally:
         stream.stop()
 
 if __name__ == "__main__":
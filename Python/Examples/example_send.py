@@ -1,6 +1,5 @@
 # simple_send_loop_startstop.py
 import numpy as np
-import sounddevice as sd
 
 import sys
 import os
@@ -10,42 +9,55 @@ from Acoustic import *
 # using constants defined in constants.y in acoustic module
 # can redefine these if not fit for purpose
 
-# eventual packet goal
-# [preamble][start_bit][packet_header][message][stop_bit]
+# 'startstop': [preamble][start_bit][byte][stop_bit][silence]... one char at a time
+# 'gapless'  : [preamble][start_bit][byte][stop_bit]... without the silence, the receiver needs timing_recovery
+# 'packet'   : [preamble][sync word][type][length][message][crc] (see protocol.py), no per-byte overhead
+FRAMING = 'startstop'
+# packet framing goes through the same validated plan a receiver would build from MODEM.config
+MODEM = FSKModem(SAMPLE_RATE, 1 / DURATION, FREQ0, FREQ1, PREAMBLE)
+
+def send_message(message, framing=FRAMING, backend=None):
+    # backend: None for the sound card, or e.g. WavBackend('out.wav') / LoopbackBackend()
+    if framing == 'packet':
+        signal = MODEM.modulate(bytes_to_bits(encode_packet(message)))
+        play_audio(signal, SAMPLE_RATE, backend)
+        return
+    if framing not in ('startstop', 'gapless'):
+        raise ValueError(f"Unknown framing: {framing}")
 
-def send_message(message):
     bits = PREAMBLE + []
 
     for char in message:
         bits.append('start')
         bits.extend([int(b) for b in format(ord(char), '08b')])
         bits.append('stop')
-        bits.append('silence')  # used for timing alignment 
+        if framing == 'startstop':
+            bits.append('silence')  # used for timing alignment 
 
-    signal = []
+    # every symbol is one of five cached waveforms, gathered into one buffer
+    symbols = []
     for bit in bits:
         if bit == 'start':
-            signal.append(generate_tone(FREQ_START))
+            symbols.append((FREQ_START, DURATION))
         elif bit == 'stop':
-            signal.append(generate_tone(FREQ_STOP))
+            symbols.append((FREQ_STOP, DURATION))
         elif bit == 'silence':
-            signal.append(np.zeros(int(SAMPLE_RATE * (DURATION * 0.5))))  # Half a bit of silence
+            symbols.append((0, DURATION * 0.5))  # Half a bit of silence
         else:
             freq = FREQ1 if bit else FREQ0
-            signal.append(generate_tone(freq))
-    signal = np.concatenate(signal)
+            symbols.append((freq, DURATION))
+    signal = assemble_symbols(symbols)
 
-    sd.play(signal, samplerate=SAMPLE_RATE)
-    sd.wait()
+    play_audio(signal, SAMPLE_RATE, backend)
 
-def main():
+def main(backend=None):
     print("FSK Sender with start/stop bits Ready. Type text and press ENTER to send.")
     while True:
         try: 
             text = input("> ")
             if text.strip() == "":
                 continue
-            send_message(text)
+            send_message(text, backend=backend)
             print(f"Sent: '{text}'")
         except KeyboardInterrupt:
             print("\nExiting sender...")
@@ -1,8 +1,4 @@
 import tkinter as tk
-import sounddevice as sd
-import numpy as np
-import threading
-import time
 """
 Control a remote vehicle with a simple FSK setup
 ===============================
@@ -33,35 +29,23 @@ FREQ_RIGHT = 620
 FREQ_BACKWARDS = 690
 FREQ_STRAIGHTEN = 530  
 
-# Function to generate and play a tone
-def play_tone(freq, duration=DURATION):
-    t = np.linspace(0, duration, int(SAMPLE_RATE * duration), False)
-    tone = 0.5 * np.sin(2 * np.pi * freq * t)
-    sd.play(tone, SAMPLE_RATE)
-    sd.wait()
+# One output stream for everything: movement tones jump ahead of queued text at
+# the next symbol boundary instead of cutting it off
+scheduler = TransmitScheduler(SAMPLE_RATE)
+GAP = (0, 0.05)  # silence after each symbol
 
 
-#todo: switch this to send from acoustic module 
 # Send a character as 8-bit binary via FSK
 def send_char(c):
-    byte = format(ord(c), '08b')
-    threading.Thread(target=transmit_binary, args=(byte,)).start()
-
-def transmit_binary(bits):
+    bits = format(ord(c), '08b')
     print(f"Sending character as bits: {bits}")
-    play_tone(FREQ_START)
-    time.sleep(0.05)
-
+    tones = [(FREQ_START, DURATION), GAP]
     for bit in bits:
-        if bit == '0':
-            play_tone(FREQ_0)
-        elif bit == '1':
-            play_tone(FREQ_1)
-        time.sleep(0.05)
-
-    play_tone(FREQ_STOP)
-    
-    
+        tones.append((FREQ_1 if bit == '1' else FREQ_0, DURATION))
+        tones.append(GAP)
+    tones.append((FREQ_STOP, DURATION))
+    tones.append((0, 0.3))  # pause between characters
+    return scheduler.send_tones(tones, priority=PRIORITY_DATA, amplitude=0.5)
 
 
 # Movement control transmission
@@ -75,11 +59,8 @@ def send_movement_command(direction):
     }
     freq = freq_map.get(direction.upper())
     if freq:
-        threading.Thread(target=transmit_movement, args=(freq,)).start()
-
-def transmit_movement(freq):
-    print(f"Sending movement command tone: {freq} Hz")
-    play_tone(freq)
+        print(f"Sending movement command tone: {freq} Hz")
+        return scheduler.send_tones([(freq, DURATION)], priority=PRIORITY_CONTROL, amplitude=0.5)
 
 # GUI
 def create_gui():
@@ -94,10 +75,9 @@ def create_gui():
     entry.pack(pady=5)
 
     def send_text():
-        text = entry.get()
-        for c in text:
+        # queued, returns straight away so the buttons stay responsive
+        for c in entry.get():
             send_char(c)
-            time.sleep(0.3)
 
     send_button = tk.Button(root, text="Send Text", command=send_text, font=("Arial", 12))
     send_button.pack(pady=10)
@@ -125,4 +105,5 @@ def create_gui():
 
 if __name__ == "__main__":
     print('hello world')
-    create_gui()
\ No newline at end of file
+    with scheduler:
+        create_gui()
\ No newline at end of file
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+from Acoustic.baseband import NCO_CACHE_OUTPUTS, _nco
+
+
+def test_blockwise_process_matches_convert():
+    signal = np.random.default_rng(0).standard_normal(135 * 400)
+    front_end = BasebandConverter(40000, 88200, decimation=15)
+    whole = front_end.convert(signal)
+    tail = np.zeros(front_end.delay * front_end.decimation)
+    blocks = [front_end.process(block) for block in np.array_split(np.concatenate((signal, tail)), [7, 1000, 1001])]
+    np.testing.assert_allclose(np.concatenate(blocks)[front_end.delay:], whole, atol=1e-12)
+
+
+def test_long_signal_doesnt_cache_its_oscillator():
+    _nco.cache_clear()
+    front_end = BasebandConverter(40000, 88200, decimation=15)
+    tone = np.cos(2 * np.pi * 40500 * np.arange(15 * 3 * NCO_CACHE_OUTPUTS) / 88200)
+    iq = front_end.convert(tone)
+    assert _nco.cache_info().currsize == 0
+    # a tone 500 Hz above the centre stays a clean 500 Hz rotation across the whole signal
+    rotation = iq[100:-100][1:] * np.conj(iq[100:-100][:-1])
+    expected = 2 * np.pi * 500 / front_end.output_rate
+    np.testing.assert_allclose(np.angle(rotation), expected, atol=1e-2)
+    assert abs(np.angle(rotation).mean() - expected) < 1e-4
+
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+
+def test_silent_rows_stay_finite():
+    channel = UnderwaterChannel(50, sample_rate=44100, center_freq=1500)
+    signals = np.zeros((3, 4410))
+    signals[1] = np.sin(2 * np.pi * 1500 * np.arange(4410) / 44100)
+    received = channel.apply(signals, rng=0)
+    assert np.all(np.isfinite(received))
+    assert np.isclose(np.max(np.abs(received[1])), 1.0)
+    assert np.all(np.isfinite(channel.apply(np.zeros(4410), rng=0)))
+
+
+def test_stream_matches_one_pass_across_blocks():
+    channel = UnderwaterChannel(50, sample_rate=44100, center_freq=1500)
+    channel.noise_std = 0.0
+    signal = np.random.default_rng(1).standard_normal(20000)
+    whole = channel.stream().process(signal)
+    stream = channel.stream()
+    blocks = np.concatenate([stream.process(block) for block in np.array_split(signal, [7, 300, 5000, 5001])])
+    np.testing.assert_allclose(blocks, whole)
+    echo = channel.attenuation * channel.multipath_gain * np.roll(signal, channel.delay_samples)
+    echo[:channel.delay_samples] = 0
+    np.testing.assert_allclose(whole, stream.gain * (channel.attenuation * signal + echo))
+
+
+def test_loopback_keeps_level_and_silence():
+    channel = UnderwaterChannel(50, sample_rate=44100, center_freq=1500)
+    backend = LoopbackBackend(channel, rng=0)
+    tone = np.sin(2 * np.pi * 1500 * np.arange(4410) / 44100)
+    for block in (tone, 0.1 * tone, np.zeros(4410)):
+        backend.play(block)
+    loud, quiet, silent = (backend.record(0.1, 44100) for _ in range(3))
+    d = channel.delay_samples
+    assert np.all(np.isfinite(silent)) and np.max(np.abs(silent[d:])) < 0.01
+    assert np.max(np.abs(silent[:d])) > 0.01  # the quiet block's echo carries into the silent one
+    assert 8 < np.std(loud[d:]) / np.std(quiet[d:]) < 12
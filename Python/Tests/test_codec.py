@@ -0,0 +1,44 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+
+def _format_bits(text):
+    # the original per-character format(ord(c), '08b') packing
+    return [int(bit) for c in text for bit in format(ord(c), '08b')]
+
+
+def test_pack_bits_matches_per_character_format():
+    text = 'Hello, car! \xe9\xff\x00'
+    bits = pack_bits(text)
+    assert bits.dtype == np.uint8
+    assert bits.tolist() == _format_bits(text)
+    assert unpack_bits(bits.reshape(-1, 8)) == text
+    assert unpack_bits([list(group) for group in bits.reshape(-1, 8)] + [[1, 0]]) == text
+
+
+def test_binary_round_trip_for_every_buffer_type():
+    data = bytes(range(256))
+    for payload in (data, bytearray(data), memoryview(data), np.frombuffer(data, dtype=np.uint8)):
+        for bitorder in ('big', 'little'):
+            assert bits_to_bytes(bytes_to_bits(payload, bitorder), bitorder) == data
+    assert bytes_to_bits(b'\x01', 'little').tolist() == [1, 0, 0, 0, 0, 0, 0, 0]
+
+
+def test_numpy_payload_sends_its_raw_memory():
+    samples = np.array([1.5, -2.25, 1e6], dtype=np.float32)
+    bits = bytes_to_bits(samples)
+    assert len(bits) == 8 * samples.nbytes
+    assert np.array_equal(np.frombuffer(bits_to_bytes(bits), dtype=np.float32), samples)
+
+
+def test_text_round_trip_and_bit_errors():
+    text = 'temp 12.5°C ✓'
+    bits = text_to_bits(text)
+    assert bits_to_text(bits) == text
+    bits[-8] ^= 1  # continuation byte of the check mark loses its high bit
+    assert '�' in bits_to_text(bits)
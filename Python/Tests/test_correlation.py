@@ -0,0 +1,50 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+PREAMBLE = [1, 1, 1, 0, 0, 0, 1, 0, 0, 1, 0]
+
+
+def _direct_scores(signal, template):
+    # normalised correlation straight from np.correlate, O(N*M)
+    corr = np.correlate(signal, template, mode='valid')
+    window_energy = np.convolve(signal * signal, np.ones(len(template)), mode='valid')
+    return corr / (np.sqrt(window_energy) * np.linalg.norm(template))
+
+
+def test_overlap_save_matches_direct_correlation():
+    correlator = PreambleCorrelator(PREAMBLE, 8000, 1000, 2000, 200, fft_size=1024)
+    rng = np.random.default_rng(7)
+    signal = rng.standard_normal(5000)
+    signal[1234:1234 + len(correlator.template)] += 3 * correlator.template
+    scores = correlator.correlate(signal)
+    np.testing.assert_allclose(scores, _direct_scores(signal, correlator.template), atol=1e-9)
+    assert np.argmax(scores) == 1234
+
+
+def test_finds_every_packet_whatever_the_block_size():
+    correlator = PreambleCorrelator(PREAMBLE, 8000, 1000, 2000, 200)
+    rng = np.random.default_rng(8)
+    signal = 0.3 * rng.standard_normal(20000)
+    starts = [1000, 7000, 15500]
+    for start, gain in zip(starts, [1.0, 0.5, 4.0]):
+        signal[start:start + len(correlator.template)] += gain * correlator.template
+    assert [start for start, _ in correlator.find(signal)] == starts
+    streamed = []
+    for i in range(0, len(signal), 333):
+        streamed.extend(correlator.feed(signal[i:i + 333]))
+    streamed.extend(correlator.flush())
+    offline = correlator.find(signal, block_size=4096)
+    assert [start for start, _ in streamed] == [start for start, _ in offline]
+    np.testing.assert_allclose([score for _, score in streamed], [score for _, score in offline], atol=1e-9)
+    assert all(score > 0.7 for _, score in streamed)
+
+
+def test_silence_scores_zero():
+    correlator = PreambleCorrelator(PREAMBLE, 8000, 1000, 2000, 200)
+    assert not np.any(correlator.correlate(np.zeros(3000)))
+    assert correlator.find(np.zeros(3000)) == []
@@ -0,0 +1,84 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+from Acoustic.fsk import FRAME_BATCH
+
+
+def _loop_modulate(bits, sample_rate, freq0, freq1, bit_rate):
+    # the original per-bit concatenate loop
+    samples_per_bit = int(sample_rate / bit_rate)
+    t = np.linspace(0, 1 / bit_rate, samples_per_bit, endpoint=False)
+    signal = np.array([])
+    for bit in bits:
+        signal = np.concatenate((signal, np.sin(2 * np.pi * (freq1 if bit else freq0) * t)))
+    return signal
+
+
+def test_modulate_matches_loop():
+    bits = np.random.default_rng(0).integers(0, 2, 40)
+    expected = _loop_modulate(bits, 44100, 1200, 1500, 50)
+    np.testing.assert_allclose(modulate_fsk(bits, 44100, 1200, 1500, 50), expected, atol=1e-9)
+    out = np.empty(len(expected), dtype=np.float32)
+    assert modulate_fsk(bits, 44100, 1200, 1500, 50, dtype=np.float32, out=out) is out
+    np.testing.assert_allclose(out, expected, atol=1e-6)
+
+
+def test_batch_rows_match_single_signals():
+    bits = np.random.default_rng(1).integers(0, 2, (3, 20))
+    batch = modulate_fsk_batch(bits, 44100, 1200, 1500, 50, phase_continuous=True)
+    for row, signal in zip(bits, batch):
+        np.testing.assert_allclose(signal, modulate_fsk(row, 44100, 1200, 1500, 50, phase_continuous=True))
+
+
+def test_phase_continuous_has_no_jumps():
+    bits = np.random.default_rng(2).integers(0, 2, 200)
+    sample_rate, bit_rate = 44100, 70  # tones don't finish a whole cycle per bit
+    step = 2 * np.pi * 1500 / sample_rate
+    # the largest sample-to-sample change a 1500 Hz sine can make, with a little slack
+    limit = 2 * np.sin(step / 2) * 1.01
+    assert np.max(np.abs(np.diff(modulate_fsk(bits, sample_rate, 1200, 1500, bit_rate, phase_continuous=True)))) < limit
+    assert np.max(np.abs(np.diff(modulate_fsk(bits, sample_rate, 1200, 1500, bit_rate)))) > limit
+
+
+def _loop_demodulate(signal, sample_rate, freq0, freq1, bit_rate, start_index=0):
+    # the original per-bit FFT loop, returning the energies behind each decision
+    samples_per_bit = int(sample_rate / bit_rate)
+    window = np.hanning(samples_per_bit)
+    energies = []
+    for i in range(start_index, len(signal), samples_per_bit):
+        chunk = signal[i:i + samples_per_bit]
+        if len(chunk) < samples_per_bit:
+            break
+        magnitudes = np.abs(np.fft.fft(chunk * window))
+        n = len(chunk)
+
+        def get_max_energy(target_freq):
+            bin_center = int(target_freq * n / sample_rate)
+            return np.max(magnitudes[max(0, bin_center - 2):min(n // 2, bin_center + 3)])
+
+        energies.append((get_max_energy(freq0), get_max_energy(freq1)))
+    return np.array(energies)
+
+
+def test_batched_demodulate_matches_loop():
+    rng = np.random.default_rng(3)
+    bits = rng.integers(0, 2, 300)
+    signal = modulate_fsk(bits, 44100, 1200, 1500, 50) + 0.8 * rng.standard_normal(300 * 882)
+    signal = np.concatenate((np.zeros(123), signal, np.zeros(500)))
+    expected = _loop_demodulate(signal, 44100, 1200, 1500, 50, start_index=123)
+    rx, energies = demodulate_fsk(signal, 44100, 1200, 1500, 50, start_index=123, return_energies=True)
+    np.testing.assert_allclose(energies, expected, rtol=1e-9)
+    assert rx == (expected[:, 1] > expected[:, 0]).astype(int).tolist()
+    assert rx[:300] == bits.tolist()
+
+
+def test_batched_demodulate_across_frame_batches():
+    # more bits than one rfft batch holds
+    bits = np.random.default_rng(4).integers(0, 2, FRAME_BATCH + 100)
+    signal = modulate_fsk(bits, 44100, 5000, 15000, 44100 / 32)
+    _, energies = demodulate_fsk(signal, 44100, 5000, 15000, 44100 / 32, return_energies=True)
+    np.testing.assert_allclose(energies, _loop_demodulate(signal, 44100, 5000, 15000, 44100 / 32), rtol=1e-9)
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+
+@pytest.mark.parametrize('window', ['hanning', 'hamming', None])
+def test_energies_match_scalar_goertzel(window):
+    rng = np.random.default_rng(5)
+    frames = rng.standard_normal((6, 441))
+    freqs = (1000, 1234.5, 2000, 3100)
+    taper = {'hanning': np.hanning, 'hamming': np.hamming, None: np.ones}[window](441)
+    expected = [[goertzel(frame * taper, f, 44100) for f in freqs] for frame in frames]
+    np.testing.assert_allclose(goertzel_energies(frames, freqs, 44100, window), expected, rtol=1e-8)
+
+
+def test_complex_frames_match_fft_bins():
+    rng = np.random.default_rng(6)
+    frames = rng.standard_normal((4, 256)) + 1j * rng.standard_normal((4, 256))
+    freqs = (0.0, 8 * 8000 / 256, -20 * 8000 / 256)
+    expected = np.abs(np.fft.fft(frames, axis=1))[:, [0, 8, -20]]
+    np.testing.assert_allclose(goertzel_energies(frames, freqs, 8000, None), expected, rtol=1e-8)
+
+
+def test_tone_bank_is_cached_and_read_only():
+    kernel = tone_bank((1000.0, 2000.0), 441, 44100)
+    assert kernel is tone_bank((1000.0, 2000.0), 441, 44100)
+    with pytest.raises(ValueError):
+        kernel[0, 0] = 0
+
+
+def test_unknown_window():
+    with pytest.raises(ValueError):
+        goertzel_energies(np.zeros((1, 16)), (1000,), 8000, window='blackman')
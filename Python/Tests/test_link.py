@@ -0,0 +1,61 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+
+@pytest.mark.parametrize('rate_id', range(len(PROFILES)))
+def test_adaptive_frame_found_by_search(rate_id):
+    rng = np.random.default_rng(rate_id)
+    for _ in range(5):
+        payload = rng.integers(0, 256, 16, dtype=np.uint8).tobytes()
+        frame = modulate_adaptive(payload, rate_id)
+        lead = int(rng.integers(0, SAMPLE_RATE // 2))
+        signal = np.zeros(len(frame) + SAMPLE_RATE)
+        signal[lead:lead + len(frame)] = frame
+        signal += 0.08 * rng.standard_normal(len(signal))
+        packet, quality = demodulate_adaptive(signal)
+        assert packet is not None and packet[1] == payload
+        assert quality.rate_id == rate_id and quality.crc_ok
+
+
+def test_adaptive_noise_only_reports_no_rate():
+    rng = np.random.default_rng(0)
+    packet, quality = demodulate_adaptive(0.1 * rng.standard_normal(2 * SAMPLE_RATE))
+    assert packet is None and quality.rate_id is None and not quality.crc_ok
+
+
+def test_adaptive_weak_frame_found_by_search():
+    # the preamble scores about 0.2 here, well below 1 but far above noise alone
+    rng = np.random.default_rng(0)
+    payload = rng.integers(0, 256, 16, dtype=np.uint8).tobytes()
+    frame = modulate_adaptive(payload, 0)
+    signal = np.zeros(len(frame) + SAMPLE_RATE)
+    signal[1000:1000 + len(frame)] = frame
+    signal += 3.0 * rng.standard_normal(len(signal))
+    packet, quality = demodulate_adaptive(signal)
+    assert packet is not None and packet[1] == payload
+    assert quality.snr_db < -10
+
+
+def test_calibrated_thresholds_never_decrease():
+    from Acoustic.link import PROFILE_MIN_SNR_DB
+    assert len(PROFILE_MIN_SNR_DB) == len(PROFILES)
+    assert np.all(np.diff(PROFILE_MIN_SNR_DB) >= 0)
+    with pytest.raises(ValueError):
+        LinkAdapter(min_snr_db=(-22.0, -20.0, -22.0, -16.0, -18.0, -16.0))
+
+
+def test_adapter_climbs_through_every_profile():
+    adapter = LinkAdapter(smoothing=1.0)
+    rates = [adapter.update(LinkQuality(adapter.rate_id, snr_db, True)) for snr_db in np.arange(-30.0, 20.0, 0.5)]
+    assert np.all(np.diff(rates) >= 0)
+    assert sorted(set(rates)) == list(range(len(PROFILES)))
+    for rate_id, threshold in enumerate(adapter.min_snr_db):
+        adapter.snr_db = threshold + adapter.margin_db
+        # equal thresholds share an SNR, the fastest of them is the one supported
+        assert adapter.supported() == np.flatnonzero(adapter.min_snr_db == threshold)[-1]
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+
+def test_gray_code_round_trip_and_neighbours():
+    values = np.arange(256)
+    codes = gray_encode(values)
+    assert np.array_equal(gray_decode(codes), values)
+    # neighbouring tones differ in exactly one bit
+    assert all(bin(int(a ^ b)).count('1') == 1 for a, b in zip(codes[:-1], codes[1:]))
+
+
+@pytest.mark.parametrize('M', [2, 4, 8, 16])
+@pytest.mark.parametrize('phase_continuous', [False, True])
+def test_round_trip(M, phase_continuous):
+    rng = np.random.default_rng(M)
+    bits = rng.integers(0, 2, 40 * (M.bit_length() - 1), dtype=np.uint8)
+    signal = modulate_mfsk(bits, M, 8000, 1000, 100, phase_continuous=phase_continuous)
+    signal = signal + 0.3 * rng.standard_normal(len(signal))
+    assert np.array_equal(demodulate_mfsk(signal, M, 8000, 1000, 100), bits)
+
+
+def test_partial_symbol_is_zero_padded():
+    signal = modulate_mfsk([1, 1, 0, 1, 1], 8, 8000, 1000, 100)
+    assert len(signal) == 2 * 80
+    assert demodulate_mfsk(signal, 8, 8000, 1000, 100).tolist() == [1, 1, 0, 1, 1, 0]
+
+
+def test_neighbouring_tone_costs_one_bit():
+    M = 8
+    tones = mfsk_tones(M, 1000, 100, 8000)
+    t = np.arange(80) / 8000
+    for i in range(M - 1):
+        decoded = [demodulate_mfsk(np.sin(2 * np.pi * tones[j] * t), M, 8000, 1000, 100) for j in (i, i + 1)]
+        assert np.count_nonzero(decoded[0] != decoded[1]) == 1
+
+
+def test_rejects_bad_configurations():
+    with pytest.raises(ValueError):
+        modulate_mfsk([0, 1], 6)
+    with pytest.raises(ValueError):
+        mfsk_tones(16, 3800, 100, 8000)
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+
+@pytest.mark.parametrize('config', [dict(), dict(sample_rate=88200, bit_rate=650, freq0=41000, freq1=39000,
+                                                 decimation=15)])
+def test_sync_ignores_preamble_in_payload(config):
+    modem = FSKModem(**config)
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        bits = rng.integers(0, 2, 48)
+        at = int(rng.integers(0, len(bits) - len(modem.preamble)))
+        bits[at:at + len(modem.preamble)] = modem.preamble
+        lead = int(rng.integers(0, 10 * modem.samples_per_bit))
+        signal = np.concatenate((np.zeros(lead), modem.modulate(bits), np.zeros(4 * modem.samples_per_bit)))
+        signal += 0.05 * rng.standard_normal(len(signal))
+        assert modem.receive(signal)[:len(bits)] == bits.tolist()
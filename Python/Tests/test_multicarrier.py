@@ -0,0 +1,28 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+
+def test_multicarrier_biased_data_round_trip():
+    # ASCII over 8 carriers: the carrier holding bit 7 only ever sends 0
+    bits = text_to_bits("Hello world, plain ASCII only" * 4)
+    carriers = carrier_pairs(8, 1000, 20, SAMPLE_RATE)
+    signal = modulate_multicarrier_fsk(bits, carriers, SAMPLE_RATE, 20)
+    rng = np.random.default_rng(0)
+    for noise in (0.0, 0.01):
+        received = signal + noise * rng.standard_normal(len(signal))
+        for normalize in (True, False):
+            rx = demodulate_multicarrier_fsk(received, carriers, SAMPLE_RATE, 20, normalize=normalize)
+            assert np.array_equal(rx[:len(bits)], bits)
+
+
+def test_multicarrier_normalize_evens_out_carrier_levels():
+    carriers = carrier_pairs(4, 1000, 20, SAMPLE_RATE)
+    bits = np.random.default_rng(1).integers(0, 2, 400)
+    signal = modulate_multicarrier_fsk(bits, carriers, SAMPLE_RATE, 20)
+    _, energies = demodulate_multicarrier_fsk(signal, carriers, SAMPLE_RATE, 20, return_energies=True)
+    assert np.allclose(energies.max(axis=2).mean(axis=0), 1.0)
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+
+def test_incomplete_backend_fails_when_built():
+    class PlayOnly(AudioBackend):
+        def output_stream(self, sample_rate=SAMPLE_RATE, dtype=np.float32):
+            return None
+
+    with pytest.raises(TypeError):
+        PlayOnly()
+    assert isinstance(LoopbackBackend(), AudioBackend)
+
+
+def test_generate_tone_is_cached_and_read_only():
+    tone = generate_tone(1000, 0.01, 8000, 0.5, np.float32)
+    assert tone is generate_tone(1000.0, 0.01, 8000, 0.5, np.float32)
+    assert tone.dtype == np.float32 and len(tone) == 80
+    t = np.arange(80) / 8000
+    np.testing.assert_allclose(tone, 0.5 * np.sin(2 * np.pi * 1000 * t), atol=1e-6)
+    with pytest.raises(ValueError):
+        tone[0] = 1.0
+    assert not np.any(generate_tone(0, 0.01, 8000))
+
+
+def test_assemble_symbols_matches_concatenated_tones():
+    symbols = [(1000, 0.01), (0, 0.005), (2000, 0.02), (1000, 0.01)]
+    expected = np.concatenate([generate_tone(f, d, 8000, 0.8) for f, d in symbols])
+    np.testing.assert_array_equal(assemble_symbols(symbols, 8000, 0.8), expected)
+    out = np.empty(len(expected))
+    assert assemble_symbols(symbols, 8000, 0.8, out=out) is out
+    np.testing.assert_array_equal(out, expected)
+    with pytest.raises(ValueError):
+        assemble_symbols(symbols, 8000, 0.8, out=np.empty(len(expected) + 1))
+    assert len(assemble_symbols([], 8000)) == 0
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+
+def test_parser_skips_corrupted_length():
+    good = encode_packet_bits(b'hello world')
+    bad = good.copy()
+    bad[24:40] = 1  # length field 0xFFFF
+    parser = PacketParser()
+    assert parser.feed(np.concatenate((bad, good, good))) == [(0, b'hello world')] * 2
+    assert parser.rejected == 1
+
+
+def test_parser_bit_at_a_time_is_linear():
+    parser = PacketParser(max_payload=4000)
+    bits = encode_packet_bits(bytes(range(256)) * 8)
+    start = time.perf_counter()
+    packets = []
+    for bit in bits:
+        packets += parser.feed([bit])
+    assert packets == [(0, bytes(range(256)) * 8)]
+    assert time.perf_counter() - start < 2.0
+
+
+def test_parser_block_sizes_agree():
+    rng = np.random.default_rng(0)
+    payloads = [rng.integers(0, 256, n, dtype=np.uint8).tobytes() for n in (0, 5, 40)]
+    noise = [rng.integers(0, 2, n, dtype=np.uint8) for n in (7, 30, 3)]
+    bits = np.concatenate([b for pair in zip(noise, (encode_packet_bits(p, fec='hamming74') for p in payloads))
+                           for b in pair])
+    for block in (1, 13, len(bits)):
+        parser = PacketParser(fec='hamming74')
+        packets = []
+        for i in range(0, len(bits), block):
+            packets += parser.feed(bits[i:i + block])
+        assert [p for _, p in packets] == payloads
+
+
+def _naive_sync_positions(bits, sync, max_errors):
+    # the per-position loop the array search replaces
+    return [i for i in range(len(bits) - len(sync) + 1)
+            if sum(int(b) != s for b, s in zip(bits[i:i + len(sync)], sync)) <= max_errors]
+
+
+def test_sync_search_matches_naive_loop():
+    rng = np.random.default_rng(1)
+    bits = rng.integers(0, 2, 500, dtype=np.uint8)
+    sync = [1, 0, 1, 1, 0, 0, 1, 0, 1, 1, 1, 0]
+    for max_errors in (0, 1, 2):
+        expected = _naive_sync_positions(bits, sync, max_errors)
+        assert find_sync_word(bits, sync, max_errors).tolist() == expected
+        assert find_sync_word(np.packbits(bits), sync, max_errors, packed=True).tolist() == expected
+        assert detect_preamble(bits, sync, max_errors) == (expected[0] if expected else None)
+
+
+def test_sync_search_tolerates_a_flipped_bit():
+    sync = [1, 0, 1, 0, 1, 0, 1, 0]
+    bits = np.array([0, 0, 0, 1, 0, 1, 1, 1, 0, 1, 0, 0, 0], dtype=np.uint8)  # sync at 3 with bit 6 flipped
+    assert detect_preamble(bits, sync) is None
+    assert detect_preamble(bits, sync, max_errors=1) == 3
+    assert detect_preamble(bits[:5], sync) is None
+
+
+def test_sync_searcher_resumes_across_blocks():
+    rng = np.random.default_rng(2)
+    bits = rng.integers(0, 2, 1000, dtype=np.uint8)
+    expected = find_sync_word(bits, max_errors=1).tolist()
+    for block in (1, 7, 64):
+        searcher = SyncSearcher(max_errors=1)
+        found = np.concatenate([searcher.feed(bits[i:i + block]) for i in range(0, len(bits), block)])
+        assert found.tolist() == expected
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+
+def test_blockwise_filter_matches_one_shot():
+    signal = np.random.default_rng(0).standard_normal(20000)
+    bandpass = BandpassFilter(1100, 1600, 44100)
+    blocks = [bandpass.process(block) for block in np.array_split(signal, [1, 512, 513, 9000])]
+    np.testing.assert_allclose(np.concatenate(blocks), bandpass_filter(signal, 1100, 1600, 44100))
+
+
+def test_cached_design_is_read_only():
+    sos = butter_bandpass_sos(1100, 1600, 44100)
+    assert butter_bandpass_sos(1100, 1600, 44100) is sos
+    with pytest.raises(ValueError):
+        sos[0, 0] = 0.0
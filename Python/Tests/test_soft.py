@@ -0,0 +1,54 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+
+def test_llr_sign_is_the_hard_decision():
+    rng = np.random.default_rng(13)
+    bits = rng.integers(0, 2, 600)
+    signal = modulate_fsk(bits, 8000, 1000, 1500, 100)
+    for noise in (0.1, 1.0, 3.0):
+        received = signal + noise * rng.standard_normal(len(signal))
+        hard = demodulate_fsk(received, 8000, 1000, 1500, 100)
+        llrs, quality = demodulate_fsk(received, 8000, 1000, 1500, 100, soft=True)
+        assert np.array_equal(llrs > 0, np.asarray(hard, dtype=bool))
+        assert 0 <= quality.expected_ber <= 0.5
+
+
+def test_confidence_follows_snr():
+    rng = np.random.default_rng(14)
+    signal = modulate_fsk(rng.integers(0, 2, 400), 8000, 1000, 1500, 100)
+    qualities = [demodulate_fsk(signal + noise * rng.standard_normal(len(signal)), 8000, 1000, 1500, 100,
+                                soft=True)[1] for noise in (0.3, 1.0, 2.0)]
+    assert qualities[0].snr_db > qualities[1].snr_db > qualities[2].snr_db
+    assert qualities[0].confidence > qualities[1].confidence > qualities[2].confidence
+
+
+@pytest.mark.parametrize('scheme', ['hamming74', 'conv'])
+def test_soft_decoding_beats_hard(scheme):
+    rng = np.random.default_rng(12)
+    data = rng.integers(0, 2, 2000).astype(np.uint8)
+    signal = modulate_fsk(fec_encode(data, scheme), 8000, 1000, 1500, 100)
+    received = signal + 1.6 * rng.standard_normal(len(signal))
+    hard = np.asarray(demodulate_fsk(received, 8000, 1000, 1500, 100), dtype=np.uint8)
+    llrs, _ = demodulate_fsk(received, 8000, 1000, 1500, 100, soft=True)
+    hard_errors = np.count_nonzero(fec_decode(hard, scheme, len(data)) != data)
+    soft_errors = np.count_nonzero(fec_decode(llrs, scheme, len(data), soft=True) != data)
+    assert soft_errors < hard_errors
+    assert np.array_equal(fec_decode(2.0 * fec_encode(data, scheme) - 1, scheme, len(data), soft=True), data)
+
+
+def test_soft_sync_weighs_disagreements_by_confidence():
+    sync = [1, 0, 1, 0, 1, 0, 1, 0]
+    llrs = 4.0 * (2 * np.array([0, 0] + sync + [0], dtype=np.float64) - 1)
+    assert find_sync_word_soft(llrs, sync).tolist() == [2]
+    doubtful, confident = llrs.copy(), llrs.copy()
+    doubtful[3], confident[3] = 0.5, 4.0  # sync bit 1 (a 0) flipped
+    assert find_sync_word_soft(doubtful, sync, max_cost=1.0).tolist() == [2]
+    assert find_sync_word_soft(confident, sync, max_cost=1.0).tolist() == []
+    assert find_sync_word(confident > 0, sync, max_errors=1).tolist() == [2]
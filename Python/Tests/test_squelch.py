@@ -0,0 +1,34 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+
+def _capture(lead, rng):
+    # noise with two half-second bursts of FSK, the first after lead seconds
+    message = 0.5 * modulate_fsk(rng.integers(0, 2, 50), SAMPLE_RATE, FREQ0, FREQ1, 100)
+    gap = np.zeros(SAMPLE_RATE)
+    signal = np.concatenate((np.zeros(int(lead * SAMPLE_RATE)), message, gap, message, gap))
+    return signal + 0.02 * rng.standard_normal(len(signal))
+
+
+@pytest.mark.parametrize('lead', [0.3, 1.0, 3.0])
+def test_messages_open_squelch_after_short_lead_in(lead):
+    rng = np.random.default_rng(0)
+    squelch = Squelch()
+    signal = _capture(lead, rng)
+    for block in np.array_split(signal, len(signal) // 1024):
+        squelch.feed(block)
+    assert squelch.triggers == 2
+
+
+def test_noise_alone_stays_closed():
+    rng = np.random.default_rng(1)
+    squelch = Squelch()
+    for _ in range(200):
+        squelch.feed(0.02 * rng.standard_normal(1024))
+    assert squelch.triggers == 0 and squelch.gated == 0
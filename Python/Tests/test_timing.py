@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+
+TONES = dict(freq0=1000, freq1=1500, freq_start=2000, freq_stop=2500)
+
+
+def _skew(signal, ppm):
+    # what a receiver whose sound card clock is ppm slower than the sender's records
+    ratio = 1 + ppm * 1e-6
+    return np.interp(np.arange(int(len(signal) * ratio)) / ratio, np.arange(len(signal)), signal)
+
+
+def _gapless(text, preamble):
+    # example_send.py's 'gapless' framing: start/stop tones around each byte, no silence between bytes
+    symbols = [(TONES['freq1'] if b else TONES['freq0'], 0.01) for b in preamble]
+    for byte in text.encode():
+        symbols.append((TONES['freq_start'], 0.01))
+        symbols.extend((TONES['freq1'] if b else TONES['freq0'], 0.01) for b in bytes_to_bits(bytes([byte])))
+        symbols.append((TONES['freq_stop'], 0.01))
+    return assemble_symbols(symbols, 8000)
+
+
+@pytest.mark.parametrize('ppm', [-1500, 800, 1500])
+def test_tracks_clock_offset(ppm):
+    bits = np.random.default_rng(9).integers(0, 2, 3000)
+    received = _skew(modulate_fsk(bits, 8000, 1000, 1500, 100), ppm)
+    fixed = demodulate_fsk(received, 8000, 1000, 1500, 100)
+    assert np.count_nonzero(fixed[:len(bits)] != bits[:len(fixed)]) > 300
+    timing = SymbolTimingRecovery(80)
+    tracked = demodulate_fsk(received, 8000, 1000, 1500, 100, timing=timing)
+    n = min(len(tracked), len(bits))
+    assert n >= len(bits) - 1
+    assert np.array_equal(tracked[:n], bits[:n])
+    assert abs(timing.ppm - ppm) < 20
+
+
+def test_no_offset_matches_fixed_slicing():
+    bits = np.random.default_rng(10).integers(0, 2, 500)
+    signal = modulate_fsk(bits, 8000, 1000, 1500, 100)
+    timing = SymbolTimingRecovery(80)
+    assert np.array_equal(demodulate_fsk(signal, 8000, 1000, 1500, 100, timing=timing), bits)
+    assert abs(timing.ppm) < 20
+
+
+def test_streaming_receiver_decodes_gapless_bytes():
+    text = 'gapless framing keeps the link busy ' * 4
+    preamble = [1, 0, 1, 0, 1, 1, 0, 0]
+    rng = np.random.default_rng(11)
+    signal = np.concatenate((0.01 * rng.standard_normal(400), _skew(_gapless(text, preamble), 1000), np.zeros(800)))
+    receiver = StreamingReceiver(8000, 0.01, preamble=preamble, block_size=256, timing_recovery=True, **TONES)
+    for i in range(0, len(signal), 256):
+        receiver.feed(signal[i:i + 256])
+    assert b''.join(receiver.iter_bytes(timeout=0)).decode() == text
+    assert abs(receiver.timing.ppm - 1000) < 50
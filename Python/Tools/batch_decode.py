@@ -0,0 +1,168 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Acoustic import *
+from Acoustic.protocol import CRC_SIZES, HEADER, SYNC_WORD
+"""
+Offline batch decoder
+===============================
+Decodes every packet in a long hydrophone recording (the framing example_send.py
+uses with FRAMING = 'packet': [preamble][encode_packet frame]). The WAV file is
+memory-mapped and cut into chunks that overlap by one maximum-length packet, so
+any packet that starts inside a chunk also ends inside it. Each chunk goes through
+bandpass -> preamble search -> demodulation -> frame decode on a process pool;
+a chunk only reports packets whose preamble starts in its own (non-overlapping)
+part, and near-duplicates are dropped, so every packet is printed once. Workers
+open the file themselves, so memory stays flat whatever the file size.
+
+Output is one JSON object per packet, in time order.
+
+example:
+    python batch_decode.py recording.wav --start-time 2024-05-01T09:30:00 --out packets.jsonl
+"""
+
+GUARD_BAND = 100
+SYNC_SLACK = 2  # bits of timing error allowed between the preamble peak and the sync word
+
+def max_frame_bits(max_payload, crc='crc16', fec=None):
+    """Bits on air for the longest frame PacketParser accepts"""
+    header_bits = coded_length((HEADER.size - len(SYNC_WORD)) * 8, fec)
+    body_bits = coded_length((max_payload + CRC_SIZES[crc]) * 8, fec)
+    return len(SYNC_WORD) * 8 + header_bits + body_bits
+
+def plan_chunks(n_samples, step, overlap, guard):
+    """
+    (read_start, read_stop, own_start, own_stop) per chunk
+
+    A chunk owns [own_start, own_stop) and reads an extra packet length (overlap)
+    after it, plus a guard either side for the filter's edge transients.
+    """
+    chunks = []
+    for own_start in range(0, n_samples, step):
+        own_stop = min(own_start + step, n_samples)
+        chunks.append((max(own_start - guard, 0), min(own_stop + overlap + guard, n_samples), own_start, own_stop))
+    return chunks
+
+def decode_chunk(path, chunk, config):
+    """
+    Finds and decodes the packets whose preamble starts in one chunk's own range
+
+    Args:
+        path (str): WAV file, opened (memory-mapped) again in the worker
+        chunk (tuple): (read_start, read_stop, own_start, own_stop) sample indices
+        config (dict): freq0, freq1, bit_rate, preamble, crc, fec, max_payload, filter_order,
+            threshold, backend
+
+    Returns:
+        list: dict per packet with its start sample, preamble score, type and payload
+    """
+    read_start, read_stop, own_start, own_stop = chunk
+    sample_rate, samples = read_wav(path)
+    freq0, freq1, bit_rate = config['freq0'], config['freq1'], config['bit_rate']
+    samples_per_bit = int(sample_rate / bit_rate)
+    preamble = config['preamble']
+
+    lowcut = min(freq0, freq1) - GUARD_BAND
+    highcut = max(freq0, freq1) + GUARD_BAND
+    # zero phase, so the preamble peak (and the timestamp) isn't shifted by the filter delay
+    signal = bandpass_filter(to_float(samples[read_start:read_stop]), lowcut, highcut, sample_rate,
+                             order=config['filter_order'], zero_phase=True)
+
+    correlator = PreambleCorrelator(preamble, sample_rate=sample_rate, freq0=freq0, freq1=freq1, bit_rate=bit_rate,
+                                    threshold=config['threshold'])
+    frame_samples = max_frame_bits(config['max_payload'], config['crc'], config['fec']) * samples_per_bit
+    packets = []
+    for start, score in correlator.find(signal):
+        if not own_start <= read_start + start < own_stop:
+            continue
+        data_start = start + len(preamble) * samples_per_bit
+        bits = demodulate_fsk(signal[:data_start + frame_samples], sample_rate=sample_rate, freq0=freq0,
+                              freq1=freq1, bit_rate=bit_rate, start_index=data_start, backend=config['backend'])
+        # the sync word has to follow the preamble, otherwise a preamble-like run of payload bits
+        # would decode the next packet along from the wrong start
+        sync = find_sync_word(bits[:len(SYNC_WORD) * 8 + SYNC_SLACK], bytes_to_bits(SYNC_WORD))
+        if not len(sync):
+            continue
+        parser = PacketParser(crc=config['crc'], max_payload=config['max_payload'], fec=config['fec'])
+        decoded = parser.feed(bits[sync[0]:])
+        if not decoded:
+            continue
+        message_type, payload = decoded[0]
+        packets.append({
+            'sample': read_start + start,
+            'score': round(score, 3),
+            'type': message_type,
+            'length': len(payload),
+            'payload_hex': payload.hex(),
+            'text': payload.decode('utf-8', errors='replace'),
+        })
+    return packets
+
+def packet_samples(packet, samples_per_bit, preamble_bits, crc, fec):
+    """How long a decoded packet lasted, in samples"""
+    return (preamble_bits + max_frame_bits(packet['length'], crc, fec)) * samples_per_bit
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decode every packet in a WAV recording")
+    parser.add_argument('wav')
+    parser.add_argument('--freq0', type=float, default=FREQ0)
+    parser.add_argument('--freq1', type=float, default=FREQ1)
+    parser.add_argument('--bit-rate', type=float, default=1 / DURATION)
+    parser.add_argument('--crc', default='crc16', choices=sorted(CRC_SIZES))
+    parser.add_argument('--fec', default='none', choices=['none', 'hamming74', 'conv'])
+    parser.add_argument('--max-payload', type=int, default=255,
+                        help="longest payload expected, sets the chunk overlap")
+    parser.add_argument('--filter-order', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.7, help="normalised preamble correlation to accept")
+    parser.add_argument('--backend', default='goertzel', choices=['fft', 'goertzel'])
+    parser.add_argument('--chunk-seconds', type=float, default=60.0, help="new audio per chunk, excluding overlap")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--start-time', help="ISO time of the first sample, adds absolute timestamps")
+    parser.add_argument('--out', help="JSON lines file, default stdout")
+    args = parser.parse_args(argv)
+
+    sample_rate, samples = read_wav(args.wav)
+    n_samples = len(samples)
+    del samples
+    config = dict(freq0=args.freq0, freq1=args.freq1, bit_rate=args.bit_rate, preamble=tuple(PREAMBLE),
+                  crc=args.crc, fec=None if args.fec == 'none' else args.fec, max_payload=args.max_payload,
+                  filter_order=args.filter_order, threshold=args.threshold, backend=args.backend)
+    samples_per_bit = int(sample_rate / args.bit_rate)
+    overlap = (len(PREAMBLE) + max_frame_bits(args.max_payload, args.crc, config['fec'])) * samples_per_bit
+    step = max(int(args.chunk_seconds * sample_rate), samples_per_bit)
+    chunks = plan_chunks(n_samples, step, overlap, guard=2 * samples_per_bit)
+    start_time = datetime.datetime.fromisoformat(args.start_time) if args.start_time else None
+    print(f"{n_samples / sample_rate:.1f} s of audio in {len(chunks)} chunks", file=sys.stderr)
+
+    out = open(args.out, 'w') if args.out else sys.stdout
+    last = []  # packets still close enough to the next ones to be duplicates
+    found = 0
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for packets in pool.map(decode_chunk, [args.wav] * len(chunks), chunks, [config] * len(chunks)):
+                for packet in packets:
+                    # the same frame found from two preamble peaks, or either side of a chunk boundary
+                    last = [p for p in last if packet['sample'] - p['sample']
+                            < packet_samples(p, samples_per_bit, len(PREAMBLE), args.crc, config['fec'])]
+                    if any(p['type'] == packet['type'] and p['payload_hex'] == packet['payload_hex'] for p in last):
+                        continue
+                    last.append(packet)
+                    record = {'time_s': round(packet['sample'] / sample_rate, 4)}
+                    if start_time is not None:
+                        record['timestamp'] = (start_time + datetime.timedelta(seconds=record['time_s'])).isoformat()
+                    record.update(packet)
+                    out.write(json.dumps(record) + '\n')
+                    out.flush()
+                    found += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{found} packets decoded", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()